@@ -12,7 +12,7 @@ drone_api = DroneTimeBasedAPI()
 executor = MissionExecutor(drone_api)
 # -------------------------
 
-def run_mission_background(task: str):
+def run_mission_background(task: str, cancel_event: threading.Event):
     """
     미리 생성된 JSON 파일을 읽어 미션을 수행하는 함수.
     VLLM 호출 로직이 제거되었습니다.
@@ -30,7 +30,7 @@ def run_mission_background(task: str):
         print("--- [Thread] 미션 계획 로딩 성공! 실행기로 전달합니다. ---")
         
         # 2. 불러온 계획을 실행기에게 전달하여 미션을 수행합니다.
-        executor.execute_mission(mission_plan)
+        executor.execute_mission(mission_plan, cancel_event)
 
     except FileNotFoundError:
         print(f"❌ [Thread-Error] 미션 파일을 찾을 수 없습니다: '{mission_file}'")
@@ -39,6 +39,8 @@ def run_mission_background(task: str):
     except Exception as e:
         print(f"❌ [Thread-Error] 미션 수행 중 예상치 못한 오류 발생: {e}")
         traceback.print_exc()
+    finally:
+        executor.release(cancel_event)
 
 @app.route('/start_mission', methods=['POST'])
 def start_mission():
@@ -49,8 +51,9 @@ def start_mission():
     data = request.json
     task = data.get('task', 'No task specified') # task가 없어도 오류 방지
 
-    # 미션 실행을 별도의 스레드에서 비동기적으로 시작
-    mission_thread = threading.Thread(target=run_mission_background, args=(task,))
+    # 미션 실행을 별도의 스레드에서 비동기적으로 시작. 접수 시점부터 취소할 수 있게 먼저 등록한다.
+    cancel_event = executor.reserve()
+    mission_thread = threading.Thread(target=run_mission_background, args=(task, cancel_event))
     mission_thread.start()
     
     return jsonify({
@@ -58,6 +61,22 @@ def start_mission():
         "message": f"'{task}' 요청을 접수했습니다. sample_mission.json을 기반으로 미션을 시작합니다.",
     })
 
+@app.route('/cancel_mission', methods=['POST'])
+def cancel_mission():
+    """
+    실행 중인 미션을 즉시 중단하는 API 엔드포인트.
+    진행 중인 이동/대기도 바로 깨어나고 남은 명령은 실행되지 않습니다.
+    """
+    if not executor.cancel():
+        return jsonify({
+            "status": "idle",
+            "message": "실행 중인 미션이 없습니다.",
+        })
+    return jsonify({
+        "status": "success",
+        "message": "미션 취소를 요청했습니다.",
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001)
 
@@ -0,0 +1,278 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class CommandError(ValueError):
+    """A command that does not match the action schema."""
+
+
+@dataclass(frozen=True, slots=True)
+class ParamSpec:
+    name: str
+    minimum: Optional[int] = 0
+    # False 면 생략할 수 있고, 생략하면 실행기 쪽 기본값을 쓴다. 마지막 인자들만 선택으로 둔다.
+    required: bool = True
+
+
+@dataclass(frozen=True, slots=True)
+class ActionSpec:
+    name: str
+    params: Tuple[ParamSpec, ...] = ()
+    # Tello SDK 에서의 인자 이름. None 이면 Tello 로 보낼 수 없는 명령.
+    tello_params: Optional[Tuple[str, ...]] = ()
+
+
+def _moves(*names: str, param: str) -> Dict[str, ActionSpec]:
+    return {name: ActionSpec(name, (ParamSpec(param),), ("x",)) for name in names}
+
+
+# Drone API 가 받는 명령. 거리 cm, 각도 °, 속도 cm/s (정수).
+ACTIONS: Dict[str, ActionSpec] = {
+    # Tello 의 takeoff 는 고도를 받지 않는다.
+    "takeoff": ActionSpec("takeoff", (ParamSpec("altitude", required=False),), ()),
+    "land": ActionSpec("land"),
+    "emergency": ActionSpec("emergency"),
+    **_moves("up", "down", "left", "right", "forward", "back", param="distance"),
+    **_moves("cw", "ccw", param="degree"),
+    "go": ActionSpec(
+        "go",
+        (
+            ParamSpec("x", minimum=None),
+            ParamSpec("y", minimum=None),
+            ParamSpec("z", minimum=None),
+            ParamSpec("speed", minimum=1),
+        ),
+        None,
+    ),
+    "speed": ActionSpec("speed", (ParamSpec("value", minimum=1),), None),
+}
+
+
+def _to_int(action: str, name: str, value: Any) -> int:
+    if isinstance(value, bool):
+        raise CommandError(f"'{action}' 의 {name} 값이 숫자가 아닙니다: {value!r}")
+    if isinstance(value, str):
+        try:
+            value = float(value.strip())
+        except ValueError:
+            raise CommandError(f"'{action}' 의 {name} 값이 숫자가 아닙니다: {value!r}") from None
+    if not isinstance(value, (int, float)) or value != value:
+        raise CommandError(f"'{action}' 의 {name} 값이 숫자가 아닙니다: {value!r}")
+    return int(round(value))
+
+
+@dataclass(frozen=True, slots=True)
+class Command:
+    """One validated drone command; ``args`` follow the order of its ActionSpec params."""
+
+    action: str
+    args: Tuple[int, ...] = ()
+
+    @classmethod
+    def build(cls, action: Any, params: Any = None) -> "Command":
+        """Validate ``action``/``params`` against ACTIONS and coerce the numbers to int."""
+        spec = ACTIONS.get(action) if isinstance(action, str) else None
+        if spec is None:
+            raise CommandError(f"알 수 없는 명령입니다: {action!r}")
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            raise CommandError(f"'{action}' 의 params 가 객체가 아닙니다: {params!r}")
+        args = []
+        for param in spec.params:
+            value = params.get(param.name)
+            if value is None:
+                if param.required:
+                    raise CommandError(f"'{action}' 명령에 '{param.name}' 값이 필요합니다.")
+                break
+            value = _to_int(action, param.name, value)
+            if param.minimum is not None and value < param.minimum:
+                raise CommandError(f"'{action}' 의 {param.name} 값은 {param.minimum} 이상이어야 합니다: {value}")
+            args.append(value)
+        return cls(spec.name, tuple(args))
+
+    @classmethod
+    def from_dict(cls, obj: Any) -> "Command":
+        """From the api/LLM shape ``{"action": ..., "params": {...}}``."""
+        if not isinstance(obj, dict):
+            raise CommandError(f"명령이 객체가 아닙니다: {obj!r}")
+        return cls.build(obj.get("action"), obj.get("params"))
+
+    @classmethod
+    def from_mission(cls, obj: Any) -> "Command":
+        """From the DroneAPI mission shape ``{"command": ..., "parameters": {...}}``."""
+        if not isinstance(obj, dict):
+            raise CommandError(f"명령이 객체가 아닙니다: {obj!r}")
+        return cls.build(obj.get("command"), obj.get("parameters"))
+
+    @property
+    def params(self) -> Dict[str, int]:
+        return {param.name: value for param, value in zip(ACTIONS[self.action].params, self.args)}
+
+    def to_api(self) -> Dict[str, Any]:
+        return {"action": self.action, "params": self.params}
+
+    def to_mission(self) -> Dict[str, Any]:
+        return {"command": self.action, "parameters": self.params}
+
+    @classmethod
+    def from_tello(cls, obj: Any) -> "Command":
+        """From the SITL/tello shape ``{"command": ..., "parameters": {"x": ...}}``."""
+        if not isinstance(obj, dict):
+            raise CommandError(f"명령이 객체가 아닙니다: {obj!r}")
+        action = obj.get("command")
+        spec = ACTIONS.get(action) if isinstance(action, str) else None
+        if spec is None or spec.tello_params is None:
+            raise CommandError(f"Tello 에서 지원하지 않는 명령입니다: {action!r}")
+        parameters = obj.get("parameters") or {}
+        if not isinstance(parameters, dict):
+            raise CommandError(f"'{action}' 의 parameters 가 객체가 아닙니다: {parameters!r}")
+        params = {param.name: parameters.get(name) for param, name in zip(spec.params, spec.tello_params)}
+        return cls.build(action, params)
+
+    def to_tello(self) -> Dict[str, Any]:
+        """SITL/tello CommandExecutor shape; Tello takes distances/angles as ``x``."""
+        names = ACTIONS[self.action].tello_params
+        if names is None:
+            raise CommandError(f"Tello 에서 지원하지 않는 명령입니다: {self.action}")
+        return {"command": self.action, "parameters": dict(zip(names, self.args))}
+
+    def run(self, dispatch: Dict[str, Callable[..., Any]]) -> Any:
+        return dispatch[self.action](*self.args)
+
+
+def bind(target: Any) -> Dict[str, Callable[..., Any]]:
+    """Look up every action on ``target`` once; ``Command.run`` then calls without reflection."""
+    dispatch = {}
+    for name in ACTIONS:
+        method = getattr(target, name, None)
+        if callable(method):
+            dispatch[name] = method
+    return dispatch
+
+
+@dataclass(frozen=True, slots=True)
+class CommandPlan:
+    commands: Tuple[Command, ...]
+    # 스키마에 맞지 않아 빠진 명령과 그 이유
+    rejected: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_items(
+        cls, items: Iterable[Any], strict: bool = False, parse: Callable[[Any], Command] = Command.from_dict
+    ) -> "CommandPlan":
+        """Validate every item once. ``strict`` raises on the first bad command instead of dropping it."""
+        commands: List[Command] = []
+        rejected: List[str] = []
+        for item in items:
+            if isinstance(item, Command):
+                commands.append(item)
+                continue
+            try:
+                commands.append(parse(item))
+            except CommandError as exc:
+                if strict:
+                    raise
+                rejected.append(str(exc))
+        return cls(tuple(commands), tuple(rejected))
+
+    @classmethod
+    def from_payload(cls, payload: Any, strict: bool = False) -> "CommandPlan":
+        if not isinstance(payload, dict) or not isinstance(payload.get("commands", []), list):
+            raise CommandError("'commands' 배열이 없습니다.")
+        return cls.from_items(payload.get("commands", []), strict)
+
+    @classmethod
+    def from_mission(cls, items: Iterable[Any], strict: bool = False) -> "CommandPlan":
+        """DroneAPI mission list; vllm_agent may nest it as ``[[{...}, ...]]``."""
+        items = list(items)
+        if items and all(isinstance(item, list) for item in items):
+            items = [command for sublist in items for command in sublist]
+        return cls.from_items(items, strict, Command.from_mission)
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def __iter__(self) -> Iterator[Command]:
+        return iter(self.commands)
+
+    def to_api(self) -> List[Dict[str, Any]]:
+        return [command.to_api() for command in self.commands]
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {"commands": self.to_api()}
+
+    def to_mission(self) -> List[Dict[str, Any]]:
+        return [command.to_mission() for command in self.commands]
+
+    def to_tello(self) -> List[Dict[str, Any]]:
+        return [command.to_tello() for command in self.commands]
+
+
+def json_objects(text: str) -> Iterator[str]:
+    """Top-level ``{...}`` spans of ``text``, in one pass when every brace is closed.
+
+    Quotes only count inside an object, so stray quotes in the prose around
+    the JSON cannot throw the scan off; braces inside strings are ignored.
+    An opening brace that is never closed is skipped and the rest of the
+    text is scanned again from right after it, so each unclosed brace costs
+    one more pass: quadratic in the worst case (many unclosed braces), which
+    is fine for LLM replies of a few KB.
+    """
+    pos = 0
+    while True:
+        depth = 0
+        start = pos
+        in_string = False
+        escape = False
+        for idx in range(pos, len(text)):
+            char = text[idx]
+            if depth == 0:
+                if char == "{":
+                    depth = 1
+                    start = idx
+                continue
+            if in_string:
+                if escape:
+                    escape = False
+                elif char == "\\":
+                    escape = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    yield text[start : idx + 1]
+        if not depth:
+            return
+        # 닫히지 않은 여는 괄호(잘린 출력이나 본문 속 괄호)
+        pos = start + 1
+
+
+def extract_json_payload(raw_text: str) -> Dict[str, Any]:
+    """모델 출력(요약, 사고과정, 코드펜스 포함)에서 명령 JSON 오브젝트를 찾아 dict로 반환.
+
+    마지막으로 나온 ``commands`` 오브젝트를 고르고, 없으면 마지막 오브젝트를 쓴다.
+    """
+    fallback = None
+    payload = None
+    for candidate in json_objects(raw_text):
+        try:
+            obj = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(obj, dict):
+            if "commands" in obj:
+                payload = obj
+            else:
+                fallback = obj
+    if payload is not None:
+        return payload
+    if fallback is not None:
+        return fallback
+    raise ValueError("LLM 응답에서 유효한 JSON을 찾지 못했습니다.")
@@ -1,28 +1,45 @@
-import time
 import re
+import threading
+import time
+
+from sim_clock import make_clock
+
+
+class CommandCancelled(Exception):
+    """Raised inside a drone action when its wait was interrupted by ``cancel``."""
+
 
 class DroneTimeBasedAPI:
     """
     LLM이 생성한 각 명령어(command)를 받아,
     동작을 시뮬레이션하고 예상 시간만큼 대기하는 API.
+    대기는 주입된 clock 으로 하므로 virtual/scaled 시계로 빠르게 검증할 수 있다.
     """
     # 드론의 성능 스펙 (cm/s, deg/s)
     DEFAULT_SPEED = 30.0  # 30 cm/s (상승 및 수평 이동 속도)
     ROTATION_SPEED = 90.0 # 90 deg/s
 
-    def __init__(self):
+    def __init__(self, clock=None):
+        # __getattr__ 가 없는 속성을 액션으로 취급하므로 clock 과 cancel_event 를 먼저 설정한다.
+        self.clock = clock or make_clock()
+        # set 되면 진행 중인 대기가 즉시 깨어나 CommandCancelled 를 던진다.
+        self.cancel_event = threading.Event()
         print("✅ [API] 드론 시뮬레이션 API가 초기화되었습니다.")
         self.current_speed = self.DEFAULT_SPEED
 
+    def _sleep(self, seconds):
+        if not self.clock.sleep(seconds, self.cancel_event):
+            raise CommandCancelled("명령이 취소되어 대기를 중단했습니다.")
+
     def _wait_for_distance(self, distance):
         wait_time = abs(float(distance)) / self.current_speed
         print(f"  ... [API] 예상 소요 시간: {wait_time:.2f}초. 대기를 시작합니다.")
-        time.sleep(wait_time)
+        self._sleep(wait_time)
 
     def _wait_for_degree(self, degree):
         wait_time = abs(float(degree)) / self.ROTATION_SPEED
         print(f"  ... [API] 예상 소요 시간: {wait_time:.2f}초. 대기를 시작합니다.")
-        time.sleep(wait_time)
+        self._sleep(wait_time)
 
     def takeoff(self, altitude: int = 50, **kwargs):
         """
@@ -34,7 +51,7 @@ class DroneTimeBasedAPI:
 
     def land(self, **kwargs):
         print("🛬 [API] 'land' 액션 실행.")
-        time.sleep(3) # 착륙은 3초 정도로 가정
+        self._sleep(3) # 착륙은 3초 정도로 가정
         print("✅ [API] 'land' 액션 완료.")
 
     def up(self, distance: int, **kwargs):
@@ -82,24 +99,24 @@ class DroneTimeBasedAPI:
         distance = (float(x)**2 + float(y)**2 + float(z)**2)**0.5
         wait_time = distance / float(speed)
         print(f"  ... [API] 예상 소요 시간: {wait_time:.2f}초. 대기를 시작합니다.")
-        time.sleep(wait_time)
+        self._sleep(wait_time)
         print(f"✅ [API] 'go' 액션 완료.")
 
     def speed(self, value: int, **kwargs):
         print(f"💨 [API] 'speed' 변경. 새로운 속도: {value} cm/s")
         self.current_speed = float(value)
-        time.sleep(0.1) # 속도 변경은 즉시 적용된다고 가정
+        self._sleep(0.1) # 속도 변경은 즉시 적용된다고 가정
         print(f"✅ [API] 'speed' 액션 완료.")
 
     def emergency(self, **kwargs):
         print("🚨 [API] 'emergency' 액션 실행.")
-        time.sleep(1)
+        self._sleep(1)
         print("✅ [API] 'emergency' 액션 완료.")
 
     def __getattr__(self, name):
         def method(**kwargs):
             print(f"ℹ️  [API] '{name}' 액션 실행. 파라미터: {kwargs}")
-            time.sleep(0.5) # 간단한 설정은 0.5초로 가정
+            self._sleep(0.5) # 간단한 설정은 0.5초로 가정
             print(f"✅ [API] '{name}' 액션 완료.")
         return method
 
@@ -1,6 +1,9 @@
 # mission_executor.py
-from typing import List, Dict
-from drone_api import DroneTimeBasedAPI
+import threading
+from typing import Dict, List, Optional, Set
+
+from command_ir import CommandPlan, bind
+from drone_api import CommandCancelled, DroneTimeBasedAPI
 
 class MissionExecutor:
     """
@@ -9,43 +12,70 @@ class MissionExecutor:
     """
     def __init__(self, drone_api: DroneTimeBasedAPI):
         self.drone = drone_api
+        # 명령 이름 -> API 메서드. 실행 중에는 getattr 없이 바로 호출한다.
+        self.dispatch = bind(drone_api)
+        # 접수됐거나 실행 중인 미션마다 따로 두는 취소 신호. 한 드론이라 미션은 하나씩 실행한다.
+        self._missions: Set[threading.Event] = set()
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
         print("💡 [Executor] 미션 실행기가 준비되었습니다.")
 
-    def execute_mission(self, commands: List[Dict]):
+    def reserve(self) -> threading.Event:
+        """미션 접수 시 부릅니다. 실행 전에 들어온 취소도 이 미션에만 적용됩니다."""
+        cancel_event = threading.Event()
+        with self._lock:
+            self._missions.add(cancel_event)
+        return cancel_event
+
+    def release(self, cancel_event: threading.Event):
+        """끝났거나 시작하지 못한 미션의 신호를 치웁니다."""
+        with self._lock:
+            self._missions.discard(cancel_event)
+
+    def cancel(self) -> bool:
+        """접수됐거나 실행 중인 미션을 중단합니다. 진행 중인 대기도 즉시 깨어납니다.
+
+        실행 중인 미션이 없으면 아무 일도 하지 않고 False 를 돌려줍니다.
+        """
+        with self._lock:
+            missions = list(self._missions)
+        for cancel_event in missions:
+            cancel_event.set()
+        return bool(missions)
+
+    def execute_mission(self, commands: List[Dict], cancel_event: Optional[threading.Event] = None):
         """명령어 리스트를 받아 순차적으로 실행합니다."""
-        print("\n" + "="*20 + " 미션 실행 시작 " + "="*20)
-        
-        # vllm_agent.py의 최종 출력 형식은 [[{...}, {...}]] 일 수 있으므로,
-        # 중첩된 리스트를 풀어 단일 리스트로 만듭니다.
-        flat_commands = []
-        if commands and isinstance(commands[0], list):
-             for sublist in commands:
-                flat_commands.extend(sublist)
-        else:
-            flat_commands = commands
-
-        for i, cmd_dict in enumerate(flat_commands):
-            if not isinstance(cmd_dict, dict):
-                print(f"⚠️ [Executor-Warning] 잘못된 명령어 형식입니다: {cmd_dict}. 건너뜁니다.")
-                continue
-
-            command_name = cmd_dict.get("command")
-            params = cmd_dict.get("parameters", {})
-            
-            if not command_name:
-                print(f"⚠️ [Executor-Warning] 'command' 키가 없는 항목입니다: {cmd_dict}. 건너뜁니다.")
-                continue
-            
-            print(f"\n[스텝 {i+1}/{len(flat_commands)}] >> {command_name.upper()} 실행")
-            
+        if cancel_event is None:
+            cancel_event = self.reserve()
+        try:
+            with self._run_lock:
+                print("\n" + "="*20 + " 미션 실행 시작 " + "="*20)
+                # 드론의 대기는 이 미션의 신호로만 깨어난다.
+                self.drone.cancel_event = cancel_event
+                self._run_plan(commands, cancel_event)
+                print("\n" + "="*20 + " 모든 미션 완료 " + "="*21 + "\n")
+        finally:
+            self.release(cancel_event)
+
+    def _run_plan(self, commands: List[Dict], cancel_event: threading.Event):
+        # vllm_agent.py의 최종 출력 형식은 [[{...}, {...}]] 일 수 있으므로 중첩을 풀고,
+        # 실행 전에 모든 명령을 한 번에 검증합니다.
+        plan = CommandPlan.from_mission(commands)
+        for reason in plan.rejected:
+            print(f"⚠️ [Executor-Warning] {reason} 건너뜁니다.")
+
+        for i, command in enumerate(plan, start=1):
+            if cancel_event.is_set():
+                print("🛑 [Executor] 미션이 취소되어 남은 명령을 건너뜁니다.")
+                break
+
+            print(f"\n[스텝 {i}/{len(plan)}] >> {command.action.upper()} 실행")
+
             try:
-                # getattr을 이용해 drone_api에서 이름에 맞는 함수를 찾아 실행
-                func_to_call = getattr(self.drone, command_name)
-                func_to_call(**params)
-            except AttributeError:
-                print(f"❓ [Executor-Warning] '{command_name}'에 해당하는 API 함수를 찾을 수 없습니다.")
+                command.run(self.dispatch)
+            except CommandCancelled:
+                print(f"🛑 [Executor] '{command.action}' 실행 중 미션이 취소되었습니다.")
+                break
             except Exception as e:
-                print(f"❌ [Executor-Error] '{command_name}' 실행 중 오류 발생: {e}. 미션을 중단합니다.")
+                print(f"❌ [Executor-Error] '{command.action}' 실행 중 오류 발생: {e}. 미션을 중단합니다.")
                 break
-        
-        print("\n" + "="*20 + " 모든 미션 완료 " + "="*21 + "\n")
\ No newline at end of file
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+from typing import Optional
+
+# 시뮬레이션 시계: real(실시간), scaled(DRONE_CLOCK_SCALE 배속), virtual(대기 없이 즉시 진행)
+DRONE_CLOCK = os.getenv("DRONE_CLOCK", "real").lower()
+DRONE_CLOCK_SCALE = float(os.getenv("DRONE_CLOCK_SCALE", "100"))
+# virtual 시계의 시작 시각(epoch 초). 지정하면 같은 미션이 매번 같은 로그를 만든다.
+DRONE_CLOCK_EPOCH = os.getenv("DRONE_CLOCK_EPOCH")
+
+
+class RealClock:
+    """Wall-clock time; sleep blocks for the full duration unless cancelled."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic_ns(self) -> int:
+        return time.monotonic_ns()
+
+    def sleep(self, seconds: float, cancel: Optional[threading.Event] = None) -> bool:
+        """Wait ``seconds``; return False if ``cancel`` was set first."""
+        if cancel is None:
+            time.sleep(seconds)
+            return True
+        return not cancel.wait(seconds)
+
+
+class ScaledClock(RealClock):
+    """Simulated time running ``scale`` times faster than real time."""
+
+    def __init__(self, scale: float) -> None:
+        if scale <= 0:
+            raise ValueError("DRONE_CLOCK_SCALE 는 0보다 커야 합니다.")
+        self.scale = scale
+        self._start_wall = time.time()
+        self._start_ns = time.monotonic_ns()
+
+    def monotonic_ns(self) -> int:
+        return self._start_ns + int((time.monotonic_ns() - self._start_ns) * self.scale)
+
+    def time(self) -> float:
+        return self._start_wall + (self.monotonic_ns() - self._start_ns) / 1e9
+
+    def sleep(self, seconds: float, cancel: Optional[threading.Event] = None) -> bool:
+        return super().sleep(seconds / self.scale, cancel)
+
+
+class VirtualClock:
+    """Simulated time that only moves when ``sleep`` is called; never blocks."""
+
+    def __init__(self, start: Optional[float] = None) -> None:
+        self._start = time.time() if start is None else start
+        self._elapsed_ns = 0
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._start + self._elapsed_ns / 1e9
+
+    def monotonic_ns(self) -> int:
+        return self._elapsed_ns
+
+    def sleep(self, seconds: float, cancel: Optional[threading.Event] = None) -> bool:
+        if cancel is not None and cancel.is_set():
+            return False
+        with self._lock:
+            self._elapsed_ns += int(max(seconds, 0.0) * 1e9)
+        return True
+
+
+def make_clock(mode: Optional[str] = None):
+    """Build the clock selected by ``mode`` (default: ``DRONE_CLOCK``)."""
+    mode = (mode or DRONE_CLOCK).lower()
+    if mode == "real":
+        return RealClock()
+    if mode == "scaled":
+        return ScaledClock(DRONE_CLOCK_SCALE)
+    if mode == "virtual":
+        return VirtualClock(float(DRONE_CLOCK_EPOCH) if DRONE_CLOCK_EPOCH else None)
+    raise ValueError(f"알 수 없는 DRONE_CLOCK 값입니다: {mode}")
@@ -4,17 +4,21 @@
 import os
 import sys
 import argparse
-import re
 import time
 from pathlib import Path
-from vllm import LLM, SamplingParams
-from transformers import AutoTokenizer
+
+# api/ 의 공용 LLM 클라이언트를 사용합니다.
+API_DIR = Path(__file__).resolve().parents[2] / "api"
+if str(API_DIR) not in sys.path:
+    sys.path.append(str(API_DIR))
+
+from llm_client import AsyncLLMClient, clean_reply, make_backend  # noqa: E402
 
 # -------------------
 # Qwen 기반 PDDL 생성
 # -------------------
 
-def generate_pddl_from_text(llm, tokenizer, text: str, mode: str,
+def generate_pddl_from_text(client, text: str, mode: str,
                             temperature: float=0.2, top_p: float=0.9, max_tokens: int=1024):
     domain_name = "uav"
 
@@ -35,22 +39,20 @@ def generate_pddl_from_text(llm, tokenizer, text: str, mode: str,
     else:
         raise ValueError("Mode must be 'problem' or 'plan'")
 
-    sampling_params = SamplingParams(
-        temperature=temperature,
-        top_p=top_p,
-        max_tokens=max_tokens,
-    )
+    options = {
+        "temperature": temperature,
+        "top_p": top_p,
+        "max_output_tokens": max_tokens,
+    }
 
     start_time = time.time()
-    response = llm.generate([prompt_text], sampling_params=sampling_params)
+    response = client.generate_sync(prompt_text, options=options)
     elapsed = time.time() - start_time
 
-    output_text = response[0].outputs[0].text.strip()
     print(f"[INFO] {mode} generation done in {elapsed:.2f} sec")
 
     # <think> 제거 등 정리
-    output_text = re.sub(r'<think>.*?</think>', '', output_text, flags=re.DOTALL).strip()
-    return output_text
+    return clean_reply(response.text)
 
 
 def main():
@@ -61,6 +63,9 @@ def main():
     parser.add_argument("--temperature", type=float, default=0.2)
     parser.add_argument("--top_p", type=float, default=0.9)
     parser.add_argument("--max_tokens", type=int, default=1024)
+    parser.add_argument("--backend", type=str, default="vllm",
+                        choices=["vllm", "transformers", "stub"], help="LLM backend")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds allowed per generation")
     args = parser.parse_args()
 
     # base_dir를 prompt_file 기준으로 상대 경로 계산
@@ -85,22 +90,19 @@ def main():
     print(nl_prompt)
     print("\n--- Generating PDDL files ---\n")
 
-    # --- Initialize Qwen tokenizer and LLM ---
-    tokenizer = AutoTokenizer.from_pretrained(args.model, trust_remote_code=True)
-    llm = LLM(
-        model=args.model,
-        download_dir=args.local_dir,
-        dtype="bfloat16",
-        seed=0,
-        max_model_len=2048,
-        gpu_memory_utilization=0.3,
-        trust_remote_code=True   # <- 여기를 추가
-)
+    # --- Initialize Qwen LLM (모델은 첫 생성 때 올라갑니다) ---
+    if args.backend == "vllm":
+        backend = make_backend(name="vllm", model=args.model, download_dir=args.local_dir)
+    elif args.backend == "transformers":
+        backend = make_backend(name="transformers", model=args.model)
+    else:
+        backend = make_backend(name="stub")
+    client = AsyncLLMClient(backend, timeout=args.timeout)
 
 
     # --- Generate problem.pddl ---
     try:
-        problem_pddl = generate_pddl_from_text(llm, tokenizer, nl_prompt, "problem",
+        problem_pddl = generate_pddl_from_text(client, nl_prompt, "problem",
                                                temperature=args.temperature,
                                                top_p=args.top_p,
                                                max_tokens=args.max_tokens)
@@ -112,7 +114,7 @@ def main():
 
     # --- Generate plan.pddl ---
     try:
-        plan_pddl = generate_pddl_from_text(llm, tokenizer, problem_pddl, "plan",
+        plan_pddl = generate_pddl_from_text(client, problem_pddl, "plan",
                                             temperature=args.temperature,
                                             top_p=args.top_p,
                                             max_tokens=args.max_tokens)
@@ -1,9 +1,21 @@
 import os
 import sys
 import argparse
-import google.generativeai as genai
+from pathlib import Path
 
-def generate_pddl(model, nl_description, domain_name, mode):
+# api/ 의 공용 LLM 클라이언트를 사용합니다.
+API_DIR = Path(__file__).resolve().parents[2] / "api"
+if str(API_DIR) not in sys.path:
+    sys.path.append(str(API_DIR))
+
+from llm_client import LLM_BACKEND, AsyncLLMClient, clean_reply, make_backend  # noqa: E402
+
+MODEL_NAME = "gemini-flash-latest"
+# PDDL 한 파일을 생성하는 데 허용하는 시간(초)
+GENERATION_TIMEOUT_SEC = float(os.getenv("NLPDDL_TIMEOUT_SEC", "120"))
+
+
+def generate_pddl(client, nl_description, domain_name, mode):
     """Generate PDDL (problem or plan) from a natural language description."""
     if mode == "problem":
         prompt = (
@@ -22,8 +34,8 @@ def generate_pddl(model, nl_description, domain_name, mode):
     else:
         raise ValueError("Mode must be 'problem' or 'plan'")
 
-    response = model.generate_content(prompt)
-    return (response.text or "").strip()
+    response = client.generate_sync(prompt, timeout=GENERATION_TIMEOUT_SEC)
+    return clean_reply(response.text)
 
 
 def main():
@@ -54,23 +66,21 @@ def main():
     print("\n--- Generating PDDL files ---\n")
 
     # --- API Configuration ---
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    if LLM_BACKEND == "gemini" and not os.getenv("GOOGLE_API_KEY"):
         print("GOOGLE_API_KEY not set. Use: export GOOGLE_API_KEY=your_key", file=sys.stderr)
         sys.exit(1)
 
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('models/gemini-flash-latest')
+        client = AsyncLLMClient(make_backend([MODEL_NAME]))
     except Exception as e:
-        print(f"Error initializing Google AI: {e}", file=sys.stderr)
+        print(f"Error initializing LLM backend: {e}", file=sys.stderr)
         sys.exit(1)
 
     domain_name = "uav"
 
     # --- Generate problem.pddl ---
     try:
-        problem_pddl = generate_pddl(model, nl_prompt, domain_name, "problem")
+        problem_pddl = generate_pddl(client, nl_prompt, domain_name, "problem")
         with open(problem_path, "w", encoding="utf-8") as f:
             f.write(problem_pddl)
         print(f"Problem file saved to: {problem_path}")
@@ -80,7 +90,7 @@ def main():
 
     # --- Generate plan.pddl ---
     try:
-        plan_pddl = generate_pddl(model, problem_pddl, domain_name, "plan")
+        plan_pddl = generate_pddl(client, problem_pddl, domain_name, "plan")
         with open(plan_path, "w", encoding="utf-8") as f:
             f.write(plan_pddl)
         print(f"Plan file saved to: {plan_path}")
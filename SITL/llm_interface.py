@@ -1,35 +1,46 @@
 # llm_interface.py
-import google.generativeai as genai
-import config
 import logging
+import sys
+from pathlib import Path
+
+import config
 from prompts import SYSTEM_PROMPT
 
-# API 키 설정
+# api/ 의 공용 LLM 클라이언트를 사용합니다. (SITL 의 모듈이 같은 이름보다 우선하도록 뒤에 추가)
+API_DIR = Path(__file__).resolve().parents[1] / "api"
+if str(API_DIR) not in sys.path:
+    sys.path.append(str(API_DIR))
+
+from llm_client import LLM_BACKEND, AsyncLLMClient, clean_reply, make_backend  # noqa: E402
+
+MODEL_NAME = 'gemma-3-27b-it'
+
+# 백엔드 설정. 실제 연결은 첫 호출 때 이루어집니다.
 try:
-    genai.configure(api_key=config.GOOGLE_API_KEY)
-    model = genai.GenerativeModel('gemma-3-27b-it')
+    backend_kwargs = {"api_key": config.GOOGLE_API_KEY} if LLM_BACKEND == "gemini" else {}
+    client = AsyncLLMClient(make_backend([MODEL_NAME], **backend_kwargs))
 except Exception as e:
-    logging.error(f"Google AI SDK 설정에 실패했습니다. API 키를 확인하세요: {e}")
-    model = None
-    
+    logging.error(f"LLM 백엔드 설정에 실패했습니다: {e}")
+    client = None
+
 def get_drone_command(query: str) -> str:
     """
     사용자의 자연어 쿼리를 받아 LLM을 통해 JSON 형식의 드론 명령어로 변환합니다.
     """
-    
-    if not model:
+
+    if not client:
         logging.error("LLM 모델이 초기화되지 않았습니다.")
         return '{"error": "LLM model not initialized"}'
 
     try:
-        # 프롬프트와 사용자 쿼리를 함께 전달
+        # 프롬프트와 사용자 쿼리를 함께 전달 (gemma 는 시스템 지시를 받지 않으므로 한 프롬프트로 보냅니다)
         full_prompt = f"{SYSTEM_PROMPT}\n\nUser: \"{query}\"\nAssistant:"
-        response = model.generate_content(full_prompt)
-        
+        response = client.generate_sync(full_prompt)
+
         # 응답 텍스트에서 JSON 부분만 추출
-        cleaned_response = response.text.strip().replace('```json', '').replace('```', '').strip()
+        cleaned_response = clean_reply(response.text)
         logging.info(f"LLM 응답: {cleaned_response}")
         return cleaned_response
     except Exception as e:
         logging.error(f"LLM API 호출 중 오류 발생: {e}")
-        return f'{{"error": "LLM API call failed: {e}"}}'
\ No newline at end of file
+        return f'{{"error": "LLM API call failed: {e}"}}'
@@ -5,8 +5,18 @@
 파일 이름은 command_parser이지만, 실제 클래스 이름은 CommandExecutor로 하여 역할을 명확히 합니다.
 """
 
+import sys
+from pathlib import Path
+
 from drone_control import TelloDroneControl
 
+# 명령 스키마(DroneAPI/command_ir.py)를 api 서버, DroneAPI 와 함께 쓴다.
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from DroneAPI.command_ir import ACTIONS, Command, CommandError, bind
+
 class CommandExecutor:
     """
     LLM이 생성한 명령 딕셔너리를 받아, 해당하는 TelloDroneControl의 메소드를 실행합니다.
@@ -45,6 +55,8 @@ class CommandExecutor:
             "streamon": self.drone.streamon,
             "streamoff": self.drone.streamoff,
         }
+        # 비행 명령은 공용 스키마로 검증한 뒤 이 표로 바로 호출한다.
+        self.dispatch = bind(self.drone)
         print("[INFO] CommandExecutor 객체가 생성되었습니다.")
 
     def execute_command(self, command_data: dict):
@@ -67,6 +79,19 @@ class CommandExecutor:
             print(f"[LLM_ERROR] LLM이 명령을 처리하지 못했습니다: {reason}")
             return
 
+        # 비행 명령(이륙/이동/회전 등)은 실행 전에 한 번 검증해 잘못된 값이 드론에 가지 않게 합니다.
+        if command_name in ACTIONS:
+            try:
+                command = Command.from_tello(command_data)
+            except CommandError as e:
+                print(f"[ERROR] '{command_name}' 명령 실행 중 오류: 잘못된 파라미터입니다. {e}")
+                return
+            try:
+                self.dispatch[command.action](**command.to_tello()["parameters"])
+            except Exception as e:
+                print(f"[ERROR] '{command_name}' 명령 실행 중 예기치 않은 오류 발생: {e}")
+            return
+
         # command_map에서 실행할 함수를 찾습니다.
         func_to_execute = self.command_map.get(command_name)
 
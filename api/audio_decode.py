@@ -0,0 +1,215 @@
+import io
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import wave
+from typing import Optional
+
+import numpy as np
+
+try:
+    import av  # PyAV: 프로세스를 띄우지 않고 webm/opus 등을 메모리에서 디코딩한다.
+except ImportError:  # pragma: no cover - 없으면 ffmpeg 프로세스를 쓴다.
+    av = None
+
+# Whisper 가 받는 형식: 16 kHz 모노 float32 [-1, 1]
+SAMPLE_RATE = 16000
+# 미리 띄워 두는 ffmpeg 디코더 프로세스 수와 한 파일 디코딩 제한 시간(초).
+AUDIO_DECODER_POOL_SIZE = int(os.getenv("AUDIO_DECODER_POOL_SIZE", "2"))
+AUDIO_DECODE_TIMEOUT_SEC = float(os.getenv("AUDIO_DECODE_TIMEOUT_SEC", "30"))
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+
+_PCM_TYPES = {"audio/pcm", "audio/l16", "audio/x-raw", "application/octet-stream"}
+# 파이프로는 읽을 수 없는 컨테이너(moov 가 뒤에 있는 mp4 등)를 알아보는 확장자
+_SEEKABLE_ONLY = {".m4a", ".mp4", ".mov", ".3gp"}
+
+
+class AudioDecodeError(ValueError):
+    """The uploaded bytes could not be decoded as audio."""
+
+
+def to_mono_16k(samples: np.ndarray, rate: int) -> np.ndarray:
+    """``(frames,)`` or ``(frames, channels)`` samples at ``rate`` → 16 kHz mono float32."""
+    if samples.ndim == 2:
+        samples = samples.mean(axis=1)
+    samples = samples.astype(np.float32, copy=False)
+    if rate == SAMPLE_RATE or samples.size == 0:
+        return np.ascontiguousarray(samples)
+    if rate % SAMPLE_RATE == 0:
+        # 48k/32k 같은 정수배는 구간 평균(간단한 저역 통과)으로 줄인다.
+        factor = rate // SAMPLE_RATE
+        usable = samples.size - samples.size % factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1).astype(np.float32)
+    duration = samples.size / rate
+    target = np.arange(int(duration * SAMPLE_RATE), dtype=np.float64) / SAMPLE_RATE
+    source = np.arange(samples.size, dtype=np.float64) / rate
+    return np.interp(target, source, samples).astype(np.float32)
+
+
+def pcm16_to_float(data: bytes) -> np.ndarray:
+    usable = len(data) - len(data) % 2
+    return np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+
+
+def _decode_wav(data: bytes) -> Optional[np.ndarray]:
+    """PCM WAV with the stdlib reader; None for formats it does not handle (float, ADPCM...)."""
+    try:
+        with wave.open(io.BytesIO(data)) as reader:
+            channels = reader.getnchannels()
+            width = reader.getsampwidth()
+            rate = reader.getframerate()
+            frames = reader.readframes(reader.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        samples = ints.astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        return None
+    return to_mono_16k(samples.reshape(-1, channels), rate)
+
+
+def _decode_pyav(data: bytes) -> np.ndarray:
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+    chunks = []
+    try:
+        with av.open(io.BytesIO(data), mode="r") as container:
+            for frame in container.decode(audio=0):
+                for resampled in resampler.resample(frame):
+                    chunks.append(resampled.to_ndarray().reshape(-1))
+            for resampled in resampler.resample(None):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+    except (av.AVError, ValueError, IndexError) as exc:
+        raise AudioDecodeError(f"오디오를 디코딩하지 못했습니다: {exc}") from exc
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks).astype(np.float32) / 32768.0
+
+
+class FFmpegDecoderPool:
+    """ffmpeg processes started ahead of time, each waiting for one file on stdin.
+
+    Decoding hands the bytes to a process that is already running and reads
+    16 kHz mono PCM from its stdout, so the request does not pay the process
+    start-up; a replacement is started in the background right away.
+    """
+
+    def __init__(self, size: int = AUDIO_DECODER_POOL_SIZE, timeout: float = AUDIO_DECODE_TIMEOUT_SEC) -> None:
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._ready: "queue.SimpleQueue[subprocess.Popen]" = queue.SimpleQueue()
+        self._started = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _spawn(source: str = "pipe:0") -> subprocess.Popen:
+        command = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error"]
+        if source != "pipe:0":
+            command.append("-nostdin")
+        command += ["-i", source, "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "pipe:1"]
+        try:
+            return subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError as exc:
+            raise AudioDecodeError(f"ffmpeg 을 찾을 수 없습니다({FFMPEG_BIN}). ffmpeg 를 설치해 주세요.") from exc
+
+    def _refill(self) -> None:
+        try:
+            self._ready.put(self._spawn())
+        except AudioDecodeError as exc:
+            print(f"[AUDIO WARNING] {exc}")
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self.size):
+            self._refill()
+
+    def _take(self) -> subprocess.Popen:
+        self.start()
+        while True:
+            try:
+                process = self._ready.get_nowait()
+            except queue.Empty:
+                return self._spawn()
+            if process.poll() is None:
+                return process
+
+    def decode(self, data: bytes, suffix: str = "") -> np.ndarray:
+        if suffix in _SEEKABLE_ONLY:
+            return self._decode_file(data, suffix)
+        process = self._take()
+        threading.Thread(target=self._refill, name="ffmpeg-refill", daemon=True).start()
+        pcm, error = self._communicate(process, data)
+        if process.returncode != 0:
+            raise AudioDecodeError(f"ffmpeg 디코딩에 실패했습니다: {error.decode('utf-8', 'replace').strip()}")
+        return pcm16_to_float(pcm)
+
+    def _decode_file(self, data: bytes, suffix: str) -> np.ndarray:
+        # moov 가 파일 끝에 있는 mp4 계열은 파이프로 읽을 수 없어 이때만 임시 파일을 쓴다.
+        with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+            tmp.write(data)
+            tmp.flush()
+            process = self._spawn(tmp.name)
+            pcm, error = self._communicate(process, None)
+        if process.returncode != 0:
+            raise AudioDecodeError(f"ffmpeg 디코딩에 실패했습니다: {error.decode('utf-8', 'replace').strip()}")
+        return pcm16_to_float(pcm)
+
+    def _communicate(self, process: subprocess.Popen, data: Optional[bytes]):
+        try:
+            return process.communicate(input=data, timeout=self.timeout)
+        except subprocess.TimeoutExpired as exc:
+            process.kill()
+            process.communicate()
+            raise AudioDecodeError(f"오디오 디코딩이 {self.timeout:.0f}초 안에 끝나지 않았습니다.") from exc
+
+
+decoder_pool = FFmpegDecoderPool()
+
+
+def start_decoders() -> None:
+    """Pre-spawn the ffmpeg pool when PyAV is not there to decode in-process."""
+    if av is None:
+        decoder_pool.start()
+
+
+def decode_audio(data: bytes, filename: str = "", content_type: Optional[str] = None) -> np.ndarray:
+    """Uploaded audio bytes → 16 kHz mono float32 array, without touching the disk.
+
+    WAV and raw 16-bit PCM (``audio/pcm``/``audio/l16``, ``;rate=`` honoured)
+    are converted in-process; other containers (webm/opus from the browser,
+    ogg, mp3...) go through PyAV when installed, else the warm ffmpeg pool.
+    """
+    if not data:
+        raise AudioDecodeError("오디오 데이터가 비어 있습니다.")
+    mime, _, params = (content_type or "").partition(";")
+    mime = mime.strip().lower()
+    suffix = os.path.splitext(filename or "")[1].lower()
+
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        samples = _decode_wav(data)
+        if samples is not None:
+            return samples
+    elif mime in _PCM_TYPES and suffix not in {".webm", ".ogg", ".mp3", ".m4a", ".flac", ".wav"}:
+        rate = SAMPLE_RATE
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "rate" and value.isdigit():
+                rate = int(value)
+        return to_mono_16k(pcm16_to_float(data), rate)
+
+    if av is not None:
+        return _decode_pyav(data)
+    return decoder_pool.decode(data, suffix)
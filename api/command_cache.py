@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from command_parser import normalize_numerals
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# 발화 → LLM 응답 캐시. 0 이면 끈다. TTL 이 지난 항목은 다시 LLM 에 묻는다.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", str(BASE_DIR / "llm_cache" / "commands.sqlite3")))
+LLM_CACHE_TTL_SEC = float(os.getenv("LLM_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+
+_PUNCTUATION = re.compile(r"[^\w\s.]")
+_THOUSANDS = re.compile(r"(?<=\d),(?=\d{3}\b)")
+_NUMBER_UNIT = re.compile(r"(\d)\s+(?=[^\W\d])")
+_STRAY_DOT = re.compile(r"(?<!\d)\.|\.(?!\d)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_utterance(text: str) -> str:
+    """Canonical form of a transcript: 같은 명령이면 공백/문장부호/숫자 표기(1미터, 일 미터)가 달라도 같게 만든다."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _THOUSANDS.sub("", text)
+    text = _PUNCTUATION.sub(" ", text)
+    text = _STRAY_DOT.sub(" ", text)
+    text = _NUMBER_UNIT.sub(r"\1", text)
+    text = normalize_numerals(text)
+    return _SPACES.sub(" ", text).strip()
+
+
+class CommandCache:
+    """LRU of LLM command responses in memory, backed by a sqlite table.
+
+    Entries are keyed on the normalized utterance, the prompt version and the
+    model name, so editing the prompt or switching models never serves a
+    stale plan. Values are the ``(display_text, payload)`` of a response.
+    """
+
+    def __init__(
+        self,
+        path: Path = LLM_CACHE_PATH,
+        ttl: float = LLM_CACHE_TTL_SEC,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = {"memory": 0, "disk": 0}
+        self._misses = 0
+        self._stores = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                utterance TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(utterance: str, prompt_version: str, model: str) -> str:
+        raw = "\0".join((normalize_utterance(utterance), prompt_version, model))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            return self._count(self._find(key, time.time()))
+
+    def lookup(self, utterance: str, prompt_version: str, models: Sequence[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """First cached response for ``utterance`` from any of ``models``, counted as one hit or miss."""
+        now = time.time()
+        with self._lock:
+            found = None
+            for model in models:
+                found = self._find(self.make_key(utterance, prompt_version, model), now)
+                if found is not None:
+                    break
+            return self._count(found)
+
+    def _find(self, key: str, now: float) -> Optional[Tuple[str, str]]:
+        """``(tier, value)`` of a live entry; the caller holds the lock."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            if now - entry[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                return "memory", entry[1]
+            del self._memory[key]
+        row = self._db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            return None
+        self._remember(key, row[1], row[0])
+        return "disk", row[0]
+
+    def _count(self, found: Optional[Tuple[str, str]]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if found is None:
+            self._misses += 1
+            return None
+        tier, value = found
+        self._hits[tier] += 1
+        return self._decode(value)
+
+    def put(self, key: str, utterance: str, prompt_version: str, model: str, display_text: str, payload: Dict[str, Any]) -> None:
+        value = json.dumps({"display_text": display_text, "payload": payload}, ensure_ascii=False)
+        created_at = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, normalize_utterance(utterance), prompt_version, model, value, created_at),
+            )
+            self._db.commit()
+            self._remember(key, created_at, value)
+            self._stores += 1
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            removed = self._db.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,)).rowcount
+            self._db.commit()
+            for key in [key for key, (created_at, _) in self._memory.items() if created_at < cutoff]:
+                del self._memory[key]
+        return removed
+
+    def _remember(self, key: str, created_at: float, value: str) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _decode(value: str) -> Tuple[str, Dict[str, Any]]:
+        # 호출자가 payload 를 고쳐도 캐시가 오염되지 않도록 매번 새로 만든다.
+        entry = json.loads(value)
+        return entry["display_text"], entry["payload"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._hits["memory"] + self._hits["disk"]
+            lookups = hits + self._misses
+            return {
+                "enabled": True,
+                "memory_entries": len(self._memory),
+                "memory_limit": self.memory_entries,
+                "disk_entries": self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0],
+                "ttl_sec": self.ttl,
+                "hits": dict(self._hits, total=hits),
+                "misses": self._misses,
+                "stores": self._stores,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
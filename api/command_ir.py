@@ -0,0 +1,37 @@
+"""Typed drone command IR.
+
+The implementation lives in DroneAPI/command_ir.py so the api server, the
+DroneAPI mission executor and the SITL/tello console validate commands
+with the same schema; this module re-exports it for the api modules.
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from DroneAPI.command_ir import (  # noqa: E402
+    ACTIONS,
+    ActionSpec,
+    Command,
+    CommandError,
+    CommandPlan,
+    ParamSpec,
+    bind,
+    extract_json_payload,
+    json_objects,
+)
+
+__all__ = [
+    "ACTIONS",
+    "ActionSpec",
+    "Command",
+    "CommandError",
+    "CommandPlan",
+    "ParamSpec",
+    "bind",
+    "extract_json_payload",
+    "json_objects",
+]
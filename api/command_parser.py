@@ -0,0 +1,334 @@
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# 규칙 기반 해석의 신뢰도가 이 값 이상이면 LLM 을 거치지 않는다. 0 이면 해석기를 끈다.
+COMMAND_FASTPATH_ENABLED = os.getenv("COMMAND_FASTPATH_ENABLED", "1") != "0"
+COMMAND_FASTPATH_MIN_CONFIDENCE = float(os.getenv("COMMAND_FASTPATH_MIN_CONFIDENCE", "0.9"))
+
+# 프롬프트의 기본값과 맞춘다: 고도 미지시 이륙은 100cm.
+DEFAULT_TAKEOFF_ALTITUDE_CM = 100
+
+# 어휘는 LLM/tello_dataset.py 의 command_map 을 바탕으로 API 에 있는 동작만 남기고 넓혔다.
+_EMERGENCY = re.compile(r"비상\s*정지|비상\s*착륙|긴급\s*(?:정지|상황)?|모터\s*(?:꺼|정지)|emergency")
+_SPEED = re.compile(r"속도|초속|스피드")
+_TAKEOFF = re.compile(r"이륙|띄워|날아\s*올라|떠올라|takeoff")
+_LAND = re.compile(r"착륙|내려\s*앉|땅으로|드론\s*내려|land")
+_ROTATE = re.compile(r"회전|돌아|돌려|돌기|틀어|틀(?=\s|$)|턴")
+_BARE_DOWN = re.compile(r"내려(?:와|줘|가지|가|요)?(?=\s|$)")
+# "착륙하지 마", "비상 정지 하지마", "왼쪽 말고" 처럼 명령을 부정하는 말. 해석기는 부정을 다루지 않는다.
+_NEGATION = re.compile(r"지\s*(?:마|말)|(?<![가-힣])(?:마|말|말고|말아|마요|마세요|말아요)(?=\s|[,.!?]|$)|하지\s*않|안\s*(?:돼|되)")
+# 지상에서 할 수 없는 동작. 앞에 이륙이 없으면 프롬프트 규칙 2처럼 기본 이륙을 넣는다.
+_AIRBORNE_ACTIONS = {"up", "down", "left", "right", "forward", "back", "cw", "ccw"}
+_ROTATE_DIRECTIONS = (
+    (re.compile(r"반\s*시계|왼쪽|좌측|좌회전|ccw"), "ccw"),
+    (re.compile(r"시계|오른쪽|우측|우회전|cw"), "cw"),
+)
+_MOVE_DIRECTIONS = (
+    (re.compile(r"앞으로|앞쪽|전진|직진|forward"), "forward"),
+    (re.compile(r"뒤로|뒤쪽|후진|후방|back"), "back"),
+    (re.compile(r"왼쪽|좌측"), "left"),
+    (re.compile(r"오른쪽|우측"), "right"),
+    (re.compile(r"위로|위쪽|올라|상승|높이"), "up"),
+    (re.compile(r"아래로|아래쪽|내려|하강|낮춰"), "down"),
+)
+
+# 동사 어미/조사/높임말 등 의미를 바꾸지 않는 말. 이것 말고 남는 말이 있으면 신뢰도를 낮춘다.
+_FILLER = re.compile(
+    r"(?:드론[을이은]?|좀|만큼|정도|쪽|방향|으로|로|까지|"
+    r"이동|움직여|날아|가|갔|와|왔|해|하|줘|주세요|주라|세요|요|라|고|한|해서|하게|게|면|서|"
+    r"높이|고도|에서|에|을|를|은|는|이|만|씩|번|다시|바로|지금|빠르게|도록)+"
+)
+
+_SINO_DIGITS = {"영": 0, "공": 0, "일": 1, "이": 2, "삼": 3, "사": 4, "오": 5, "육": 6, "륙": 6, "칠": 7, "팔": 8, "구": 9}
+_SINO_UNITS = {"십": 10, "백": 100, "천": 1000}
+_NATIVE_TENS = {"열": 10, "스물": 20, "스무": 20, "서른": 30, "마흔": 40, "쉰": 50, "예순": 60, "일흔": 70, "여든": 80, "아흔": 90}
+_NATIVE_ONES = {
+    "하나": 1, "한": 1, "둘": 2, "두": 2, "셋": 3, "세": 3, "석": 3, "넷": 4, "네": 4, "넉": 4,
+    "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9,
+}
+
+_NATIVE_PATTERN = (
+    f"(?:{'|'.join(sorted(_NATIVE_TENS, key=len, reverse=True))})"
+    f"(?:{'|'.join(sorted(_NATIVE_ONES, key=len, reverse=True))})?"
+    f"|(?:{'|'.join(sorted(_NATIVE_ONES, key=len, reverse=True))})"
+)
+_NUMBER = (
+    r"\d+(?:\.\d+)?(?:\s*[십백천만])*"
+    r"|(?<![가-힣])[영공일이삼사오육륙칠팔구십백천만]+"
+    rf"|(?<![가-힣])(?:{_NATIVE_PATTERN})"
+)
+# (단위 정규식, 종류, 배율). 거리는 cm, 각도는 도, 속도는 cm/s 로 맞춘다.
+_UNITS: Tuple[Tuple[str, str, float], ...] = (
+    (r"(?:cm|센티미터|센치미터|센티|센치)\s*(?:/\s*s|퍼\s*세컨드)", "speed", 1),
+    (r"(?:m|미터)\s*(?:/\s*s|퍼\s*세컨드)", "speed", 100),
+    (r"킬로미터|킬로|km", "distance", 100000),
+    (r"밀리미터|밀리|mm", "distance", 0.1),
+    (r"센티미터|센치미터|센티|센치|cm", "distance", 1),
+    (r"미터|메타|m(?![a-z])", "distance", 100),
+    (r"바퀴", "angle", 360),
+    (r"도(?![착달])|°|degree", "angle", 1),
+)
+_QUANTITY = re.compile(
+    rf"(?P<num>{_NUMBER})\s*(?P<unit>{'|'.join(f'(?:{pattern})' for pattern, _, _ in _UNITS)})"
+)
+_BARE_NUMBER = re.compile(rf"(?P<num>{_NUMBER})")
+_UNIT_PATTERNS = [(re.compile(pattern), kind, scale) for pattern, kind, scale in _UNITS]
+
+# 복합 명령의 연결어: "이륙하고", "틀고", "이륙해서", "갔다가", "그리고", "한 후", "다음에", 쉼표 등.
+_CLAUSE_SPLIT = re.compile(
+    r"\s*(?:[,!?;]|(?<!\d)\.|\.(?!\d)|그리고|그\s*다음에?|그\s*뒤에?|(?<=[가-힣])고\s+나서|(?<=[가-힣])(?:하고|고|해서|서|다가)(?=\s|$)|"
+    r"(?:(?<=[가-힣])|\s)(?:한|하고\s*나서|나서)?\s*(?:후에?|뒤에|다음에?)(?=\s|$))\s*"
+)
+
+_ACTION_NAMES = {
+    "takeoff": "이륙",
+    "land": "착륙",
+    "emergency": "비상 정지",
+    "speed": "속도",
+    "up": "상승",
+    "down": "하강",
+    "left": "왼쪽 이동",
+    "right": "오른쪽 이동",
+    "forward": "전진",
+    "back": "후진",
+    "cw": "시계 방향 회전",
+    "ccw": "반시계 방향 회전",
+}
+
+
+def normalize_numerals(text: str) -> str:
+    """Write every number that has a unit in Arabic digits: "일 미터", "1 미터" -> "1미터"."""
+
+    def arabic(match: "re.Match[str]") -> str:
+        value = parse_korean_number(match.group("num"))
+        if value is None:
+            return match.group(0)
+        number = str(int(value)) if value.is_integer() else str(value)
+        return f"{number}{match.group('unit')}"
+
+    return _QUANTITY.sub(arabic, text)
+
+
+def parse_korean_number(token: str) -> Optional[float]:
+    """Arabic ("50", "2.5"), Sino-Korean ("이백", "2백") or native ("스물두", "한") numerals."""
+    token = token.replace(" ", "")
+    if not token:
+        return None
+    native = _parse_native(token)
+    if native is not None:
+        return native
+    total, section, digit = 0.0, 0.0, None
+    idx = 0
+    while idx < len(token):
+        char = token[idx]
+        if char.isdigit():
+            match = re.match(r"\d+(?:\.\d+)?", token[idx:])
+            digit = float(match.group(0))
+            idx += len(match.group(0))
+            continue
+        if char in _SINO_DIGITS:
+            digit = float(_SINO_DIGITS[char])
+        elif char in _SINO_UNITS:
+            section += (1.0 if digit is None else digit) * _SINO_UNITS[char]
+            digit = None
+        elif char == "만":
+            total += (section + (digit or 0.0) or 1.0) * 10000
+            section, digit = 0.0, None
+        else:
+            return None
+        idx += 1
+    return total + section + (digit or 0.0)
+
+
+def _parse_native(token: str) -> Optional[float]:
+    value, rest = 0, token
+    for word in sorted(_NATIVE_TENS, key=len, reverse=True):
+        if rest.startswith(word):
+            value, rest = _NATIVE_TENS[word], rest[len(word):]
+            break
+    for word in sorted(_NATIVE_ONES, key=len, reverse=True):
+        if rest == word:
+            return float(value + _NATIVE_ONES[word])
+    return float(value) if value and not rest else None
+
+
+@dataclass
+class ParseResult:
+    commands: List[Dict[str, Any]]
+    confidence: float
+    # 절마다 해석에 실패하거나 신뢰도를 낮춘 이유
+    notes: List[str] = field(default_factory=list)
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        return {"commands": self.commands}
+
+    def describe(self) -> str:
+        """Short summary followed by the JSON block, shaped like an LLM reply."""
+        steps = []
+        for command in self.commands:
+            name = _ACTION_NAMES.get(command["action"], command["action"])
+            params = command["params"]
+            steps.append(f"{name} {' '.join(str(value) for value in params.values())}".strip())
+        summary = " → ".join(steps)
+        lines = ",\n".join(f"    {json.dumps(command, ensure_ascii=False)}" for command in self.commands)
+        body = f'{{\n  "commands": [\n{lines}\n  ]\n}}'
+        return f"**1) 요약**\n규칙 기반 해석: {summary} (신뢰도 {self.confidence:.2f})\n\n**2) 최종 명령어(JSON)**\n```json\n{body}\n```"
+
+
+@dataclass
+class _Clause:
+    text: str
+    spans: List[Tuple[int, int]] = field(default_factory=list)
+
+    def find(self, pattern: "re.Pattern[str]") -> Optional["re.Match[str]"]:
+        """First match of ``pattern``; every match counts as understood ("위로 올라가")."""
+        matches = list(pattern.finditer(self.text))
+        self.spans.extend(match.span() for match in matches)
+        return matches[0] if matches else None
+
+    def leftover(self) -> List[str]:
+        chars = list(self.text)
+        for start, end in self.spans:
+            chars[start:end] = " " * (end - start)
+        return [token for token in "".join(chars).split() if not _FILLER.fullmatch(token)]
+
+
+def _quantities(clause: _Clause) -> List[Tuple[str, float]]:
+    found = []
+    for match in _QUANTITY.finditer(clause.text):
+        value = parse_korean_number(match.group("num"))
+        if value is None:
+            continue
+        unit = match.group("unit")
+        for pattern, kind, scale in _UNIT_PATTERNS:
+            if pattern.fullmatch(unit):
+                found.append((kind, value * scale))
+                clause.spans.append(match.span())
+                break
+    return found
+
+
+def _amount(value: float) -> Any:
+    rounded = round(value)
+    return int(rounded) if abs(value - rounded) < 1e-6 else round(value, 2)
+
+
+def _parse_clause(text: str) -> Tuple[List[Dict[str, Any]], float, Optional[str]]:
+    """Commands of one clause, its confidence and why it was not fully understood."""
+    clause = _Clause(text)
+    quantities = _quantities(clause)
+    distances = [value for kind, value in quantities if kind == "distance"]
+    angles = [value for kind, value in quantities if kind == "angle"]
+    speeds = [value for kind, value in quantities if kind == "speed"]
+
+    if clause.find(_EMERGENCY):
+        commands = [{"action": "emergency", "params": {}}]
+    elif clause.find(_SPEED):
+        if not speeds:
+            bare = _BARE_NUMBER.search(text, clause.spans[-1][1])
+            value = parse_korean_number(bare.group("num")) if bare else None
+            if value is None:
+                return [], 0.0, f"속도 값이 없습니다: {text}"
+            clause.spans.append(bare.span())
+            # 단위가 없는 속도는 API 와 같은 cm/s 로 본다(미터 단위 거리가 같이 오면 m/s).
+            speeds = [value * 100 if distances else value]
+            distances = []
+        commands = [{"action": "speed", "params": {"value": _amount(speeds[0])}}]
+    elif clause.find(_TAKEOFF):
+        altitude = distances[0] if distances else DEFAULT_TAKEOFF_ALTITUDE_CM
+        commands = [{"action": "takeoff", "params": {"altitude": _amount(altitude)}}]
+        distances = distances[1:]
+    elif clause.find(_LAND):
+        commands = [{"action": "land", "params": {}}]
+    elif clause.find(_ROTATE) or angles:
+        for pattern, action in _ROTATE_DIRECTIONS:
+            if clause.find(pattern):
+                break
+        else:
+            return [], 0.0, f"회전 방향이 없습니다: {text}"
+        if not angles:
+            return [], 0.3, f"회전 각도가 없습니다: {text}"
+        commands = [{"action": action, "params": {"degree": _amount(angles[0])}}]
+        angles = angles[1:]
+    else:
+        for pattern, action in _MOVE_DIRECTIONS:
+            if clause.find(pattern):
+                break
+        else:
+            return [], 0.0, f"알 수 없는 명령입니다: {text}"
+        if not distances:
+            if action == "down" and _BARE_DOWN.search(text):
+                # "내려" 처럼 거리 없이 내려오라는 말은 착륙으로 본다.
+                return [{"action": "land", "params": {}}], 0.9, None
+            return [], 0.3, f"이동 거리가 없습니다: {text}"
+        commands = [{"action": action, "params": {"distance": _amount(distances[0])}}]
+        distances = distances[1:]
+
+    if distances or angles or (speeds and commands[0]["action"] != "speed"):
+        return commands, 0.5, f"쓰이지 않은 수치가 있습니다: {text}"
+    leftover = clause.leftover()
+    if leftover:
+        return commands, max(0.3, 0.85 - 0.15 * (len(leftover) - 1)), f"해석하지 못한 말: {' '.join(leftover)}"
+    return commands, 1.0, None
+
+
+def split_clauses(text: str) -> List[str]:
+    """Split an utterance into clauses; a period between digits stays a decimal point.
+
+    >>> split_clauses("뒤로 1.5미터 이동해. 착륙해")
+    ['뒤로 1.5미터 이동해', '착륙해']
+    """
+    return [part.strip() for part in _CLAUSE_SPLIT.split(text) if part and part.strip()]
+
+
+def parse_command(text: str) -> ParseResult:
+    """Parse a Korean utterance into API commands without calling the LLM.
+
+    Like the prompts, a move or rotation without a preceding takeoff gets a
+    ``takeoff(DEFAULT_TAKEOFF_ALTITUDE_CM)`` in front of it; the default
+    speed (30 cm/s) is already the API's, and no landing is added. Anything
+    the parser cannot fully explain, including negations, gets a low
+    confidence and should go to the LLM instead.
+    """
+    lowered = text.lower().strip()
+    if not lowered:
+        return ParseResult([], 0.0, ["빈 발화입니다."])
+    if _NEGATION.search(lowered):
+        return ParseResult([], 0.0, [f"부정 표현은 해석하지 않습니다: {text}"])
+    commands: List[Dict[str, Any]] = []
+    notes: List[str] = []
+    confidence = 1.0
+    for clause in split_clauses(lowered):
+        clause_commands, clause_confidence, note = _parse_clause(clause)
+        commands.extend(clause_commands)
+        confidence = min(confidence, clause_confidence)
+        if note:
+            notes.append(note)
+    if not commands:
+        confidence = 0.0
+    return ParseResult(_with_takeoff(commands), round(confidence, 3), notes)
+
+
+def _with_takeoff(commands: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert the default takeoff before any move/rotation that would start on the ground."""
+    planned: List[Dict[str, Any]] = []
+    airborne = False
+    for command in commands:
+        action = command["action"]
+        if action in _AIRBORNE_ACTIONS and not airborne:
+            # 바로 앞의 속도 설정보다 먼저 이륙한다(이륙 → 속도 → 이동 순서).
+            position = len(planned)
+            while position and planned[position - 1]["action"] == "speed":
+                position -= 1
+            planned.insert(position, {"action": "takeoff", "params": {"altitude": DEFAULT_TAKEOFF_ALTITUDE_CM}})
+            airborne = True
+        if action == "takeoff":
+            airborne = True
+        elif action in ("land", "emergency"):
+            airborne = False
+        planned.append(command)
+    return planned
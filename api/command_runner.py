@@ -1,27 +1,45 @@
-import contextlib
-import io
 import json
+import os
+import queue
 import sys
 import threading
 import uuid
 from dataclasses import dataclass
-from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 BASE_DIR = Path(__file__).resolve().parent
 COMMAND_HISTORY_DIR = BASE_DIR / "command_history"
 COMMAND_HISTORY_DIR.mkdir(parents=True, exist_ok=True)
 COMMAND_LOG_DIR = BASE_DIR / "command_logs"
 COMMAND_LOG_DIR.mkdir(parents=True, exist_ok=True)
+COMMAND_ARCHIVE_DIR = BASE_DIR / "command_archive"
+COMMAND_EVENT_DIR = BASE_DIR / "command_events"
 
 # Ensure the DroneAPI package is importable when running uvicorn from api/
 PROJECT_ROOT = BASE_DIR.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
-from drone_api import DroneTimeBasedAPI  # type: ignore  # noqa: E402
+from command_ir import Command, CommandPlan, bind  # noqa: E402
+from drone_api import CommandCancelled, DroneTimeBasedAPI  # type: ignore  # noqa: E402
+from event_log import JobEventLog  # noqa: E402
+from job_context import JOB_CAPTURE_STDOUT, JobSink, bind_job, install_stdout_shim  # noqa: E402
+from job_events import JobEventHub  # noqa: E402
+from job_retention import JobArchive, JobRetention  # noqa: E402
+from job_scheduler import JobPriority, JobQueueFull, JobScheduler  # noqa: E402
+from log_store import JobLogStore  # noqa: E402
+from sim_clock import make_clock  # noqa: E402
+
+# 완료 로그의 마지막 줄. 재시작 후 디스크에서만 읽히는 작업의 상태 추정에 쓴다.
+_SUCCESS_MESSAGE = " 모든 명령을 성공적으로 마쳤습니다."
+
+# 기체 ID 를 지정하지 않은 작업이 명령하는 드론. 같은 기체의 작업은 직렬로 실행된다.
+DEFAULT_VEHICLE_ID = os.getenv("DRONE_ID", "drone-1")
+_EMERGENCY_ACTIONS = {"emergency"}
+# 이 명령들로만 이루어진 계획도 비상 작업으로 보고 실행 중인 작업을 선점한다.
+_CONTROL_ACTIONS = _EMERGENCY_ACTIONS | {"land"}
 
 
 class JobStatus(str, Enum):
@@ -29,10 +47,10 @@ class JobStatus(str, Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
-def _timestamp() -> str:
-    return datetime.now().strftime("%H:%M:%S")
+TERMINAL_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED}
 
 
 def save_command_payload(job_id: str, payload: Dict[str, Any]) -> Path:
@@ -43,6 +61,61 @@ def save_command_payload(job_id: str, payload: Dict[str, Any]) -> Path:
     return path
 
 
+class CommandStreamError(RuntimeError):
+    """The producer of a streamed job failed before it finished its command list."""
+
+
+class CommandFeed:
+    """Commands of a job that are still being generated.
+
+    The producer calls ``push`` for every completed command and ``close``
+    when the list is complete (or failed); the job iterates the feed and
+    blocks until the next command arrives. The first emergency command
+    pushed calls ``on_emergency`` so the job can be escalated.
+    """
+
+    _CLOSE = object()
+    _WAKE = object()
+
+    def __init__(self) -> None:
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self.cancel: Optional[threading.Event] = None
+        self.on_emergency: Optional[Callable[[], None]] = None
+        self.emergency = False
+        self.pushed = 0
+
+    def push(self, command: Union[Command, Dict[str, Any]]) -> None:
+        """Queue one command; dicts are validated here so the job never sees a bad one."""
+        if not isinstance(command, Command):
+            command = Command.from_dict(command)
+        self.pushed += 1
+        self._queue.put(command)
+        if command.action in _EMERGENCY_ACTIONS and not self.emergency:
+            self.emergency = True
+            if self.on_emergency is not None:
+                self.on_emergency()
+
+    def close(self, error: Optional[str] = None) -> None:
+        self._queue.put((self._CLOSE, error))
+
+    def interrupt(self) -> None:
+        """Wake a job blocked on the next command so it can notice cancellation."""
+        self._queue.put(self._WAKE)
+
+    def __iter__(self) -> Iterator[Command]:
+        while True:
+            item = self._queue.get()
+            if self.cancel is not None and self.cancel.is_set():
+                raise CommandCancelled()
+            if item is self._WAKE:
+                continue
+            if isinstance(item, tuple) and item and item[0] is self._CLOSE:
+                if item[1]:
+                    raise CommandStreamError(item[1])
+                return
+            yield item
+
+
 @dataclass
 class JobLogs:
     logs: List[str]
@@ -53,133 +126,342 @@ class JobLogs:
 class ExecutionManager:
     """Run drone commands sequentially and keep per-job logs."""
 
-    def __init__(self) -> None:
-        self._logs: Dict[str, List[str]] = {}
+    def __init__(self, scheduler: Optional[JobScheduler] = None) -> None:
+        archive = JobArchive(COMMAND_ARCHIVE_DIR)
+        self._log_store = JobLogStore(COMMAND_LOG_DIR, archive=archive)
+        self._event_log = JobEventLog(COMMAND_EVENT_DIR, self._log_store.writer, archive=archive)
+        self.events = JobEventHub()
+        self.scheduler = scheduler or JobScheduler()
+        self.retention = JobRetention(
+            evict=self._evict,
+            is_active=self._log_store.is_active,
+            log_dir=COMMAND_LOG_DIR,
+            history_dir=COMMAND_HISTORY_DIR,
+            events_dir=COMMAND_EVENT_DIR,
+            archive=archive,
+        )
         self._status: Dict[str, JobStatus] = {}
-        self._log_files: Dict[str, Path] = {}
+        # 실행 중인 작업의 시뮬레이션 시계. 로그 시각과 명령 소요 시간을 이 시계로 잰다.
+        self._clocks: Dict[str, Any] = {}
+        # 대기/실행 중인 작업의 취소 신호
+        self._cancels: Dict[str, threading.Event] = {}
+        self._feeds: Dict[str, CommandFeed] = {}
         self._latest_job_id: Optional[str] = None
         self._lock = threading.Lock()
-
-    def start_job(self, commands: List[Dict[str, Any]]) -> str:
-        if not commands:
+        if JOB_CAPTURE_STDOUT:
+            install_stdout_shim()
+
+    def start_job(
+        self,
+        commands: Iterable[Union[Command, Dict[str, Any]]],
+        vehicle_id: Optional[str] = None,
+        priority: Optional[JobPriority] = None,
+    ) -> str:
+        """Validate ``commands`` once (raising CommandError, a ValueError) and queue them."""
+        plan = commands if isinstance(commands, CommandPlan) else CommandPlan.from_items(commands, strict=True)
+        if not plan:
             raise ValueError("commands list is empty.")
-
+        if priority is None:
+            priority = _infer_priority(plan)
+        return self._submit(list(plan), vehicle_id or DEFAULT_VEHICLE_ID, priority)
+
+    def start_streaming_job(
+        self,
+        vehicle_id: Optional[str] = None,
+        first: Optional[Union[Command, Dict[str, Any]]] = None,
+        priority: Optional[JobPriority] = None,
+    ) -> Tuple[str, CommandFeed]:
+        """Queue a job whose commands arrive later through the returned feed.
+
+        The priority comes from ``first`` (the first generated command) unless
+        given; an emergency command pushed later escalates the job and
+        preempts the vehicle as if it had been submitted that way.
+        """
+        feed = CommandFeed()
+        if first is not None:
+            first = first if isinstance(first, Command) else Command.from_dict(first)
+            feed.push(first)
+        if priority is None:
+            priority = _infer_priority([first]) if first is not None else JobPriority.NORMAL
+        vehicle_id = vehicle_id or DEFAULT_VEHICLE_ID
+        job_id = self._submit(feed, vehicle_id, priority)
+        feed.on_emergency = lambda: self._escalate(job_id, vehicle_id)
+        return job_id, feed
+
+    def _submit(self, commands: Iterable[Command], vehicle_id: str, priority: JobPriority) -> str:
         job_id = str(uuid.uuid4())
         with self._lock:
             self._status[job_id] = JobStatus.PENDING
-            self._logs[job_id] = []
-            log_path = COMMAND_LOG_DIR / f"{job_id}.log"
-            log_path.write_text("", encoding="utf-8")
-            self._log_files[job_id] = log_path
+            self._cancels[job_id] = threading.Event()
+            if isinstance(commands, CommandFeed):
+                commands.cancel = self._cancels[job_id]
+                self._feeds[job_id] = commands
+            self._log_store.create(job_id)
+            self._event_log.create(job_id)
             self._latest_job_id = job_id
 
-        worker = threading.Thread(
-            target=self._run_job,
-            args=(job_id, commands),
-            daemon=True,
+        if priority == JobPriority.EMERGENCY:
+            self._preempt(vehicle_id, job_id)
+
+        try:
+            ahead = self.scheduler.submit(
+                job_id,
+                lambda: self._run_job(job_id, commands),
+                key=vehicle_id,
+                priority=priority,
+            )
+        except JobQueueFull as exc:
+            self._log(job_id, f" 작업이 거부되었습니다: {exc}", "error", reason="queue_full")
+            self._set_status(job_id, JobStatus.FAILED)
+            self._close_logs(job_id)
+            with self._lock:
+                self._cancels.pop(job_id, None)
+                self._feeds.pop(job_id, None)
+            raise
+
+        self._log(
+            job_id,
+            f"대기열에 추가되었습니다. (기체={vehicle_id}, 우선순위={priority.name.lower()}, 앞선 작업={ahead})",
+            "status",
+            status=JobStatus.PENDING.value,
+            vehicle_id=vehicle_id,
+            priority=priority.name.lower(),
+            ahead=ahead,
         )
-        worker.start()
         return job_id
 
-    def _run_job(self, job_id: str, commands: List[Dict[str, Any]]) -> None:
-        relay = _StdoutRelay(self, job_id)
-        with contextlib.redirect_stdout(relay):
-            self._set_status(job_id, JobStatus.RUNNING)
-            api = DroneTimeBasedAPI()
-            self._log(job_id, "드론 시뮬레이션을 시작합니다.")
-
-            for idx, command in enumerate(commands, start=1):
-                action = command.get("action")
-                params = command.get("params", {}) or {}
-
-                if not action:
-                    self._log(job_id, f"[{idx}] action 키가 없어 건너뜁니다: {command}")
-                    continue
-
-                self._log(
-                    job_id,
-                    f"[{idx}/{len(commands)}] '{action}' 실행 (params={params})",
-                )
-
-                drone_method = getattr(api, action, None)
-                if not callable(drone_method):
-                    self._log(job_id, f" '{action}' 명령을 Drone API에서 찾을 수 없어 건너뜁니다.")
-                    continue
-
-                try:
-                    drone_method(**params)
-                    self._log(job_id, f" '{action}' 완료.")
-                except Exception as exc:  # pragma: no cover - safety
-                    self._log(job_id, f" '{action}' 실행 중 오류: {exc}")
-                    self._set_status(job_id, JobStatus.FAILED)
-                    break
-            else:
-                self._log(job_id, " 모든 명령을 성공적으로 마쳤습니다.")
-                self._set_status(job_id, JobStatus.COMPLETED)
-                return
+    def cancel_job(self, job_id: str, reason: str = "user") -> JobStatus:
+        """Cancel a pending or running job and return its status afterwards.
 
-        if self._status.get(job_id) != JobStatus.FAILED:
-            self._set_status(job_id, JobStatus.FAILED)
+        A pending job is dropped from the queue right away; a running job is
+        interrupted at its next wait and finishes as CANCELLED shortly after.
+        """
+        with self._lock:
+            status = self._status.get(job_id)
+            cancel = self._cancels.get(job_id)
+        if status is None:
+            # 메모리에 없는 작업은 이미 끝난 것이다. 로그도 없으면 KeyError 가 난다.
+            self._log_store.tail(job_id, 1)
+            return self._infer_cold_status(job_id)
+        if status in TERMINAL_STATUSES or cancel is None:
+            return status
+        if self.scheduler.cancel(job_id):
+            self._log(job_id, f" 대기 중인 작업이 취소되었습니다. (사유={reason})", "status", reason=reason)
+            self._set_status(job_id, JobStatus.CANCELLED)
+            with self._lock:
+                self._cancels.pop(job_id, None)
+                self._feeds.pop(job_id, None)
+            self._close_logs(job_id)
+            self.retention.job_finished(job_id)
+            return JobStatus.CANCELLED
+        self._log(job_id, f" 작업 취소를 요청했습니다. (사유={reason})", "status", reason=reason)
+        cancel.set()
+        with self._lock:
+            feed = self._feeds.get(job_id)
+        if feed is not None:
+            feed.interrupt()
+        return status
 
-    def _log(self, job_id: str, message: str) -> None:
-        entry = f"[{_timestamp()}] {message}"
+    def _escalate(self, job_id: str, vehicle_id: str) -> None:
+        """A streamed job received an emergency command: move it up and clear the vehicle for it."""
+        with self._lock:
+            status = self._status.get(job_id)
+        if status is None or status in TERMINAL_STATUSES:
+            return
+        self._log(job_id, " 비상 명령이 생성되어 작업을 비상 우선순위로 올립니다.", "status", priority="emergency")
+        self.scheduler.escalate(job_id, JobPriority.EMERGENCY)
+        self._preempt(vehicle_id, job_id)
+
+    def _preempt(self, vehicle_id: str, emergency_job_id: str) -> None:
+        """Cancel everything queued or running on ``vehicle_id`` ahead of an emergency job."""
+        reason = f"preempted:{emergency_job_id}"
+        # 워커가 막 집어 가서 아직 시작하지 않은 작업도 스케줄러가 실행 중으로 알려 준다.
+        for job_id in self.scheduler.jobs_for(vehicle_id):
+            if job_id != emergency_job_id:
+                self.cancel_job(job_id, reason)
+
+    def _run_job(self, job_id: str, commands: Iterable[Command]) -> None:
+        clock = make_clock()
+        with self._lock:
+            self._clocks[job_id] = clock
+            cancel = self._cancels.setdefault(job_id, threading.Event())
+        try:
+            sink = JobSink(lambda message, fields: self._log(job_id, message, fields.pop("event", "message"), **fields))
+            with bind_job(sink):
+                self._set_status(job_id, JobStatus.RUNNING)
+                # 속도 같은 상태가 다음 작업으로 넘어가지 않도록 작업마다 새로 만든다.
+                api = DroneTimeBasedAPI(clock=clock)
+                api.cancel_event = cancel
+                # 명령은 제출할 때 검증했으므로 메서드는 작업마다 한 번만 찾는다.
+                dispatch = bind(api)
+                self._log(job_id, "드론 시뮬레이션을 시작합니다.")
+                # 스트리밍 작업은 명령이 다 생성되기 전에 시작하므로 전체 개수를 모른다.
+                total = len(commands) if isinstance(commands, list) else None
+
+                for idx, command in enumerate(commands, start=1):
+                    if cancel.is_set():
+                        raise CommandCancelled()
+                    action = command.action
+                    params = command.params
+
+                    self._log(
+                        job_id,
+                        f"[{idx}/{total or '?'}] '{action}' 실행 (params={params})",
+                        "command_start",
+                        step=idx,
+                        total=total,
+                        action=action,
+                        params=params,
+                    )
+
+                    if action not in dispatch:
+                        self._log(
+                            job_id,
+                            f" '{action}' 명령을 Drone API에서 찾을 수 없어 건너뜁니다.",
+                            "error",
+                            step=idx,
+                            action=action,
+                            reason="unknown_action",
+                        )
+                        continue
+
+                    started_ns = clock.monotonic_ns()
+                    try:
+                        command.run(dispatch)
+                        if cancel.is_set():
+                            # 대기 없이 끝나는 명령은 여기서 취소를 확인한다.
+                            raise CommandCancelled()
+                        self._log(
+                            job_id,
+                            f" '{action}' 완료.",
+                            "command_end",
+                            step=idx,
+                            action=action,
+                            ok=True,
+                            duration_ns=clock.monotonic_ns() - started_ns,
+                        )
+                    except CommandCancelled:
+                        self._log(
+                            job_id,
+                            f" '{action}' 실행 중 작업이 취소되었습니다.",
+                            "error",
+                            step=idx,
+                            action=action,
+                            reason="cancelled",
+                            duration_ns=clock.monotonic_ns() - started_ns,
+                        )
+                        raise
+                    except Exception as exc:  # pragma: no cover - safety
+                        self._log(
+                            job_id,
+                            f" '{action}' 실행 중 오류: {exc}",
+                            "error",
+                            step=idx,
+                            action=action,
+                            error=str(exc),
+                            duration_ns=clock.monotonic_ns() - started_ns,
+                        )
+                        self._set_status(job_id, JobStatus.FAILED)
+                        break
+                else:
+                    self._log(job_id, _SUCCESS_MESSAGE)
+                    self._set_status(job_id, JobStatus.COMPLETED)
+                    return
+
+            if self._status.get(job_id) != JobStatus.FAILED:
+                self._set_status(job_id, JobStatus.FAILED)
+        except CommandCancelled:
+            self._set_status(job_id, JobStatus.CANCELLED)
+        except CommandStreamError as exc:
+            self._log(job_id, f" 명령 생성이 중단되었습니다: {exc}", "error", reason="stream_failed", error=str(exc))
+            self._set_status(job_id, JobStatus.FAILED)
+        finally:
+            with self._lock:
+                self._clocks.pop(job_id, None)
+                self._cancels.pop(job_id, None)
+                self._feeds.pop(job_id, None)
+            self._close_logs(job_id)
+            self.retention.job_finished(job_id)
+
+    def _close_logs(self, job_id: str) -> None:
+        self._log_store.close(job_id)
+        self._event_log.close(job_id)
+
+    def _log(self, job_id: str, message: str, kind: str = "message", **data: Any) -> None:
+        """Record a structured event and append its rendered line to the job log."""
         with self._lock:
-            self._logs.setdefault(job_id, []).append(entry)
-            log_path = self._log_files.get(job_id)
-            if log_path:
-                with log_path.open("a", encoding="utf-8") as handle:
-                    handle.write(entry + "\n")
+            clock = self._clocks.get(job_id)
+        record = self._event_log.append(job_id, kind, message, clock=clock, **data)
+        if record is None or not message:
+            return
+        entry = record.render()
+        index = self._log_store.append(job_id, entry)
+        if index is not None:
+            self.events.publish(job_id, ("log", index, entry))
 
     def _set_status(self, job_id: str, status: JobStatus) -> None:
         with self._lock:
             self._status[job_id] = status
+            clock = self._clocks.get(job_id)
+        self._event_log.append(job_id, "status", clock=clock, status=status.value)
+        self.events.publish(job_id, ("status", -1, status))
+
+    def fetch_events(self, job_id: str, start_index: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Structured event records of ``job_id`` from ``start_index`` onward."""
+        return self._event_log.read(job_id, start_index, limit)
 
     def fetch_logs(self, job_id: str, start_index: int = 0) -> JobLogs:
         with self._lock:
-            log_path = self._log_files.get(job_id)
-            if not log_path or not log_path.exists():
-                raise KeyError(job_id)
-            status = self._status.get(job_id, JobStatus.PENDING)
-
-        with log_path.open("r", encoding="utf-8") as handle:
-            lines = [line.rstrip("\n") for line in handle]
-
-        slice_logs = lines[start_index:]
+            status = self._status.get(job_id)
+        slice_logs = self._log_store.read(job_id, start_index)
+        if status is None:
+            status = self._infer_cold_status(job_id)
+        else:
+            self.retention.touch(job_id)
         next_index = start_index + len(slice_logs)
         return JobLogs(logs=slice_logs, next_index=next_index, status=status)
 
+    def _evict(self, job_id: str) -> None:
+        with self._lock:
+            self._status.pop(job_id, None)
+        self._log_store.evict(job_id)
+
+    def _infer_cold_status(self, job_id: str) -> JobStatus:
+        """Jobs no longer tracked in memory (evicted or from an earlier process) are finished."""
+        record = self._event_log.last(job_id)
+        if record is not None and record["kind"] == "status":
+            status = JobStatus(record["data"]["status"])
+            # 이전 프로세스가 실행 중에 종료됐다면 실패로 본다.
+            return status if status in TERMINAL_STATUSES else JobStatus.FAILED
+        # 이벤트 로그가 없는 예전 작업은 마지막 로그 줄로 판단한다.
+        last = self._log_store.tail(job_id, 1)
+        if last and last[0].endswith(_SUCCESS_MESSAGE):
+            return JobStatus.COMPLETED
+        return JobStatus.FAILED
+
+    def shutdown(self) -> None:
+        """Stop taking jobs, flush every pending log line and close open log files."""
+        self.scheduler.shutdown()
+        self.retention.shutdown()
+        self._log_store.writer.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.scheduler.stats()
+        stats["retention"] = self.retention.stats()
+        return stats
+
     def get_latest_job_id(self) -> Optional[str]:
         with self._lock:
             return self._latest_job_id
 
 
-execution_manager = ExecutionManager()
+def _infer_priority(commands: Iterable[Command]) -> JobPriority:
+    actions = [command.action for command in commands]
+    if any(action in _EMERGENCY_ACTIONS for action in actions):
+        return JobPriority.EMERGENCY
+    if actions and all(action in _CONTROL_ACTIONS for action in actions):
+        return JobPriority.EMERGENCY
+    return JobPriority.NORMAL
 
 
-class _StdoutRelay(io.StringIO):
-    """Duplicate stdout to terminal while streaming captured lines into job logs."""
-
-    def __init__(self, manager: ExecutionManager, job_id: str) -> None:
-        super().__init__()
-        self.manager = manager
-        self.job_id = job_id
-        self._original = sys.stdout
-        self._buffer = ""
-
-    def write(self, data: str) -> int:  # type: ignore[override]
-        if not data:
-            return 0
-        self._original.write(data)
-        self._buffer += data
-        while "\n" in self._buffer:
-            line, self._buffer = self._buffer.split("\n", 1)
-            cleaned = line.rstrip()
-            if cleaned:
-                self.manager._log(self.job_id, cleaned)
-        return len(data)
-
-    def flush(self) -> None:  # type: ignore[override]
-        if self._buffer.strip():
-            self.manager._log(self.job_id, self._buffer.rstrip())
-            self._buffer = ""
-        self._original.flush()
+execution_manager = ExecutionManager()
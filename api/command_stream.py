@@ -0,0 +1,111 @@
+import json
+import re
+from typing import List, Optional
+
+from command_ir import Command, CommandError
+
+_COMMANDS_KEY = re.compile(r'"commands"\s*:\s*\[')
+# 키가 청크 경계에 걸쳐 들어올 수 있으므로 이만큼은 다시 훑는다.
+_KEY_LOOKBACK = 32
+
+
+class IncrementalCommandParser:
+    """Pulls complete objects out of the ``"commands": [...]`` array of a streamed answer.
+
+    The CoT text before the JSON is skipped until the ``commands`` key shows
+    up; after that every character is scanned once, tracking string/escape
+    state and nesting depth, and each top-level object is decoded as soon as
+    its closing brace arrives and validated into a ``Command``.
+    """
+
+    def __init__(self) -> None:
+        self.commands: List[Command] = []
+        self.rejected: List[str] = []
+        self.done = False
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+    def feed(self, chunk: str) -> List[Command]:
+        """Consume ``chunk`` and return the commands completed by it."""
+        self._buffer += chunk
+        completed: List[Command] = []
+        while not self.done:
+            if not self._in_array:
+                match = _COMMANDS_KEY.search(self._buffer, self._pos)
+                if match is None:
+                    self._pos = max(self._pos, len(self._buffer) - _KEY_LOOKBACK)
+                    break
+                self._in_array = True
+                self._pos = match.end()
+            if not self._scan(completed):
+                break
+        return completed
+
+    def _scan(self, completed: List[Command]) -> bool:
+        """Scan the array; True when it has to look for the key again."""
+        buffer = self._buffer
+        idx = self._pos
+        while idx < len(buffer):
+            char = buffer[idx]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._start = idx
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # 배열의 닫는 괄호: 명령 목록이 끝났다.
+                    self.done = char == "]"
+                    self._pos = idx + 1
+                    return False
+                self._depth -= 1
+                if self._depth == 0 and self._start is not None:
+                    raw = buffer[self._start : idx + 1]
+                    self._start = None
+                    if not self._accept(raw, completed):
+                        # 예시 스키마처럼 명령이 아닌 배열이었다. 다음 commands 키를 찾는다.
+                        self._reset(idx + 1)
+                        return True
+            idx += 1
+        self._pos = idx
+        return False
+
+    def _accept(self, raw: str, completed: List[Command]) -> bool:
+        try:
+            obj = json.loads(raw)
+        except ValueError:
+            self.rejected.append(raw)
+            return False
+        try:
+            command = Command.from_dict(obj)
+        except CommandError:
+            self.rejected.append(raw)
+            # action 이 있으면 명령 배열은 맞다. 스키마에 어긋난 명령만 빼고 계속 읽는다.
+            return isinstance(obj, dict) and isinstance(obj.get("action"), str)
+        self.commands.append(command)
+        completed.append(command)
+        return True
+
+    def _reset(self, pos: int) -> None:
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._pos = pos
@@ -1,105 +1,123 @@
-import time
 import re
+import threading
+import time
+
+from job_context import emit
+from sim_clock import make_clock
+
+
+class CommandCancelled(Exception):
+    """Raised inside a drone action when its wait was interrupted by ``cancel``."""
+
 
 class DroneTimeBasedAPI:
     """
     LLM이 생성한 각 명령어(command)를 받아,
     동작을 시뮬레이션하고 예상 시간만큼 대기하는 API.
+    대기는 주입된 clock 으로 하므로 virtual/scaled 시계로 빠르게 검증할 수 있다.
     """
     # 드론의 성능 스펙 (cm/s, deg/s)
     DEFAULT_SPEED = 30.0  # 30 cm/s (상승 및 수평 이동 속도)
     ROTATION_SPEED = 90.0 # 90 deg/s
 
-    def __init__(self):
-        print(" [API] 드론 시뮬레이션 API가 초기화되었습니다.")
+    def __init__(self, clock=None):
+        # __getattr__ 가 없는 속성을 액션으로 취급하므로 clock 과 cancel_event 를 먼저 설정한다.
+        self.clock = clock or make_clock()
+        # set 되면 진행 중인 대기가 즉시 깨어나 CommandCancelled 를 던진다.
+        self.cancel_event = threading.Event()
+        emit(" [API] 드론 시뮬레이션 API가 초기화되었습니다.", event="api_ready")
         self.current_speed = self.DEFAULT_SPEED
 
+    def _sleep(self, seconds):
+        if not self.clock.sleep(seconds, self.cancel_event):
+            raise CommandCancelled("명령이 취소되어 대기를 중단했습니다.")
+
     def _wait_for_distance(self, distance):
         wait_time = abs(float(distance)) / self.current_speed
-        print(f"  ... [API] 예상 소요 시간: {wait_time:.2f}초. 대기를 시작합니다.")
-        time.sleep(wait_time)
+        emit(f"  ... [API] 예상 소요 시간: {wait_time:.2f}초. 대기를 시작합니다.", event="wait", seconds=wait_time)
+        self._sleep(wait_time)
 
     def _wait_for_degree(self, degree):
         wait_time = abs(float(degree)) / self.ROTATION_SPEED
-        print(f"  ... [API] 예상 소요 시간: {wait_time:.2f}초. 대기를 시작합니다.")
-        time.sleep(wait_time)
+        emit(f"  ... [API] 예상 소요 시간: {wait_time:.2f}초. 대기를 시작합니다.", event="wait", seconds=wait_time)
+        self._sleep(wait_time)
 
     def takeoff(self, altitude: int = 50, **kwargs):
         """
         주어진 고도까지 이륙합니다. 고도가 없으면 기본 50cm로 이륙합니다.
         """
-        print(f" [API] 'takeoff' 액션 실행. 목표 고도: {altitude}cm")
+        emit(f" [API] 'takeoff' 액션 실행. 목표 고도: {altitude}cm", event="action_start", action="takeoff")
         self._wait_for_distance(altitude) # 고도까지 올라가는 시간 계산
-        print(" [API] 'takeoff' 액션 완료.")
+        emit(" [API] 'takeoff' 액션 완료.", event="action_end", action="takeoff")
 
     def land(self, **kwargs):
-        print(" [API] 'land' 액션 실행.")
-        time.sleep(3) # 착륙은 3초 정도로 가정
-        print(" [API] 'land' 액션 완료.")
+        emit(" [API] 'land' 액션 실행.", event="action_start", action="land")
+        self._sleep(3) # 착륙은 3초 정도로 가정
+        emit(" [API] 'land' 액션 완료.", event="action_end", action="land")
 
     def up(self, distance: int, **kwargs):
-        print(f"  [API] 'up' 액션 실행. 거리: {distance}cm")
+        emit(f"  [API] 'up' 액션 실행. 거리: {distance}cm", event="action_start", action="up")
         self._wait_for_distance(distance)
-        print(f" [API] 'up' 액션 완료.")
+        emit(f" [API] 'up' 액션 완료.", event="action_end", action="up")
 
     def down(self, distance: int, **kwargs):
-        print(f"  [API] 'down' 액션 실행. 거리: {distance}cm")
+        emit(f"  [API] 'down' 액션 실행. 거리: {distance}cm", event="action_start", action="down")
         self._wait_for_distance(distance)
-        print(f"  [API] 'down' 액션 완료.")
+        emit(f"  [API] 'down' 액션 완료.", event="action_end", action="down")
 
     def left(self, distance: int, **kwargs):
-        print(f"  [API] 'left' 액션 실행. 거리: {distance}cm")
+        emit(f"  [API] 'left' 액션 실행. 거리: {distance}cm", event="action_start", action="left")
         self._wait_for_distance(distance)
-        print(f" [API] 'left' 액션 완료.")
+        emit(f" [API] 'left' 액션 완료.", event="action_end", action="left")
 
     def right(self, distance: int, **kwargs):
-        print(f"  [API] 'right' 액션 실행. 거리: {distance}cm")
+        emit(f"  [API] 'right' 액션 실행. 거리: {distance}cm", event="action_start", action="right")
         self._wait_for_distance(distance)
-        print(f" [API] 'right' 액션 완료.")
+        emit(f" [API] 'right' 액션 완료.", event="action_end", action="right")
 
     def forward(self, distance: int, **kwargs):
-        print(f"⤴  [API] 'forward' 액션 실행. 거리: {distance}cm")
+        emit(f"⤴  [API] 'forward' 액션 실행. 거리: {distance}cm", event="action_start", action="forward")
         self._wait_for_distance(distance)
-        print(f" [API] 'forward' 액션 완료.")
+        emit(f" [API] 'forward' 액션 완료.", event="action_end", action="forward")
 
     def back(self, distance: int, **kwargs):
-        print(f"⤵  [API] 'back' 액션 실행. 거리: {distance}cm")
+        emit(f"⤵  [API] 'back' 액션 실행. 거리: {distance}cm", event="action_start", action="back")
         self._wait_for_distance(distance)
-        print(f" [API] 'back' 액션 완료.")
+        emit(f" [API] 'back' 액션 완료.", event="action_end", action="back")
 
     def cw(self, degree: int, **kwargs):
-        print(f"↪  [API] 'cw' (시계방향 회전) 액션 실행. 각도: {degree}°")
+        emit(f"↪  [API] 'cw' (시계방향 회전) 액션 실행. 각도: {degree}°", event="action_start", action="cw")
         self._wait_for_degree(degree)
-        print(f" [API] 'cw' 액션 완료.")
+        emit(f" [API] 'cw' 액션 완료.", event="action_end", action="cw")
 
     def ccw(self, degree: int, **kwargs):
-        print(f"↩  [API] 'ccw' (반시계방향 회전) 액션 실행. 각도: {degree}°")
+        emit(f"↩  [API] 'ccw' (반시계방향 회전) 액션 실행. 각도: {degree}°", event="action_start", action="ccw")
         self._wait_for_degree(degree)
-        print(f" [API] 'ccw' 액션 완료.")
+        emit(f" [API] 'ccw' 액션 완료.", event="action_end", action="ccw")
 
     def go(self, x: int, y: int, z: int, speed: int, **kwargs):
-        print(f"↗  [API] 'go' 액션 실행. 목표:({x},{y},{z}), 속도:{speed}cm/s")
+        emit(f"↗  [API] 'go' 액션 실행. 목표:({x},{y},{z}), 속도:{speed}cm/s", event="action_start", action="go")
         distance = (float(x)**2 + float(y)**2 + float(z)**2)**0.5
         wait_time = distance / float(speed)
-        print(f"  ... [API] 예상 소요 시간: {wait_time:.2f}초. 대기를 시작합니다.")
-        time.sleep(wait_time)
-        print(f" [API] 'go' 액션 완료.")
+        emit(f"  ... [API] 예상 소요 시간: {wait_time:.2f}초. 대기를 시작합니다.", event="wait", seconds=wait_time)
+        self._sleep(wait_time)
+        emit(f" [API] 'go' 액션 완료.", event="action_end", action="go")
 
     def speed(self, value: int, **kwargs):
-        print(f" [API] 'speed' 변경. 새로운 속도: {value} cm/s")
+        emit(f" [API] 'speed' 변경. 새로운 속도: {value} cm/s", event="action_start", action="speed")
         self.current_speed = float(value)
-        time.sleep(0.1) # 속도 변경은 즉시 적용된다고 가정
-        print(f" [API] 'speed' 액션 완료.")
+        self._sleep(0.1) # 속도 변경은 즉시 적용된다고 가정
+        emit(f" [API] 'speed' 액션 완료.", event="action_end", action="speed")
 
     def emergency(self, **kwargs):
-        print(" [API] 'emergency' 액션 실행.")
-        time.sleep(1)
-        print(" [API] 'emergency' 액션 완료.")
+        emit(" [API] 'emergency' 액션 실행.", event="action_start", action="emergency")
+        self._sleep(1)
+        emit(" [API] 'emergency' 액션 완료.", event="action_end", action="emergency")
 
     def __getattr__(self, name):
         def method(**kwargs):
-            print(f"ℹ  [API] '{name}' 액션 실행. 파라미터: {kwargs}")
-            time.sleep(0.5) # 간단한 설정은 0.5초로 가정
-            print(f" [API] '{name}' 액션 완료.")
+            emit(f"ℹ  [API] '{name}' 액션 실행. 파라미터: {kwargs}", event="action_start", action=name)
+            self._sleep(0.5) # 간단한 설정은 0.5초로 가정
+            emit(f" [API] '{name}' 액션 완료.", event="action_end", action=name)
         return method
 
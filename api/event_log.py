@@ -0,0 +1,159 @@
+import json
+import struct
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from log_writer import LogWriter
+
+if TYPE_CHECKING:  # pragma: no cover
+    from job_retention import JobArchive
+
+# 레코드 종류. message 는 구조화되지 않은 안내 문구다.
+EVENT_KINDS = {
+    "message",
+    "status",
+    "command_start",
+    "command_end",
+    "error",
+    # DroneTimeBasedAPI 가 emit() 으로 보내는 이벤트
+    "api_ready",
+    "action_start",
+    "action_end",
+    "wait",
+}
+
+_INDEX_ENTRY = struct.Struct("<Q")
+
+
+@dataclass
+class EventRecord:
+    seq: int
+    kind: str
+    t_ns: int
+    wall: float
+    message: str = ""
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    def render(self) -> str:
+        """Human-readable log line shown in the job log views."""
+        return f"[{datetime.fromtimestamp(self.wall).strftime('%H:%M:%S')}] {self.message}"
+
+
+class JobEventLog:
+    """Append-only JSONL event log per job with a fixed-width offset index.
+
+    ``<job_id>.jsonl`` holds one record per line and ``<job_id>.idx`` holds the
+    byte offset of record N at ``8 * N``, so any record is one seek away.
+    Both files are written through the shared group-commit ``LogWriter``.
+    """
+
+    def __init__(self, events_dir: Path, writer: LogWriter, archive: Optional["JobArchive"] = None) -> None:
+        self.events_dir = events_dir
+        self.events_dir.mkdir(parents=True, exist_ok=True)
+        self.writer = writer
+        self.archive = archive
+        # job_id -> (다음 seq, 데이터 파일 크기)
+        self._cursors: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def paths(self, job_id: str) -> Tuple[Path, Path]:
+        return self.events_dir / f"{job_id}.jsonl", self.events_dir / f"{job_id}.idx"
+
+    def create(self, job_id: str) -> None:
+        data_path, index_path = self.paths(job_id)
+        data_path.write_bytes(b"")
+        index_path.write_bytes(b"")
+        with self._lock:
+            self._cursors[job_id] = (0, 0)
+
+    def append(
+        self,
+        job_id: str,
+        kind: str,
+        message: str = "",
+        *,
+        clock: Any = None,
+        **data: Any,
+    ) -> Optional[EventRecord]:
+        """Append one record; timestamps come from ``clock`` (a drone clock) when given."""
+        with self._lock:
+            cursor = self._cursors.get(job_id)
+            if cursor is None:
+                return None
+            seq, size = cursor
+            if kind not in EVENT_KINDS:
+                kind = "message"
+            if clock is not None:
+                t_ns, wall = clock.monotonic_ns(), clock.time()
+            else:
+                t_ns, wall = time.monotonic_ns(), time.time()
+            record = EventRecord(seq, kind, t_ns, wall, message, data)
+            encoded = (json.dumps(asdict(record), ensure_ascii=False, default=str) + "\n").encode("utf-8")
+            data_path, index_path = self.paths(job_id)
+            self.writer.write(data_path, encoded)
+            self.writer.write(index_path, _INDEX_ENTRY.pack(size))
+            self._cursors[job_id] = (seq + 1, size + len(encoded))
+            return record
+
+    def close(self, job_id: str) -> None:
+        with self._lock:
+            if self._cursors.pop(job_id, None) is None:
+                return
+        for path in self.paths(job_id):
+            self.writer.close_file(path)
+
+    def read(self, job_id: str, start: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return records ``start`` .. ``start + limit`` as dicts."""
+        data_path, index_path = self.paths(job_id)
+        if data_path.exists():
+            return EventLogReader(data_path, index_path).read(start, limit)
+        records = self.archive.read_events(job_id) if self.archive is not None else None
+        if records is None:
+            raise KeyError(job_id)
+        return records[start : None if limit is None else start + limit]
+
+    def last(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Most recent record of ``job_id`` (``None`` if it has none)."""
+        data_path, index_path = self.paths(job_id)
+        if data_path.exists():
+            reader = EventLogReader(data_path, index_path)
+            records = reader.read(len(reader) - 1) if len(reader) else []
+        else:
+            records = (self.archive.read_events(job_id) if self.archive is not None else None) or []
+        return records[-1] if records else None
+
+
+class EventLogReader:
+    """Random access to a job event log through its offset index."""
+
+    def __init__(self, data_path: Path, index_path: Path) -> None:
+        self.data_path = data_path
+        self.index_path = index_path
+
+    def __len__(self) -> int:
+        if not self.index_path.exists():
+            return 0
+        return self.index_path.stat().st_size // _INDEX_ENTRY.size
+
+    def _offset(self, handle: Any, seq: int) -> int:
+        handle.seek(seq * _INDEX_ENTRY.size)
+        return _INDEX_ENTRY.unpack(handle.read(_INDEX_ENTRY.size))[0]
+
+    def read(self, start: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        total = len(self)
+        end = total if limit is None else min(total, start + limit)
+        if start >= end:
+            return []
+        with self.index_path.open("rb") as index, self.data_path.open("rb") as data:
+            data.seek(self._offset(index, start))
+            records = []
+            for _ in range(end - start):
+                line = data.readline()
+                if not line.endswith(b"\n"):
+                    break
+                records.append(json.loads(line))
+            return records
@@ -0,0 +1,114 @@
+import contextlib
+import io
+import os
+import sys
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# 작업 로그를 터미널에도 그대로 출력할지 여부.
+JOB_ECHO_STDOUT = os.getenv("JOB_ECHO_STDOUT", "1") not in {"0", "false", "no"}
+# print() 출력을 작업 로그로 옮기는 호환 계층. 직접 emit() 을 부르지 않는 코드에만 필요하다.
+JOB_CAPTURE_STDOUT = os.getenv("JOB_CAPTURE_STDOUT", "0") not in {"0", "false", "no"}
+
+EventHandler = Callable[[str, Dict[str, Any]], None]
+
+
+class JobSink:
+    """Receives the events of the job bound to the current context."""
+
+    def __init__(self, handler: EventHandler, echo: bool = JOB_ECHO_STDOUT) -> None:
+        self._handler = handler
+        self._echo = echo
+        self._pending: List[str] = []
+
+    def emit(self, message: str, fields: Dict[str, Any]) -> None:
+        if self._echo:
+            _echo(message)
+        self._handler(message, fields)
+
+    def write(self, data: str) -> None:
+        """Split captured stdout into lines in time linear in ``len(data)``."""
+        if self._echo:
+            _echo(data, end="")
+        parts = data.split("\n")
+        if len(parts) == 1:
+            self._pending.append(data)
+            return
+        parts[0] = "".join(self._pending) + parts[0]
+        self._pending = [parts[-1]] if parts[-1] else []
+        for line in parts[:-1]:
+            cleaned = line.rstrip()
+            if cleaned:
+                self._handler(cleaned, {})
+
+    def flush_partial(self) -> None:
+        line = "".join(self._pending).rstrip()
+        self._pending = []
+        if line:
+            self._handler(line, {})
+
+
+_current_sink: ContextVar[Optional[JobSink]] = ContextVar("job_sink", default=None)
+
+
+def _echo(text: str, end: str = "\n") -> None:
+    stream = sys.__stdout__
+    if stream is not None:
+        stream.write(text + end)
+
+
+def emit(message: str, **fields: Any) -> None:
+    """Record ``message`` (plus structured ``fields``) in the current job's log.
+
+    Outside a job the message is printed, so standalone use keeps working.
+    """
+    sink = _current_sink.get()
+    if sink is None:
+        print(message)
+        return
+    sink.emit(message, fields)
+
+
+@contextlib.contextmanager
+def bind_job(sink: JobSink) -> Iterator[JobSink]:
+    """Route ``emit()`` (and captured stdout) of this context to ``sink``."""
+    token = _current_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        sink.flush_partial()
+        _current_sink.reset(token)
+
+
+class _ContextRoutedStdout(io.TextIOBase):
+    """``sys.stdout`` replacement sending writes to the sink of the calling context."""
+
+    def __init__(self, original: Any) -> None:
+        self._original = original
+
+    def write(self, data: str) -> int:  # type: ignore[override]
+        if not data:
+            return 0
+        sink = _current_sink.get()
+        if sink is None:
+            return self._original.write(data)
+        sink.write(data)
+        return len(data)
+
+    def flush(self) -> None:
+        self._original.flush()
+
+    @property
+    def encoding(self) -> str:  # type: ignore[override]
+        return getattr(self._original, "encoding", "utf-8")
+
+
+_shim_lock = threading.Lock()
+
+
+def install_stdout_shim() -> None:
+    """Install the process-wide stdout router once; idempotent."""
+    with _shim_lock:
+        if not isinstance(sys.stdout, _ContextRoutedStdout):
+            sys.stdout = _ContextRoutedStdout(sys.stdout)
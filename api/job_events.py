@@ -0,0 +1,101 @@
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# 구독자별 큐 최대 길이. 넘치면 이벤트를 버리고 구독자가 로그 저장소에서 다시 읽는다.
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("JOB_STREAM_QUEUE_SIZE", "256"))
+
+# (kind, index, data): kind 는 "log" 또는 "status", index 는 로그 줄 번호(status 는 -1).
+JobEvent = Tuple[str, int, Any]
+
+
+class JobSubscription:
+    """Bounded asyncio queue of one subscriber, fed from worker threads.
+
+    One subscription may follow several jobs; queued items are
+    ``(job_id, event)`` pairs.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int) -> None:
+        self.loop = loop
+        self.job_ids: Set[str] = set()
+        self.queue: "asyncio.Queue[Tuple[str, JobEvent]]" = asyncio.Queue(maxsize=maxsize)
+        # 큐가 넘쳐 이벤트를 잃은 작업들. 저장소에서 다시 읽은 뒤 비운다.
+        self.overflowed: Set[str] = set()
+
+    def _push(self, job_id: str, event: JobEvent) -> None:
+        # 이벤트 루프 스레드에서만 호출된다.
+        try:
+            self.queue.put_nowait((job_id, event))
+        except asyncio.QueueFull:
+            self.overflowed.add(job_id)
+
+    async def get(self, timeout: Optional[float] = None) -> Tuple[str, JobEvent]:
+        """Wait for the next event; raises ``asyncio.TimeoutError`` after ``timeout``."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def get_nowait(self) -> Optional[Tuple[str, JobEvent]]:
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    def drain(self) -> None:
+        """Drop queued events after the subscriber resynchronised from the store."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed.clear()
+
+
+class JobEventHub:
+    """Per-job fan-out of log lines and status changes to asyncio subscribers.
+
+    Publishing to a job without subscribers is a dict lookup, so idle jobs
+    and idle streams cost nothing.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE) -> None:
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, List[JobSubscription]] = {}
+        self._lock = threading.Lock()
+
+    def open(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> JobSubscription:
+        """Create a subscription that does not follow any job yet."""
+        return JobSubscription(loop or asyncio.get_running_loop(), self.queue_size)
+
+    def subscribe(self, job_id: str, subscription: Optional[JobSubscription] = None) -> JobSubscription:
+        subscription = subscription or self.open()
+        with self._lock:
+            if job_id not in subscription.job_ids:
+                subscription.job_ids.add(job_id)
+                self._subscribers.setdefault(job_id, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: JobSubscription, job_id: Optional[str] = None) -> None:
+        """Stop following ``job_id`` (or every job when omitted)."""
+        with self._lock:
+            job_ids = [job_id] if job_id is not None else list(subscription.job_ids)
+            for current in job_ids:
+                subscription.job_ids.discard(current)
+                subscription.overflowed.discard(current)
+                subscribers = self._subscribers.get(current)
+                if not subscribers:
+                    continue
+                if subscription in subscribers:
+                    subscribers.remove(subscription)
+                if not subscribers:
+                    del self._subscribers[current]
+
+    def publish(self, job_id: str, event: JobEvent) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(job_id)
+            if not subscribers:
+                return
+            subscribers = list(subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._push, job_id, event)
+            except RuntimeError:
+                # 루프가 이미 닫힌 구독자: 연결이 끊긴 것이므로 정리한다.
+                self.unsubscribe(subscription)
@@ -0,0 +1,239 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# 메모리에 상태를 유지할 완료 작업 수와 유지 시간(초).
+JOB_RETAIN_MAX_JOBS = int(os.getenv("JOB_RETAIN_MAX_JOBS", "200"))
+JOB_RETAIN_TTL_SEC = float(os.getenv("JOB_RETAIN_TTL_SEC", "3600"))
+# 이 시간(초)보다 오래된 로그/명령 파일은 아카이브로 압축한다. 0 이면 압축하지 않는다.
+JOB_ARCHIVE_AFTER_SEC = float(os.getenv("JOB_ARCHIVE_AFTER_SEC", str(7 * 24 * 3600)))
+JOB_RETENTION_SWEEP_SEC = float(os.getenv("JOB_RETENTION_SWEEP_SEC", "60"))
+_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class JobArchive:
+    """Append-only zlib segments of old job logs, events and payloads with a sqlite index."""
+
+    BLOBS = ("log", "payload", "events")
+
+    def __init__(self, archive_dir: Path) -> None:
+        self.archive_dir = archive_dir
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(archive_dir / "index.sqlite3"), check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                segment TEXT NOT NULL,
+                log_offset INTEGER NOT NULL,
+                log_length INTEGER NOT NULL,
+                payload_offset INTEGER,
+                payload_length INTEGER,
+                events_offset INTEGER,
+                events_length INTEGER,
+                archived_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    def _segment_path(self) -> Path:
+        segments = sorted(self.archive_dir.glob("segment-*.bin"))
+        if segments and segments[-1].stat().st_size < _SEGMENT_MAX_BYTES:
+            return segments[-1]
+        return self.archive_dir / f"segment-{len(segments) + 1:06d}.bin"
+
+    def add(
+        self,
+        job_id: str,
+        log_bytes: bytes,
+        payload_bytes: Optional[bytes] = None,
+        events_bytes: Optional[bytes] = None,
+    ) -> None:
+        blobs = {"log": log_bytes, "payload": payload_bytes, "events": events_bytes}
+        locations: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+        with self._lock:
+            segment = self._segment_path()
+            with segment.open("ab") as handle:
+                for name in self.BLOBS:
+                    raw = blobs[name]
+                    if raw is None:
+                        locations[name] = (None, None)
+                        continue
+                    compressed = zlib.compress(raw)
+                    locations[name] = (handle.tell(), len(compressed))
+                    handle.write(compressed)
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    segment.name,
+                    *locations["log"],
+                    *locations["payload"],
+                    *locations["events"],
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+
+    def _read_blob(self, job_id: str, column: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT segment, {column}_offset, {column}_length FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None or row[1] is None:
+            return None
+        segment, offset, length = row
+        with (self.archive_dir / segment).open("rb") as handle:
+            handle.seek(offset)
+            return zlib.decompress(handle.read(length))
+
+    def read_log(self, job_id: str) -> Optional[List[str]]:
+        data = self._read_blob(job_id, "log")
+        if data is None:
+            return None
+        return data.decode("utf-8").split("\n")[:-1]
+
+    def read_payload(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = self._read_blob(job_id, "payload")
+        return json.loads(data) if data is not None else None
+
+    def read_events(self, job_id: str) -> Optional[List[Dict[str, Any]]]:
+        data = self._read_blob(job_id, "events")
+        if data is None:
+            return None
+        return [json.loads(line) for line in data.splitlines() if line]
+
+    def __contains__(self, job_id: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone() is not None
+
+
+class JobRetention:
+    """Bounds the in-memory state of finished jobs and archives old job files.
+
+    Finished jobs are kept in LRU order; once there are more than ``max_jobs``
+    of them, or one is older than ``ttl`` seconds, ``evict`` is called so the
+    manager drops its state. Evicted jobs stay readable from disk or archive.
+    """
+
+    def __init__(
+        self,
+        evict: Callable[[str], None],
+        is_active: Callable[[str], bool],
+        log_dir: Path,
+        history_dir: Path,
+        events_dir: Path,
+        archive: JobArchive,
+        max_jobs: int = JOB_RETAIN_MAX_JOBS,
+        ttl: float = JOB_RETAIN_TTL_SEC,
+        archive_after: float = JOB_ARCHIVE_AFTER_SEC,
+        sweep_interval: float = JOB_RETENTION_SWEEP_SEC,
+    ) -> None:
+        self._evict = evict
+        self._is_active = is_active
+        self.log_dir = log_dir
+        self.history_dir = history_dir
+        self.events_dir = events_dir
+        self.archive = archive
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.archive_after = archive_after
+        self.sweep_interval = sweep_interval
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="job-retention", daemon=True)
+        self._thread.start()
+
+    def job_finished(self, job_id: str) -> None:
+        with self._lock:
+            self._finished[job_id] = time.monotonic()
+        self.enforce()
+
+    def touch(self, job_id: str) -> None:
+        """Mark a finished job as recently used (TTL still counts from its finish)."""
+        with self._lock:
+            if job_id in self._finished:
+                self._finished.move_to_end(job_id)
+
+    def enforce(self) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            expired = [job_id for job_id, finished_at in self._finished.items() if now - finished_at > self.ttl]
+            for job_id in expired:
+                del self._finished[job_id]
+            while len(self._finished) > self.max_jobs:
+                job_id, _ = self._finished.popitem(last=False)
+                expired.append(job_id)
+        for job_id in expired:
+            self._evict(job_id)
+        return expired
+
+    def archive_old_files(self) -> int:
+        """Move job logs, payloads and event logs older than ``archive_after`` into the archive."""
+        if self.archive_after <= 0:
+            return 0
+        cutoff = time.time() - self.archive_after
+        archived = 0
+        for log_path in self._old_logs(cutoff):
+            job_id = log_path.stem
+            with self._lock:
+                if job_id in self._finished:
+                    continue
+            if self._is_active(job_id):
+                continue
+            payload_path = self.history_dir / f"{job_id}.json"
+            events_path = self.events_dir / f"{job_id}.jsonl"
+            payload = payload_path.read_bytes() if payload_path.exists() else None
+            events = events_path.read_bytes() if events_path.exists() else None
+            self.archive.add(job_id, log_path.read_bytes(), payload, events)
+            log_path.unlink()
+            if payload is not None:
+                payload_path.unlink()
+            if events is not None:
+                events_path.unlink()
+                # 오프셋 인덱스는 아카이브에서 다시 만들 수 있으므로 버린다.
+                (self.events_dir / f"{job_id}.idx").unlink(missing_ok=True)
+            # 파일 오프셋으로 읽던 캐시가 남아 있으면 지운다. 다음 조회는 아카이브에서 읽는다.
+            self._evict(job_id)
+            archived += 1
+        return archived
+
+    def _old_logs(self, cutoff: float) -> Iterable[Path]:
+        for log_path in self.log_dir.glob("*.log"):
+            try:
+                if log_path.stat().st_mtime < cutoff:
+                    yield log_path
+            except FileNotFoundError:
+                continue
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "retained_finished_jobs": len(self._finished),
+                "max_jobs": self.max_jobs,
+                "ttl_sec": self.ttl,
+                "archive_after_sec": self.archive_after,
+            }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.enforce()
+                self.archive_old_files()
+            except Exception as exc:  # pragma: no cover - safety
+                print(f"[RETENTION ERROR] {exc}")
+
+    def shutdown(self) -> None:
+        self._stop.set()
@@ -0,0 +1,211 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+# 동시에 실행할 작업 수와 대기열 최대 길이(비상 작업은 제한 없이 받는다).
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "64"))
+# 비상 작업만 처리하는 전용 워커 수. 일반 워커가 모두 바빠도 비상 명령은 바로 시작된다.
+JOB_CONTROL_WORKERS = int(os.getenv("JOB_CONTROL_WORKERS", "1"))
+_WAIT_SAMPLES = 256
+
+
+class JobPriority(IntEnum):
+    """Lower value runs first."""
+
+    EMERGENCY = 0
+    NORMAL = 10
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when the pending queue is at its admission limit."""
+
+
+@dataclass(order=True)
+class _QueuedJob:
+    priority: int
+    seq: int
+    job_id: str = field(compare=False)
+    key: str = field(compare=False)
+    run: Callable[[], None] = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+class JobScheduler:
+    """Fixed worker pool running queued jobs by priority, one job per key at a time.
+
+    ``key`` is the vehicle a job commands: two jobs with the same key never run
+    concurrently, while jobs for different vehicles share the pool. A separate
+    control lane of ``control_workers`` threads only runs EMERGENCY jobs.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        queue_limit: int = JOB_QUEUE_LIMIT,
+        control_workers: int = JOB_CONTROL_WORKERS,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("JOB_WORKERS 는 1 이상이어야 합니다.")
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._pending: List[_QueuedJob] = []
+        self._busy_keys: Set[str] = set()
+        # 키별로 워커가 집어 간 작업. 작업 함수가 시작되기 전부터 잡혀 있어 선점이 놓치지 않는다.
+        self._running_jobs: Dict[str, str] = {}
+        self._running = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._admitted = 0
+        self._rejected = 0
+        self._finished = 0
+        self._waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self._emergency_waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self.control_workers = control_workers
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"job-worker-{idx}", daemon=True)
+            for idx in range(workers)
+        ] + [
+            threading.Thread(target=self._worker, args=(True,), name=f"job-control-{idx}", daemon=True)
+            for idx in range(control_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        job_id: str,
+        run: Callable[[], None],
+        key: str,
+        priority: JobPriority = JobPriority.NORMAL,
+    ) -> int:
+        """Queue ``run`` and return the number of jobs ahead of it."""
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("스케줄러가 종료되었습니다.")
+            if priority != JobPriority.EMERGENCY and len(self._pending) >= self.queue_limit:
+                self._rejected += 1
+                raise JobQueueFull(f"대기 중인 작업이 {self.queue_limit}개를 넘었습니다.")
+            job = _QueuedJob(int(priority), next(self._seq), job_id, key, run, time.monotonic())
+            ahead = sum(1 for queued in self._pending if queued < job)
+            self._pending.append(job)
+            self._admitted += 1
+            # 비상 작업은 제어 전용 워커도 깨워야 하므로 모두 깨운다.
+            self._cond.notify_all()
+            return ahead
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a job that has not started yet; False if it is not pending."""
+        with self._cond:
+            for job in self._pending:
+                if job.job_id == job_id:
+                    self._pending.remove(job)
+                    return True
+            return False
+
+    def escalate(self, job_id: str, priority: JobPriority) -> bool:
+        """Raise the priority of a pending job; False if it is not pending."""
+        with self._cond:
+            for job in self._pending:
+                if job.job_id == job_id:
+                    job.priority = min(job.priority, int(priority))
+                    # 비상 작업이 되면 제어 전용 워커도 집어 갈 수 있다.
+                    self._cond.notify_all()
+                    return True
+            return False
+
+    def pending_jobs(self, key: str) -> List[str]:
+        with self._cond:
+            return [job.job_id for job in sorted(self._pending) if job.key == key]
+
+    def jobs_for(self, key: str) -> List[str]:
+        """The job dispatched for ``key`` (if any) followed by its pending jobs, read atomically."""
+        with self._cond:
+            running = self._running_jobs.get(key)
+            pending = [job.job_id for job in sorted(self._pending) if job.key == key]
+            return ([running] if running is not None else []) + pending
+
+    def _next_runnable(self, emergency_only: bool = False) -> Optional[_QueuedJob]:
+        runnable = [
+            job
+            for job in self._pending
+            if job.key not in self._busy_keys and (not emergency_only or job.priority == JobPriority.EMERGENCY)
+        ]
+        if not runnable:
+            return None
+        job = min(runnable)
+        self._pending.remove(job)
+        return job
+
+    def _worker(self, emergency_only: bool = False) -> None:
+        while True:
+            with self._cond:
+                job = self._next_runnable(emergency_only)
+                while job is None:
+                    if self._stopped:
+                        return
+                    self._cond.wait()
+                    job = self._next_runnable(emergency_only)
+                self._busy_keys.add(job.key)
+                self._running_jobs[job.key] = job.job_id
+                self._running += 1
+                waited = time.monotonic() - job.enqueued_at
+                self._waits.append(waited)
+                if job.priority == JobPriority.EMERGENCY:
+                    self._emergency_waits.append(waited)
+            try:
+                job.run()
+            except Exception as exc:  # pragma: no cover - safety
+                print(f"[SCHEDULER ERROR] {job.job_id}: {exc}")
+            finally:
+                with self._cond:
+                    self._busy_keys.discard(job.key)
+                    self._running_jobs.pop(job.key, None)
+                    self._running -= 1
+                    self._finished += 1
+                    # 같은 키로 막혀 있던 작업이 있을 수 있으니 모두 깨운다.
+                    self._cond.notify_all()
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    @staticmethod
+    def _summarize(samples: Deque[float]) -> Dict[str, Any]:
+        waits = sorted(samples)
+        if not waits:
+            return {"samples": 0, "avg": 0.0, "p95": 0.0, "max": 0.0}
+        return {
+            "samples": len(waits),
+            "avg": round(sum(waits) / len(waits) * 1000, 2),
+            "p95": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 2),
+            "max": round(waits[-1] * 1000, 2),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            by_priority: Dict[str, int] = {}
+            for job in self._pending:
+                name = JobPriority(job.priority).name.lower()
+                by_priority[name] = by_priority.get(name, 0) + 1
+            return {
+                "workers": self.workers,
+                "control_workers": self.control_workers,
+                "queue_limit": self.queue_limit,
+                "queue_depth": len(self._pending),
+                "queue_depth_by_priority": by_priority,
+                "running": self._running,
+                "busy_vehicles": sorted(self._busy_keys),
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "finished": self._finished,
+                "wait_ms": self._summarize(self._waits),
+                "emergency_wait_ms": self._summarize(self._emergency_waits),
+            }
@@ -0,0 +1,136 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from command_runner import TERMINAL_STATUSES, ExecutionManager
+from job_events import JobEvent
+
+# 여러 작업의 이벤트를 모아 한 프레임으로 보내는 간격(ms).
+JOB_WS_BATCH_MS = float(os.getenv("JOB_WS_BATCH_MS", "100"))
+
+
+class JobWatchSession:
+    """Per-connection state of the multiplexed job watcher.
+
+    Keeps one cursor per subscribed job and folds pushed events into a
+    pending ``logs`` frame holding, per job, the lines from ``from`` up to
+    ``next_index``. Gaps or queue overflows are repaired by re-reading the
+    job from its cursor, so a client can resume from any index.
+    """
+
+    def __init__(self, manager: ExecutionManager) -> None:
+        self.manager = manager
+        self.subscription = manager.events.open()
+        self.cursors: Dict[str, int] = {}
+        self._frames: Dict[str, Dict[str, Any]] = {}
+
+    def handle(self, message: Any) -> List[Dict[str, Any]]:
+        """Apply a client command and return error frames to send back."""
+        if not isinstance(message, dict):
+            return [{"type": "error", "detail": "invalid_message"}]
+        op = message.get("op")
+        if op == "subscribe":
+            errors = []
+            for entry in message.get("jobs") or []:
+                job_id = entry.get("job_id") if isinstance(entry, dict) else entry
+                start = entry.get("from", 0) if isinstance(entry, dict) else 0
+                if not isinstance(job_id, str) or not isinstance(start, int) or start < 0:
+                    errors.append({"type": "error", "job_id": job_id, "detail": "invalid_subscription"})
+                elif not self.subscribe(job_id, start):
+                    errors.append({"type": "error", "job_id": job_id, "detail": "not_found"})
+            return errors
+        if op == "unsubscribe":
+            for job_id in message.get("jobs") or []:
+                self.unsubscribe(job_id)
+            return []
+        return [{"type": "error", "detail": f"unknown_op: {op}"}]
+
+    def subscribe(self, job_id: str, start_index: int = 0) -> bool:
+        # 먼저 구독한 뒤 따라잡아야 그 사이에 기록된 줄을 놓치지 않는다.
+        self.manager.events.subscribe(job_id, self.subscription)
+        self.cursors[job_id] = start_index
+        self._frames.pop(job_id, None)
+        if not self._resync(job_id):
+            self.unsubscribe(job_id)
+            return False
+        return True
+
+    def unsubscribe(self, job_id: str) -> None:
+        self.manager.events.unsubscribe(self.subscription, job_id)
+        self.cursors.pop(job_id, None)
+        self._frames.pop(job_id, None)
+
+    def _frame(self, job_id: str) -> Dict[str, Any]:
+        frame = self._frames.get(job_id)
+        if frame is None:
+            cursor = self.cursors[job_id]
+            frame = self._frames[job_id] = {"from": cursor, "logs": [], "next_index": cursor}
+        return frame
+
+    def _resync(self, job_id: str) -> bool:
+        try:
+            job_logs = self.manager.fetch_logs(job_id, self.cursors[job_id])
+        except KeyError:
+            return False
+        self.subscription.overflowed.discard(job_id)
+        frame = self._frame(job_id)
+        frame["logs"].extend(job_logs.logs)
+        frame["status"] = job_logs.status.value
+        frame["next_index"] = self.cursors[job_id] = job_logs.next_index
+        if job_logs.status in TERMINAL_STATUSES:
+            frame["done"] = True
+            self.manager.events.unsubscribe(self.subscription, job_id)
+        return True
+
+    def apply(self, job_id: str, event: JobEvent) -> None:
+        if job_id not in self.cursors or self._frames.get(job_id, {}).get("done"):
+            return
+        kind, index, data = event
+        if job_id in self.subscription.overflowed:
+            self._resync(job_id)
+        elif kind == "log":
+            cursor = self.cursors[job_id]
+            if index == cursor:
+                frame = self._frame(job_id)
+                frame["logs"].append(data)
+                frame["next_index"] = self.cursors[job_id] = cursor + 1
+            elif index > cursor:
+                self._resync(job_id)
+        elif kind == "status":
+            if data in TERMINAL_STATUSES:
+                self._resync(job_id)
+            else:
+                self._frame(job_id)["status"] = data.value
+
+    def take_batch(self) -> Optional[Dict[str, Any]]:
+        if not self._frames:
+            return None
+        frames, self._frames = self._frames, {}
+        for job_id, frame in frames.items():
+            if frame.get("done"):
+                self.cursors.pop(job_id, None)
+        return {"type": "logs", "jobs": frames}
+
+    async def next_batch(self, heartbeat: float, batch_interval: float = JOB_WS_BATCH_MS / 1000.0) -> Dict[str, Any]:
+        """Wait for events and return one batched frame (or a heartbeat)."""
+        while True:
+            pending = self.take_batch()
+            if pending:
+                return pending
+            try:
+                job_id, event = await self.subscription.get(heartbeat)
+            except asyncio.TimeoutError:
+                return {"type": "heartbeat"}
+            self.apply(job_id, event)
+            # 첫 이벤트 후 잠깐 기다려 같은 구간의 이벤트를 한 프레임으로 묶는다.
+            await asyncio.sleep(batch_interval)
+            while True:
+                item = self.subscription.get_nowait()
+                if item is None:
+                    break
+                self.apply(*item)
+
+    def close(self) -> None:
+        self.manager.events.unsubscribe(self.subscription)
+        self.cursors.clear()
+        self._frames.clear()
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import time
+import weakref
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from llm_client import AsyncLLMClient, LLMResult, LLMTimeout
+
+# 1 이면 동시에 들어온 계획 요청을 모아 한 번의 배치 호출로 보낸다(generate_batch 를 가진 백엔드만).
+LLM_BATCH_ENABLED = os.getenv("LLM_BATCH_ENABLED", "1") == "1"
+# 첫 요청 뒤 다른 요청을 기다리는 최대 시간(ms)과 한 배치의 최대 요청 수.
+LLM_BATCH_MAX_WAIT_MS = float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "5"))
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "8"))
+
+
+@dataclass
+class _Batch:
+    models: List[str]
+    system: Optional[str]
+    options: Optional[Dict[str, Any]]
+    prompts: List[str] = field(default_factory=list)
+    futures: List["asyncio.Future[LLMResult]"] = field(default_factory=list)
+    enqueued: List[float] = field(default_factory=list)
+    flushed_at: float = 0.0
+    timeout: float = 0.0
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class RequestCoalescer:
+    """Collects concurrent ``generate`` calls for a few milliseconds and sends them as one batch.
+
+    Requests join an open batch when they share the model, system prompt and
+    generation options. A batch is sent when it reaches ``max_batch`` or
+    ``max_wait`` after its first request, whichever comes first, through
+    ``AsyncLLMClient.generate_many``; each waiter gets its own result back.
+    Backends without ``generate_batch`` (Gemini) are called directly, so the
+    wait is only paid where batching helps.
+    """
+
+    def __init__(
+        self,
+        client: AsyncLLMClient,
+        max_batch: int = LLM_BATCH_MAX_SIZE,
+        max_wait: float = LLM_BATCH_MAX_WAIT_MS / 1000.0,
+        enabled: bool = LLM_BATCH_ENABLED,
+    ) -> None:
+        self.client = client
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.enabled = enabled
+        # 열린 배치는 이벤트 루프에 묶이므로 루프마다 따로 둔다.
+        self._open: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[Any, ...], _Batch]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._sizes: Counter = Counter()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    @property
+    def batching(self) -> bool:
+        return self.enabled and self.max_batch > 1 and hasattr(self.client.backend, "generate_batch")
+
+    async def generate(
+        self,
+        prompt: str,
+        models: Optional[Sequence[str]] = None,
+        timeout: Optional[float] = None,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> LLMResult:
+        if not self.batching:
+            return await self.client.generate(prompt, models, timeout, system, options)
+        models = list(models or await asyncio.to_thread(self.client._models))
+        timeout = self.client.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        key = (models[0], system, json.dumps(options or {}, sort_keys=True))
+        batches = self._open.setdefault(loop, {})
+        batch = batches.get(key)
+        if batch is None:
+            batch = batches[key] = _Batch(models, system, options)
+            batch.timer = loop.call_later(self.max_wait, self._flush, loop, key)
+        future: "asyncio.Future[LLMResult]" = loop.create_future()
+        batch.prompts.append(prompt)
+        batch.futures.append(future)
+        batch.enqueued.append(time.monotonic())
+        batch.timeout = max(batch.timeout, timeout)
+        if len(batch.prompts) >= self.max_batch:
+            self._flush(loop, key)
+        try:
+            # 배치 호출이 끝나도 각 요청은 자기 마감 시간만큼만 기다린다.
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError as exc:
+            # 늦게 끝난 배치의 오류가 "never retrieved" 경고로 남지 않게 한다.
+            future.add_done_callback(lambda done: done.cancelled() or done.exception())
+            raise LLMTimeout(f"LLM 응답이 {timeout:.1f}초 안에 오지 않았습니다.") from exc
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, key: Tuple[Any, ...]) -> None:
+        batch = self._open.get(loop, {}).pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        batch.flushed_at = time.monotonic()
+        self._sizes[len(batch.prompts)] += 1
+        task = loop.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: _Batch) -> None:
+        try:
+            results = await self.client.generate_many(
+                batch.prompts, batch.models, batch.timeout, batch.system, batch.options
+            )
+        except asyncio.CancelledError:
+            for future in batch.futures:
+                future.cancel()
+            raise
+        except Exception as exc:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future, enqueued, result in zip(batch.futures, batch.enqueued, results):
+            if not future.done():
+                # 배치가 모이기를 기다린 시간도 대기 시간이다.
+                result.queue_wait += batch.flushed_at - enqueued
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        batches = sum(self._sizes.values())
+        requests = sum(size * count for size, count in self._sizes.items())
+        return {
+            "enabled": self.batching,
+            "max_batch": self.max_batch,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "batches": batches,
+            "requests": requests,
+            "mean_size": round(requests / batches, 2) if batches else 0.0,
+            "sizes": {str(size): count for size, count in sorted(self._sizes.items())},
+        }
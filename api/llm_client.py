@@ -0,0 +1,703 @@
+import asyncio
+import datetime
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Protocol, Sequence, Set, Tuple, Union
+
+try:
+    import google.generativeai as genai
+except ImportError:  # pragma: no cover - stub 백엔드만 쓸 때는 없어도 된다.
+    genai = None
+
+# 사용할 백엔드: gemini, transformers, vllm(로컬 모델) 또는 테스트용 stub.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+# 호출 한 번의 마감 시간(초)과 동시에 보낼 수 있는 요청 수.
+LLM_TIMEOUT_SEC = float(os.getenv("LLM_TIMEOUT_SEC", "30"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# 첫 요청이 p95 안에 답하지 않으면 다음 후보 모델에 같은 요청을 하나 더 보낸다.
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "0") == "1"
+# 지연 표본이 모이기 전에 쓰는 헤지 대기 시간과 p95 계산에 필요한 최소 표본 수.
+LLM_HEDGE_DELAY_MS = float(os.getenv("LLM_HEDGE_DELAY_MS", "3000"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# 0 보다 크면 Gemini 명시적 컨텍스트 캐시에 시스템 프롬프트를 올려 두고 이 시간(초) 동안 재사용한다.
+# 0 이면 매 호출 같은 시스템 프롬프트를 보내 공급자의 암묵적 접두사 캐시에 맡긴다.
+LLM_PROMPT_CACHE_TTL_SEC = float(os.getenv("LLM_PROMPT_CACHE_TTL_SEC", "0"))
+# 0 보다 크면 같은 (모델, 시스템 프롬프트, 프롬프트, 옵션) 호출의 답을 이만큼 메모리에 보관한다.
+LLM_RESPONSE_CACHE_ENTRIES = int(os.getenv("LLM_RESPONSE_CACHE_ENTRIES", "0"))
+LLM_STUB_DELAY_MS = float(os.getenv("LLM_STUB_DELAY_MS", "50"))
+# stub 이 드론 명령 프롬프트가 아닌 요청에 돌려주는 고정 답.
+LLM_STUB_REPLY = os.getenv("LLM_STUB_REPLY", '{"commands": []}')
+# stub 스트리밍: 한 청크의 글자 수와 청크 사이 간격(ms).
+LLM_STUB_CHUNK_CHARS = int(os.getenv("LLM_STUB_CHUNK_CHARS", "16"))
+LLM_STUB_CHUNK_DELAY_MS = float(os.getenv("LLM_STUB_CHUNK_DELAY_MS", "5"))
+_LATENCY_SAMPLES = 256
+_THINK_BLOCK = re.compile(r"<think>.*?</think>", re.S)
+_CODE_FENCE = re.compile(r"```(?:json|pddl)?", re.I)
+
+
+class LLMTimeout(RuntimeError):
+    """The LLM did not answer before the call deadline."""
+
+
+@dataclass
+class LLMResult:
+    text: str
+    model: str
+    latency: float
+    hedged: bool = False
+    cached: bool = False
+    # 동시 실행 제한(과 배치 모으기)으로 기다린 시간, 스트림의 첫 청크까지 걸린 시간(초)
+    queue_wait: float = 0.0
+    first_token: Optional[float] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+@dataclass
+class Completion:
+    """A backend reply with token usage, when the backend reports it.
+
+    Backends may return a plain ``str`` instead; streams may end with a
+    ``Completion`` that only carries the usage.
+    """
+
+    text: str
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+def _as_completion(reply: Union[str, Completion]) -> Completion:
+    return reply if isinstance(reply, Completion) else Completion(reply)
+
+
+def _usage(response: Any) -> Tuple[Optional[int], Optional[int]]:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+
+class LLMBackend(Protocol):
+    """What AsyncLLMClient needs from a backend.
+
+    ``options`` uses the Gemini generation_config names (max_output_tokens,
+    stop_sequences, temperature, top_p); other backends translate them.
+    Backends that can run several prompts in one call also provide
+    ``generate_batch(model, prompts, timeout, system, options)``.
+    """
+
+    name: str
+    candidates: List[str]
+
+    def available_models(self) -> List[str]: ...
+
+    async def generate(
+        self, model: str, prompt: str, timeout: float, system: Optional[str] = None, options: Optional[Dict[str, Any]] = None
+    ) -> Union[str, Completion]: ...
+
+    def stream(
+        self, model: str, prompt: str, timeout: float, system: Optional[str] = None, options: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Union[str, Completion]]: ...
+
+
+def clean_reply(text: str) -> str:
+    """Drop ``<think>`` blocks and code fences that models wrap around their answer."""
+    return _CODE_FENCE.sub("", _THINK_BLOCK.sub("", text)).strip()
+
+
+class GeminiBackend:
+    """google-generativeai models called through their native async API."""
+
+    name = "gemini"
+
+    def __init__(self, candidates: Sequence[str], api_key: Optional[str] = None) -> None:
+        if genai is None:
+            raise RuntimeError(
+                "google-generativeai 패키지가 설치되어 있어야 합니다. "
+                "pip install google-generativeai 명령으로 설치해 주세요."
+            )
+        self.candidates = [cand.split("/")[-1] for cand in candidates if cand]
+        self.api_key = api_key
+        self._configured = False
+        self._available: Optional[List[str]] = None
+        # (모델, 시스템 프롬프트) -> (GenerativeModel, 컨텍스트 캐시 만료 시각 또는 0)
+        self._models: Dict[Tuple[str, Optional[str]], Tuple[Any, float]] = {}
+        self._cache_unsupported: Set[str] = set()
+
+    def configure(self) -> None:
+        if self._configured:
+            return
+        api_key = self.api_key or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise RuntimeError("환경변수 GOOGLE_API_KEY 가 필요합니다.")
+        genai.configure(api_key=api_key)
+        self._configured = True
+
+    def available_models(self) -> List[str]:
+        """CANDIDATES 중 generateContent 가능한 모델을 우선순위 순서로 돌려준다."""
+        if self._available is None:
+            self.configure()
+            available = {
+                model.name.split("/")[-1]
+                for model in genai.list_models()
+                if "generateContent" in getattr(model, "supported_generation_methods", [])
+            }
+            ordered = [cand for cand in self.candidates if cand in available]
+            if not ordered and available:
+                ordered = [sorted(available)[0]]
+            if not ordered:
+                raise RuntimeError("사용 가능한 Gemini 모델을 찾지 못했습니다. 콘솔 설정을 확인하세요.")
+            self._available = ordered
+        return self._available
+
+    def _cached_model(self, name: str, system: Optional[str]) -> Optional[Any]:
+        entry = self._models.get((name, system))
+        if entry is None or (entry[1] and time.time() >= entry[1]):
+            return None
+        return entry[0]
+
+    def model(self, name: str, system: Optional[str] = None) -> Any:
+        """GenerativeModel with ``system`` as its system instruction, built once per pair."""
+        model = self._cached_model(name, system)
+        if model is not None:
+            return model
+        self.configure()
+        expires_at = 0.0
+        model = None
+        if system and LLM_PROMPT_CACHE_TTL_SEC > 0 and name not in self._cache_unsupported:
+            try:
+                cached = genai.caching.CachedContent.create(
+                    model=f"models/{name}",
+                    system_instruction=system,
+                    ttl=datetime.timedelta(seconds=LLM_PROMPT_CACHE_TTL_SEC),
+                )
+                model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+                # 만료 직전에 다시 만들도록 여유를 둔다.
+                expires_at = time.time() + LLM_PROMPT_CACHE_TTL_SEC * 0.9
+            except Exception as exc:
+                # 프롬프트가 최소 토큰 수보다 짧거나 모델이 캐시를 지원하지 않으면 암묵적 캐시에 맡긴다.
+                print(f"[LLM WARNING] '{name}' 컨텍스트 캐시를 만들지 못했습니다: {exc}")
+                self._cache_unsupported.add(name)
+        if model is None:
+            model = genai.GenerativeModel(name, system_instruction=system)
+        self._models[(name, system)] = (model, expires_at)
+        return model
+
+    async def _model_async(self, name: str, system: Optional[str]) -> Any:
+        # 컨텍스트 캐시를 만드는 호출은 동기 네트워크 요청이라 스레드에서 한다.
+        return self._cached_model(name, system) or await asyncio.to_thread(self.model, name, system)
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        timeout: float,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Completion:
+        response = await (await self._model_async(model, system)).generate_content_async(
+            prompt, generation_config=options or None, request_options={"timeout": timeout}
+        )
+        return Completion((response.text or "").strip(), *_usage(response))
+
+    async def stream(
+        self,
+        model: str,
+        prompt: str,
+        timeout: float,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Union[str, Completion]]:
+        response = await (await self._model_async(model, system)).generate_content_async(
+            prompt, stream=True, generation_config=options or None, request_options={"timeout": timeout}
+        )
+        usage: Tuple[Optional[int], Optional[int]] = (None, None)
+        async for chunk in response:
+            text = chunk.text
+            if text:
+                yield text
+            # 사용량은 보통 마지막 청크에 실려 온다.
+            usage = _usage(chunk) if _usage(chunk) != (None, None) else usage
+        yield Completion("", *usage)
+
+
+class StubBackend:
+    """Local stand-in that answers without network access, for tests and offline demos.
+
+    ``respond`` maps ``(model, prompt)`` to the reply text; the default turns
+    the utterance at the end of a drone command prompt into commands with the
+    rule-based parser and answers anything else with LLM_STUB_REPLY.
+    ``delays`` sets a per-model latency in seconds.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        models: Sequence[str] = ("stub-primary", "stub-secondary"),
+        respond: Optional[Callable[[str, str], str]] = None,
+        delays: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.models = list(models)
+        self.candidates = list(models)
+        self.respond = respond or _stub_reply
+        self.delays = delays or {}
+        self.calls: List[str] = []
+
+    def available_models(self) -> List[str]:
+        return self.models
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        timeout: float,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Completion:
+        self.calls.append(model)
+        await asyncio.sleep(self.delays.get(model, LLM_STUB_DELAY_MS / 1000.0))
+        return _stub_completion(prompt, self.respond(model, prompt), system, options)
+
+    async def generate_batch(
+        self,
+        model: str,
+        prompts: Sequence[str],
+        timeout: float,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> List[str]:
+        # 배치 엔진처럼 한 번의 지연으로 모든 프롬프트에 답한다.
+        self.calls.append(model)
+        await asyncio.sleep(self.delays.get(model, LLM_STUB_DELAY_MS / 1000.0))
+        return [_stub_completion(prompt, self.respond(model, prompt), system, options) for prompt in prompts]
+
+    async def stream(
+        self,
+        model: str,
+        prompt: str,
+        timeout: float,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Union[str, Completion]]:
+        self.calls.append(model)
+        await asyncio.sleep(self.delays.get(model, LLM_STUB_DELAY_MS / 1000.0))
+        completion = _stub_completion(prompt, self.respond(model, prompt), system, options)
+        reply = completion.text
+        for start in range(0, len(reply), LLM_STUB_CHUNK_CHARS):
+            if start:
+                await asyncio.sleep(LLM_STUB_CHUNK_DELAY_MS / 1000.0)
+            yield reply[start : start + LLM_STUB_CHUNK_CHARS]
+        yield Completion("", completion.input_tokens, completion.output_tokens)
+
+
+def _apply_stop(reply: str, options: Optional[Dict[str, Any]]) -> str:
+    """Cut ``reply`` at the first stop sequence, like a real provider would."""
+    for stop in (options or {}).get("stop_sequences", []):
+        reply = reply.split(stop, 1)[0]
+    return reply
+
+
+def _stub_completion(
+    prompt: str, reply: str, system: Optional[str], options: Optional[Dict[str, Any]]
+) -> Completion:
+    # 토큰 수는 대략 4글자에 1토큰으로 어림한다.
+    reply = _apply_stop(reply, options)
+    return Completion(reply, (len(system or "") + len(prompt)) // 4 + 1, len(reply) // 4 + 1)
+
+
+_API_COMMAND_PARSER = Path(__file__).resolve().parent / "command_parser.py"
+
+
+def _api_parse_command() -> Callable[[str], Any]:
+    """api/command_parser.parse_command, even when SITL's ``command_parser`` is the one on sys.path."""
+    module = sys.modules.get("command_parser")
+    if module is not None and Path(getattr(module, "__file__", "") or "").resolve() == _API_COMMAND_PARSER:
+        return module.parse_command
+    module = sys.modules.get("api_command_parser")
+    if module is None:
+        spec = importlib.util.spec_from_file_location("api_command_parser", _API_COMMAND_PARSER)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["api_command_parser"] = module
+        spec.loader.exec_module(module)
+    return module.parse_command
+
+
+def _stub_reply(model: str, prompt: str) -> str:
+    if "[사용자 발화]" not in prompt:
+        return LLM_STUB_REPLY
+    utterance = prompt.rsplit("[사용자 발화]", 1)[-1].strip()
+    return json.dumps(_api_parse_command()(utterance).payload, ensure_ascii=False)
+
+
+def make_backend(candidates: Sequence[str] = (), name: str = LLM_BACKEND, **kwargs: Any) -> LLMBackend:
+    """Build a backend by name. ``kwargs`` go to the backend (api_key, model, engine options...)."""
+    if name == "stub":
+        return StubBackend(**kwargs)
+    if name == "gemini":
+        return GeminiBackend(candidates, **kwargs)
+    if name in ("transformers", "vllm"):
+        from local_llm import TransformersBackend, VLLMBackend
+
+        return (TransformersBackend if name == "transformers" else VLLMBackend)(**kwargs)
+    raise ValueError(f"알 수 없는 LLM_BACKEND: {name}")
+
+
+class ResponseCache:
+    """Small in-memory LRU of raw replies, keyed by everything that shapes the answer."""
+
+    def __init__(self, entries: int = LLM_RESPONSE_CACHE_ENTRIES) -> None:
+        self.entries = entries
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(backend: str, model: str, prompt: str, system: Optional[str], options: Optional[Dict[str, Any]]) -> str:
+        raw = json.dumps([backend, model, system, prompt, options or {}], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._items.get(key)
+            if text is not None:
+                self._items.move_to_end(key)
+            return text
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._items[key] = text
+            self._items.move_to_end(key)
+            while len(self._items) > self.entries:
+                self._items.popitem(last=False)
+
+
+class AsyncLLMClient:
+    """Non-blocking LLM calls with a deadline, a concurrency cap and optional hedging.
+
+    Every call holds a semaphore slot while it talks to the backend, so a
+    burst of requests cannot open unbounded connections. With hedging on, a
+    call that has not answered within the rolling p95 latency sends the same
+    prompt to the next candidate model and returns whichever answers first.
+
+    This is the one entry point for every LLM user in the project (the api
+    server, the SITL and Tello consoles, the NLPDDL generators); scripts
+    without an event loop call ``generate_sync``.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        timeout: float = LLM_TIMEOUT_SEC,
+        concurrency: int = LLM_MAX_CONCURRENCY,
+        hedge: bool = LLM_HEDGE_ENABLED,
+        hedge_delay: float = LLM_HEDGE_DELAY_MS / 1000.0,
+        router: Any = None,
+        cache: Any = None,
+    ) -> None:
+        self.backend = backend
+        # get(key)/put(key, text) 를 가진 객체. 없으면 LLM_RESPONSE_CACHE_ENTRIES 로 정한다.
+        if cache is None and LLM_RESPONSE_CACHE_ENTRIES > 0:
+            cache = ResponseCache()
+        self.cache = cache
+        # ModelRouter 가 있으면 모델 순서를 정하고 호출 결과를 기록한다.
+        self.router = router
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        # 세마포어는 이벤트 루프에 묶이므로 루프마다 따로 만든다(동기 래퍼는 매번 새 루프를 쓴다).
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._latencies: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._first_chunks: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._counters = {"calls": 0, "streams": 0, "errors": 0, "timeouts": 0, "hedged": 0, "hedge_wins": 0, "batches": 0, "cache_hits": 0}
+        self._in_flight = 0
+
+    def _slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return semaphore
+
+    def current_hedge_delay(self) -> float:
+        if len(self._latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return self.hedge_delay
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def _models(self) -> List[str]:
+        if self.router is not None:
+            return self.router.route()
+        return self.backend.available_models()
+
+    async def _route(self) -> List[str]:
+        if self.router is not None:
+            # route() 는 워커 스레드에서 돌므로 상태 확인 요청을 띄울 루프를 먼저 알려 준다.
+            self.router.bind_loop()
+        return await asyncio.to_thread(self._models)
+
+    def _record(self, model: str, started: float, ok: bool, error: Optional[BaseException] = None) -> None:
+        if self.router is not None:
+            detail = (str(error) or error.__class__.__name__) if error is not None else None
+            self.router.record(model, time.monotonic() - started, ok, detail)
+
+    async def _call(
+        self, model: str, prompt: str, deadline: float, system: Optional[str], options: Optional[Dict[str, Any]]
+    ) -> LLMResult:
+        started = time.monotonic()
+        async with self._slots():
+            self._in_flight += 1
+            # 세마포어 대기 시간은 모델 지연에 넣지 않는다.
+            called = time.monotonic()
+            try:
+                remaining = max(deadline - called, 0.0)
+                reply = _as_completion(
+                    await self.backend.generate(model, prompt, remaining, system=system, options=options)
+                )
+            except asyncio.CancelledError:
+                # 헤지에서 진 요청이거나 마감 시간 초과. 마감 초과는 generate() 에서 기록한다.
+                raise
+            except Exception as exc:
+                self._record(model, called, False, exc)
+                raise
+            finally:
+                self._in_flight -= 1
+        self._record(model, called, True)
+        latency = time.monotonic() - started
+        self._latencies.append(latency)
+        return LLMResult(
+            text=reply.text,
+            model=model,
+            latency=latency,
+            queue_wait=called - started,
+            input_tokens=reply.input_tokens,
+            output_tokens=reply.output_tokens,
+        )
+
+    async def generate(
+        self,
+        prompt: str,
+        models: Optional[Sequence[str]] = None,
+        timeout: Optional[float] = None,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> LLMResult:
+        """Send ``prompt`` to the first of ``models`` (hedging onto the second).
+
+        ``system`` is the fixed system instruction and ``options`` the
+        generation limits (max_output_tokens, stop_sequences, temperature).
+        """
+        models = list(models or await self._route())
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        self._counters["calls"] += 1
+        key = None
+        if self.cache is not None:
+            key = ResponseCache.make_key(self.backend.name, models[0], prompt, system, options)
+            text = self.cache.get(key)
+            if text is not None:
+                self._counters["cache_hits"] += 1
+                return LLMResult(text=text, model=models[0], latency=time.monotonic() - started, cached=True)
+        try:
+            result = await asyncio.wait_for(self._generate(prompt, models, deadline, system, options), timeout)
+        except asyncio.TimeoutError as exc:
+            self._counters["timeouts"] += 1
+            self._record(models[0], started, False, exc)
+            raise LLMTimeout(f"LLM 응답이 {timeout:.1f}초 안에 오지 않았습니다.") from exc
+        except Exception:
+            self._counters["errors"] += 1
+            raise
+        if key is not None:
+            self.cache.put(key, result.text)
+        return result
+
+    async def generate_many(
+        self,
+        prompts: Sequence[str],
+        models: Optional[Sequence[str]] = None,
+        timeout: Optional[float] = None,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> List[LLMResult]:
+        """Answer several prompts with one model, in a single backend call when it supports batches."""
+        generate_batch = getattr(self.backend, "generate_batch", None)
+        if generate_batch is None or len(prompts) < 2:
+            return list(
+                await asyncio.gather(
+                    *(self.generate(prompt, models, timeout, system, options) for prompt in prompts)
+                )
+            )
+        models = list(models or await self._route())
+        timeout = self.timeout if timeout is None else timeout
+        self._counters["calls"] += len(prompts)
+        self._counters["batches"] += 1
+        started = time.monotonic()
+        called = started
+        try:
+            async with self._slots():
+                self._in_flight += 1
+                called = time.monotonic()
+                try:
+                    replies = await asyncio.wait_for(
+                        generate_batch(models[0], list(prompts), timeout, system=system, options=options), timeout
+                    )
+                finally:
+                    self._in_flight -= 1
+        except asyncio.TimeoutError as exc:
+            self._counters["timeouts"] += 1
+            self._record(models[0], started, False, exc)
+            raise LLMTimeout(f"LLM 응답이 {timeout:.1f}초 안에 오지 않았습니다.") from exc
+        except Exception as exc:
+            self._counters["errors"] += 1
+            self._record(models[0], started, False, exc)
+            raise
+        self._record(models[0], called, True)
+        latency = time.monotonic() - started
+        self._latencies.append(latency)
+        return [
+            LLMResult(
+                text=reply.text,
+                model=models[0],
+                latency=latency,
+                queue_wait=called - started,
+                input_tokens=reply.input_tokens,
+                output_tokens=reply.output_tokens,
+            )
+            for reply in map(_as_completion, replies)
+        ]
+
+    def generate_sync(self, prompt: str, **kwargs: Any) -> LLMResult:
+        """``generate`` for code without an event loop (CLI scripts). Not for use inside a running loop."""
+        return asyncio.run(self.generate(prompt, **kwargs))
+
+    async def _generate(
+        self,
+        prompt: str,
+        models: List[str],
+        deadline: float,
+        system: Optional[str],
+        options: Optional[Dict[str, Any]],
+    ) -> LLMResult:
+        primary = asyncio.ensure_future(self._call(models[0], prompt, deadline, system, options))
+        if not self.hedge or len(models) < 2:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=self.current_hedge_delay())
+        if done:
+            return primary.result()
+        self._counters["hedged"] += 1
+        backup = asyncio.ensure_future(self._call(models[1], prompt, deadline, system, options))
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        result = task.result()
+                        result.hedged = True
+                        if task is backup:
+                            self._counters["hedge_wins"] += 1
+                        return result
+                    error = task.exception()
+            raise error  # 두 요청 모두 실패
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(
+        self,
+        prompt: str,
+        models: Optional[Sequence[str]] = None,
+        timeout: Optional[float] = None,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        on_result: Optional[Callable[[LLMResult], None]] = None,
+    ) -> AsyncIterator[str]:
+        """Yield the answer of the first of ``models`` chunk by chunk.
+
+        The deadline covers the whole stream. Streams are not hedged: once
+        chunks have been handed out they cannot be swapped for another model's.
+        ``on_result`` gets the timings and token usage once the stream ends.
+        """
+        models = list(models or await self._route())
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        self._counters["streams"] += 1
+        result = LLMResult(text="", model=models[0], latency=0.0)
+        parts: List[str] = []
+        try:
+            async with self._slots():
+                self._in_flight += 1
+                result.queue_wait = time.monotonic() - started
+                chunks = self.backend.stream(
+                    models[0], prompt, max(deadline - time.monotonic(), 0.0), system=system, options=options
+                )
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), max(deadline - time.monotonic(), 0.0))
+                        except StopAsyncIteration:
+                            break
+                        if isinstance(chunk, Completion):
+                            result.input_tokens, result.output_tokens = chunk.input_tokens, chunk.output_tokens
+                            chunk = chunk.text
+                        if not chunk:
+                            continue
+                        if result.first_token is None:
+                            result.first_token = time.monotonic() - started
+                            self._first_chunks.append(result.first_token)
+                        parts.append(chunk)
+                        yield chunk
+                finally:
+                    self._in_flight -= 1
+                    await chunks.aclose()
+        except asyncio.TimeoutError as exc:
+            self._counters["timeouts"] += 1
+            self._record(models[0], started, False, exc)
+            raise LLMTimeout(f"LLM 응답이 {timeout:.1f}초 안에 끝나지 않았습니다.") from exc
+        except Exception as exc:
+            self._counters["errors"] += 1
+            self._record(models[0], started, False, exc)
+            raise
+        self._record(models[0], started, True)
+        result.latency = time.monotonic() - started
+        self._latencies.append(result.latency)
+        if on_result is not None:
+            result.text = "".join(parts)
+            on_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self._latencies)
+        first_chunks = sorted(self._first_chunks)
+        return {
+            "backend": self.backend.name,
+            "in_flight": self._in_flight,
+            "concurrency": self.concurrency,
+            "timeout_sec": self.timeout,
+            "hedge": self.hedge,
+            "hedge_delay_ms": round(self.current_hedge_delay() * 1000, 1),
+            "latency_ms": {
+                "samples": len(ordered),
+                "p50": round(ordered[len(ordered) // 2] * 1000, 1) if ordered else 0.0,
+                "p95": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1) if ordered else 0.0,
+            },
+            "first_chunk_ms": {
+                "samples": len(first_chunks),
+                "p50": round(first_chunks[len(first_chunks) // 2] * 1000, 1) if first_chunks else 0.0,
+            },
+            **self._counters,
+        }
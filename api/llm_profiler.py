@@ -0,0 +1,180 @@
+import bisect
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm_client import LLMResult
+from log_writer import LogWriter
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# LLM 호출마다 단계별 시간을 한 줄 JSON 으로 남기는 파일. 비워 두면 기록하지 않는다.
+LLM_PROFILE_LOG_PATH = os.getenv("LLM_PROFILE_LOG_PATH", str(BASE_DIR / "llm_profiles" / "calls.jsonl"))
+
+# 히스토그램 버킷 상한. 시간은 ms, 토큰은 개수. 마지막 버킷은 그보다 큰 값 전부.
+_MS_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 60000)
+_TOKEN_BOUNDS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+_METRICS = {
+    "prompt_build_ms": _MS_BOUNDS,
+    "queue_wait_ms": _MS_BOUNDS,
+    "first_token_ms": _MS_BOUNDS,
+    "llm_ms": _MS_BOUNDS,
+    "parse_ms": _MS_BOUNDS,
+    "total_ms": _MS_BOUNDS,
+    "input_tokens": _TOKEN_BOUNDS,
+    "output_tokens": _TOKEN_BOUNDS,
+}
+
+
+class _Histogram:
+    def __init__(self, bounds: Tuple[int, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.samples = 0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.samples += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile (max for the overflow bucket)."""
+        if not self.samples:
+            return None
+        rank = q * self.samples
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return float(self.bounds[idx]) if idx < len(self.bounds) else round(self.max, 1)
+        return round(self.max, 1)
+
+    def summary(self) -> Dict[str, Any]:
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "samples": self.samples,
+            "mean": round(self.total / self.samples, 1) if self.samples else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 1) if self.samples else None,
+            "buckets": {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+
+@dataclass
+class LLMCall:
+    """Stage timings of one planning call, filled in as the call goes."""
+
+    profile: str
+    streamed: bool = False
+    model: Optional[str] = None
+    prompt_build_ms: Optional[float] = None
+    queue_wait_ms: Optional[float] = None
+    first_token_ms: Optional[float] = None
+    llm_ms: Optional[float] = None
+    parse_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    parse_ok: Optional[bool] = None
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+    _mark: float = field(default=0.0, repr=False)
+
+    def __post_init__(self) -> None:
+        self._mark = self._started
+
+    def lap(self) -> float:
+        """ms since the previous lap (or the start)."""
+        now = time.perf_counter()
+        elapsed = (now - self._mark) * 1000
+        self._mark = now
+        return round(elapsed, 3)
+
+    def llm_done(self, result: LLMResult) -> None:
+        self.llm_ms = self.lap()
+        self.model = result.model
+        self.queue_wait_ms = round(result.queue_wait * 1000, 3)
+        if result.first_token is not None:
+            self.first_token_ms = round(result.first_token * 1000, 3)
+        self.input_tokens = result.input_tokens
+        self.output_tokens = result.output_tokens
+
+    def record(self) -> Dict[str, Any]:
+        self.total_ms = round((time.perf_counter() - self._started) * 1000, 3)
+        return {key: value for key, value in asdict(self).items() if not key.startswith("_")}
+
+
+class LLMProfiler:
+    """Aggregates LLMCall records into histograms per (model, prompt profile).
+
+    Every finished call is also appended as one JSON line to ``log_path``
+    through the background ``LogWriter``.
+    """
+
+    def __init__(self, log_path: Optional[str] = LLM_PROFILE_LOG_PATH) -> None:
+        self.log_path = Path(log_path) if log_path else None
+        self._writer: Optional[LogWriter] = None
+        self._groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def start(self, profile: str, streamed: bool = False) -> LLMCall:
+        return LLMCall(profile=profile, streamed=streamed)
+
+    def finish(self, call: LLMCall) -> None:
+        record = call.record()
+        key = (call.model or "-", call.profile)
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = {
+                    "calls": 0,
+                    "errors": 0,
+                    "parse_failures": 0,
+                    "histograms": {name: _Histogram(bounds) for name, bounds in _METRICS.items()},
+                }
+            group["calls"] += 1
+            group["errors"] += call.error is not None
+            group["parse_failures"] += call.parse_ok is False
+            for name, histogram in group["histograms"].items():
+                value = record.get(name)
+                if value is not None:
+                    histogram.add(value)
+        self._write(record)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if self.log_path is None:
+            return
+        try:
+            # 동시에 끝난 호출들이 각자 writer 를 만들어 같은 파일에 쓰지 않도록 잠금 안에서 한 번만 만든다.
+            with self._lock:
+                if self._writer is None:
+                    self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._writer = LogWriter()
+                writer = self._writer
+            writer.write(self.log_path, (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        except OSError as exc:
+            print(f"[PROFILER WARNING] LLM 호출 기록을 남기지 못했습니다: {exc}")
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            groups: List[Dict[str, Any]] = [
+                {
+                    "model": model,
+                    "profile": profile,
+                    "calls": group["calls"],
+                    "errors": group["errors"],
+                    "parse_failures": group["parse_failures"],
+                    "stages": {name: histogram.summary() for name, histogram in group["histograms"].items()},
+                }
+                for (model, profile), group in sorted(self._groups.items())
+            ]
+        return {"log_path": str(self.log_path) if self.log_path else None, "groups": groups}
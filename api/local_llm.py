@@ -0,0 +1,208 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Union
+
+from llm_client import Completion
+
+# 로컬 모델 백엔드(transformers, vllm)의 모델 이름과 다운로드 위치.
+LLM_LOCAL_MODEL = os.getenv("LLM_LOCAL_MODEL", "Qwen/Qwen3-1.7B")
+LLM_LOCAL_DOWNLOAD_DIR = os.getenv("LLM_LOCAL_DOWNLOAD_DIR") or None
+LLM_LOCAL_DTYPE = os.getenv("LLM_LOCAL_DTYPE", "bfloat16")
+# 출력 길이를 지정하지 않은 호출의 최대 토큰 수.
+LLM_LOCAL_MAX_TOKENS = int(os.getenv("LLM_LOCAL_MAX_TOKENS", "1024"))
+LLM_VLLM_MAX_MODEL_LEN = int(os.getenv("LLM_VLLM_MAX_MODEL_LEN", "2048"))
+LLM_VLLM_GPU_MEMORY_UTILIZATION = float(os.getenv("LLM_VLLM_GPU_MEMORY_UTILIZATION", "0.3"))
+
+
+def _messages(prompt: str, system: Optional[str]) -> List[Dict[str, str]]:
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _cut_at_stop(completion: Completion, options: Dict[str, Any]) -> Completion:
+    text = completion.text
+    for stop in options.get("stop_sequences", []):
+        text = text.split(stop, 1)[0]
+    completion.text = text.strip()
+    return completion
+
+
+class _LocalBackend(ABC):
+    """Shared parts of the in-process backends: one model, calls run in a worker thread.
+
+    The model is loaded on first use and generation is serialised with a
+    lock; ``generate_batch`` is the efficient path when several prompts are
+    ready at once.
+    """
+
+    name = "local"
+
+    def __init__(self, model: str = LLM_LOCAL_MODEL) -> None:
+        self.model_name = model
+        self.candidates = [model]
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def available_models(self) -> List[str]:
+        return [self.model_name]
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self._load()
+            self._loaded = True
+
+    @abstractmethod
+    def _load(self) -> None:
+        """Load the model and tokenizer/engine; called once, under the lock."""
+
+    @abstractmethod
+    def _generate_batch_sync(
+        self, prompts: Sequence[str], system: Optional[str], options: Dict[str, Any]
+    ) -> List[Completion]:
+        """Generate one completion per prompt; called under the lock."""
+
+    def _run_batch(self, prompts: Sequence[str], system: Optional[str], options: Dict[str, Any]) -> List[Completion]:
+        with self._lock:
+            self._ensure_loaded()
+            return [_cut_at_stop(reply, options) for reply in self._generate_batch_sync(prompts, system, options)]
+
+    async def generate_batch(
+        self,
+        model: str,
+        prompts: Sequence[str],
+        timeout: float,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> List[Completion]:
+        # 스레드 안의 생성은 중간에 멈출 수 없어 마감 시간은 AsyncLLMClient 쪽에서만 지킨다.
+        return await asyncio.to_thread(self._run_batch, list(prompts), system, options or {})
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        timeout: float,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Completion:
+        return (await self.generate_batch(model, [prompt], timeout, system, options))[0]
+
+    async def stream(
+        self,
+        model: str,
+        prompt: str,
+        timeout: float,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Union[str, Completion]]:
+        # 로컬 백엔드는 완성된 답을 한 청크로 돌려준다.
+        yield await self.generate(model, prompt, timeout, system, options)
+
+
+class TransformersBackend(_LocalBackend):
+    """Hugging Face transformers model on the local GPU/CPU."""
+
+    name = "transformers"
+
+    def _load(self) -> None:
+        try:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+        except ImportError as exc:
+            raise RuntimeError(
+                "transformers 백엔드에는 torch 와 transformers 패키지가 필요합니다. "
+                "pip install torch transformers 명령으로 설치해 주세요."
+            ) from exc
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            self.model_name, cache_dir=LLM_LOCAL_DOWNLOAD_DIR, trust_remote_code=True
+        )
+        # 배치 생성은 왼쪽 패딩이어야 프롬프트 끝에서 바로 이어 쓴다.
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(
+            self.model_name,
+            cache_dir=LLM_LOCAL_DOWNLOAD_DIR,
+            torch_dtype=getattr(torch, LLM_LOCAL_DTYPE, "auto"),
+            device_map="auto",
+            trust_remote_code=True,
+        )
+
+    def _generate_batch_sync(
+        self, prompts: Sequence[str], system: Optional[str], options: Dict[str, Any]
+    ) -> List[Completion]:
+        texts = [
+            self.tokenizer.apply_chat_template(_messages(prompt, system), tokenize=False, add_generation_prompt=True)
+            if getattr(self.tokenizer, "chat_template", None)
+            else f"{system}\n\n{prompt}" if system else prompt
+            for prompt in prompts
+        ]
+        inputs = self.tokenizer(texts, return_tensors="pt", padding=True).to(self.model.device)
+        temperature = options.get("temperature", 0.0)
+        kwargs: Dict[str, Any] = {
+            "max_new_tokens": options.get("max_output_tokens") or LLM_LOCAL_MAX_TOKENS,
+            "do_sample": bool(temperature),
+            "pad_token_id": self.tokenizer.pad_token_id,
+        }
+        if temperature:
+            kwargs["temperature"] = temperature
+            kwargs["top_p"] = options.get("top_p", 1.0)
+        with self._torch.inference_mode():
+            output = self.model.generate(**inputs, **kwargs)
+        new_tokens = output[:, inputs["input_ids"].shape[1] :]
+        input_counts = inputs["attention_mask"].sum(dim=1).tolist()
+        output_counts = (new_tokens != self.tokenizer.pad_token_id).sum(dim=1).tolist()
+        return [
+            Completion(text, int(input_count), int(output_count))
+            for text, input_count, output_count in zip(
+                self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True), input_counts, output_counts
+            )
+        ]
+
+
+class VLLMBackend(_LocalBackend):
+    """vLLM offline engine; a batch of prompts goes through one ``LLM.generate`` call."""
+
+    name = "vllm"
+
+    def __init__(self, model: str = LLM_LOCAL_MODEL, **engine_kwargs: Any) -> None:
+        super().__init__(model)
+        self.engine_kwargs = {
+            "download_dir": LLM_LOCAL_DOWNLOAD_DIR,
+            "dtype": LLM_LOCAL_DTYPE,
+            "seed": 0,
+            "max_model_len": LLM_VLLM_MAX_MODEL_LEN,
+            "gpu_memory_utilization": LLM_VLLM_GPU_MEMORY_UTILIZATION,
+            "trust_remote_code": True,
+            **engine_kwargs,
+        }
+
+    def _load(self) -> None:
+        try:
+            from vllm import LLM, SamplingParams
+        except ImportError as exc:
+            raise RuntimeError("vllm 백엔드에는 vllm 패키지가 필요합니다. pip install vllm 명령으로 설치해 주세요.") from exc
+        self._sampling_params = SamplingParams
+        self.llm = LLM(model=self.model_name, **self.engine_kwargs)
+
+    def _generate_batch_sync(
+        self, prompts: Sequence[str], system: Optional[str], options: Dict[str, Any]
+    ) -> List[Completion]:
+        params = self._sampling_params(
+            temperature=options.get("temperature", 0.0),
+            top_p=options.get("top_p", 1.0),
+            max_tokens=options.get("max_output_tokens") or LLM_LOCAL_MAX_TOKENS,
+            stop=list(options.get("stop_sequences", [])) or None,
+        )
+        if system:
+            outputs = self.llm.chat([_messages(prompt, system) for prompt in prompts], sampling_params=params)
+        else:
+            outputs = self.llm.generate(list(prompts), sampling_params=params)
+        return [
+            Completion(output.outputs[0].text, len(output.prompt_token_ids or []), len(output.outputs[0].token_ids))
+            for output in outputs
+        ]
@@ -0,0 +1,170 @@
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
+from log_writer import LogWriter
+
+if TYPE_CHECKING:  # pragma: no cover
+    from job_retention import JobArchive
+
+# 메모리에 남겨 둘 완료/디스크 작업 로그 수(LRU). 실행 중인 작업은 세지 않는다.
+JOB_LOG_CACHE_SIZE = int(os.getenv("JOB_LOG_CACHE_SIZE", "64"))
+
+
+class _JobLog:
+    """Lines of one job plus the byte offset where each line starts in its file."""
+
+    __slots__ = ("path", "lines", "offsets", "size", "writable")
+
+    def __init__(self, path: Path, lines: Optional[List[str]] = None, writable: bool = False) -> None:
+        self.path = path
+        # lines 가 None 이면 cold 상태: 파일 offset 인덱스로만 읽는다.
+        self.lines = lines
+        self.offsets = array("Q")
+        self.size = 0
+        self.writable = writable
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def index_file(self) -> None:
+        """Extend the offset index with any lines written since the last scan."""
+        if not self.path.exists():
+            return
+        with self.path.open("rb") as handle:
+            handle.seek(self.size)
+            position = self.size
+            for raw in handle:
+                if not raw.endswith(b"\n"):
+                    # 아직 쓰는 중인 마지막 줄은 다음 스캔에서 인덱싱한다.
+                    break
+                self.offsets.append(position)
+                position += len(raw)
+            self.size = position
+
+    def read_file(self, start_index: int) -> List[str]:
+        if start_index >= len(self.offsets):
+            return []
+        with self.path.open("rb") as handle:
+            handle.seek(self.offsets[start_index])
+            data = handle.read(self.size - self.offsets[start_index])
+        return data.decode("utf-8").split("\n")[:-1]
+
+
+class JobLogStore:
+    """Per-job log store serving "lines from N onward" in O(new lines).
+
+    Lines of running jobs are kept in memory and handed to a background
+    ``LogWriter`` that appends them to their ``.log`` file. Jobs that only
+    exist on disk (after a restart or an eviction) are read through a
+    line-offset index built once per file, and archived jobs are reloaded
+    from the ``JobArchive``. At most ``max_cached`` such jobs stay in memory.
+    """
+
+    def __init__(
+        self,
+        log_dir: Path,
+        writer: Optional[LogWriter] = None,
+        archive: Optional["JobArchive"] = None,
+        max_cached: int = JOB_LOG_CACHE_SIZE,
+    ) -> None:
+        self.log_dir = log_dir
+        self.writer = writer or LogWriter()
+        self.archive = archive
+        self.max_cached = max_cached
+        self._jobs: "OrderedDict[str, _JobLog]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, job_id: str) -> Path:
+        return self.log_dir / f"{job_id}.log"
+
+    def create(self, job_id: str) -> Path:
+        path = self.path_for(job_id)
+        path.write_text("", encoding="utf-8")
+        with self._lock:
+            self._jobs[job_id] = _JobLog(path, lines=[], writable=True)
+        return path
+
+    def append(self, job_id: str, entry: str) -> Optional[int]:
+        """Append ``entry`` and return its line index (``None`` for unknown jobs)."""
+        encoded = (entry + "\n").encode("utf-8")
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.writable:
+                return None
+            index = len(job.lines)  # type: ignore[arg-type]
+            job.lines.append(entry)  # type: ignore[union-attr]
+            job.offsets.append(job.size)
+            job.size += len(encoded)
+            self.writer.write(job.path, encoded)
+            return index
+
+    def close(self, job_id: str) -> None:
+        """Flush and release the file handle of a finished job."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.writable = False
+        self.writer.close_file(job.path)
+
+    def evict(self, job_id: str) -> None:
+        """Drop the in-memory lines and index of a finished job."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job.writable:
+                del self._jobs[job_id]
+
+    def is_active(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is not None and job.writable
+
+    def _trim(self) -> None:
+        cached = [job_id for job_id, job in self._jobs.items() if not job.writable]
+        for job_id in cached[: max(len(cached) - self.max_cached, 0)]:
+            del self._jobs[job_id]
+
+    def _resolve(self, job_id: str) -> _JobLog:
+        job = self._jobs.get(job_id)
+        if job is not None and job.lines is None and not job.path.exists():
+            # 보관 작업이 파일을 아카이브로 옮겼다. 아카이브에서 다시 읽는다.
+            del self._jobs[job_id]
+            job = None
+        if job is None:
+            path = self.path_for(job_id)
+            if path.exists():
+                job = _JobLog(path)
+            else:
+                lines = self.archive.read_log(job_id) if self.archive is not None else None
+                if lines is None:
+                    raise KeyError(job_id)
+                job = _JobLog(path, lines=lines)
+            self._jobs[job_id] = job
+            self._trim()
+        else:
+            self._jobs.move_to_end(job_id)
+        if job.lines is None:
+            job.index_file()
+        return job
+
+    def read(self, job_id: str, start_index: int = 0) -> List[str]:
+        """Return the lines of ``job_id`` from ``start_index`` onward."""
+        with self._lock:
+            job = self._resolve(job_id)
+            if job.lines is not None:
+                return job.lines[start_index:]
+            return job.read_file(start_index)
+
+    def tail(self, job_id: str, count: int) -> List[str]:
+        """Return the last ``count`` lines without reading the whole log."""
+        if count <= 0:
+            return []
+        with self._lock:
+            job = self._resolve(job_id)
+            if job.lines is not None:
+                return job.lines[-count:]
+            return job.read_file(max(len(job) - count, 0))
@@ -0,0 +1,146 @@
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+# 그룹 커밋 조건: 모인 바이트가 BATCH_BYTES 를 넘거나 첫 요청 후 FLUSH_INTERVAL 이 지나면 기록한다.
+LOG_WRITER_BATCH_BYTES = int(os.getenv("LOG_WRITER_BATCH_BYTES", str(64 * 1024)))
+LOG_WRITER_FLUSH_INTERVAL_SEC = float(os.getenv("LOG_WRITER_FLUSH_INTERVAL_MS", "50")) / 1000.0
+# never: OS 에 맡김 / batch: 그룹 커밋마다 fsync / close: 작업 종료 시 한 번 fsync
+LOG_WRITER_FSYNC = os.getenv("LOG_WRITER_FSYNC", "close").lower()
+FSYNC_POLICIES = {"never", "batch", "close"}
+
+_WRITE = "write"
+_CLOSE = "close"
+_BARRIER = "barrier"
+_STOP = "stop"
+
+_Request = Tuple[str, Optional[Path], object]
+
+
+class LogWriter:
+    """Background thread appending job log lines with group commit.
+
+    Callers only enqueue bytes. The writer keeps one open handle per log file,
+    coalesces everything queued within a short window (or up to a byte budget)
+    into a single write per file, and applies the configured fsync policy.
+    """
+
+    def __init__(
+        self,
+        batch_bytes: int = LOG_WRITER_BATCH_BYTES,
+        flush_interval: float = LOG_WRITER_FLUSH_INTERVAL_SEC,
+        fsync: str = LOG_WRITER_FSYNC,
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"LOG_WRITER_FSYNC 는 {sorted(FSYNC_POLICIES)} 중 하나여야 합니다: {fsync}")
+        self.batch_bytes = batch_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._queue: "queue.SimpleQueue[_Request]" = queue.SimpleQueue()
+        self._handles: Dict[Path, BinaryIO] = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="job-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def write(self, path: Path, data: bytes) -> None:
+        if self._closed:
+            # 종료 후 들어온 로그는 동기적으로라도 남긴다.
+            with path.open("ab") as handle:
+                handle.write(data)
+            return
+        self._queue.put((_WRITE, path, data))
+
+    def close_file(self, path: Path) -> None:
+        """Flush and close the handle of ``path`` once queued writes are done."""
+        if not self._closed:
+            self._queue.put((_CLOSE, path, None))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is written to the OS."""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put((_BARRIER, None, done))
+        return done.wait(timeout)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((_STOP, None, None))
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            size = self._request_size(batch[0])
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1][0] == _WRITE and size < self.batch_bytes:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += self._request_size(request)
+            if not self._commit(batch):
+                return
+
+    @staticmethod
+    def _request_size(request: _Request) -> int:
+        kind, _, data = request
+        return len(data) if kind == _WRITE else 0  # type: ignore[arg-type]
+
+    def _commit(self, batch: List[_Request]) -> bool:
+        pending: Dict[Path, List[bytes]] = {}
+        for kind, path, data in batch:
+            if kind == _WRITE:
+                pending.setdefault(path, []).append(data)  # type: ignore[arg-type]
+                continue
+            # 제어 요청 앞에 쌓인 쓰기는 먼저 반영해 순서를 지킨다.
+            self._write_pending(pending)
+            pending = {}
+            if kind == _CLOSE:
+                self._close_handle(path)  # type: ignore[arg-type]
+            elif kind == _BARRIER:
+                data.set()  # type: ignore[union-attr]
+            elif kind == _STOP:
+                for open_path in list(self._handles):
+                    self._close_handle(open_path)
+                return False
+        self._write_pending(pending)
+        return True
+
+    def _write_pending(self, pending: Dict[Path, List[bytes]]) -> None:
+        for path, chunks in pending.items():
+            try:
+                handle = self._handles.get(path)
+                if handle is None:
+                    handle = self._handles[path] = path.open("ab")
+                handle.write(b"".join(chunks))
+                handle.flush()
+                if self.fsync == "batch":
+                    os.fsync(handle.fileno())
+            except OSError as exc:
+                print(f"[LOG WRITER ERROR] {path}: {exc}", file=sys.stderr)
+
+    def _close_handle(self, path: Path) -> None:
+        handle = self._handles.pop(path, None)
+        if handle is None:
+            return
+        try:
+            handle.flush()
+            if self.fsync in {"batch", "close"}:
+                os.fsync(handle.fileno())
+        except OSError as exc:
+            print(f"[LOG WRITER ERROR] {path}: {exc}", file=sys.stderr)
+        finally:
+            handle.close()
@@ -1,19 +1,35 @@
 import asyncio
+import json
 import logging
 import os
-import shutil
-import tempfile
 import traceback
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, File, HTTPException, Query, Request, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from command_runner import JobStatus, execution_manager, save_command_payload
-from model import DroneModelResponse, generate_drone_command
-from whisper_service import transcribe_audio_file
+from audio_decode import SAMPLE_RATE, AudioDecodeError, decode_audio, start_decoders
+from command_ir import Command
+from command_runner import TERMINAL_STATUSES, JobStatus, execution_manager, save_command_payload
+from job_scheduler import JobQueueFull
+from job_watch import JobWatchSession
+from model import (
+    DroneModelResponse,
+    command_cache_stats,
+    generate_drone_command_async,
+    llm_profile_summary,
+    llm_routing_table,
+    llm_stats,
+    llm_warmup,
+    stream_drone_command,
+    warm_llm,
+)
+from prompt_profiles import PROFILES, get_profile
+from speech_stream import SpeechStreamSession
+from stt_engines import get_engine, stt_warmup
+from stt_pool import stt_executor
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,6 +37,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger("voice-drone-api")
 
+# SSE/WebSocket 스트림이 조용할 때 연결 유지를 위해 보내는 heartbeat 간격(초).
+JOB_STREAM_HEARTBEAT_SEC = float(os.getenv("JOB_STREAM_HEARTBEAT_SEC", "15"))
+# 1 이면 LLM 출력을 스트리밍으로 받아 명령이 완성되는 대로 실행을 시작한다.
+LLM_STREAM_COMMANDS = os.getenv("LLM_STREAM_COMMANDS", "0") == "1"
+# 1 이면 서버 시작 때 Whisper 와 LLM 을 백그라운드에서 예열한다. /ready 는 둘 다 끝나야 200 을 돌려준다.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+
 app = FastAPI(title="Whisper Voice Transcription Demo")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -40,6 +63,113 @@ def _emit_debug_event(event: str, payload: Dict[str, Any] | None = None) -> None
     logger.info(info)
 
 
+@app.on_event("startup")
+async def warm_audio_decoders() -> None:
+    await asyncio.to_thread(start_decoders)
+
+
+_warmup_tasks: set[asyncio.Task] = set()
+
+
+@app.on_event("startup")
+async def start_warmup() -> None:
+    """Load Whisper and touch the LLM in the background so startup itself is not delayed."""
+    if not WARMUP_ENABLED:
+        stt_warmup.skip()
+        llm_warmup.skip()
+        return
+    for job in (asyncio.to_thread(stt_executor.warmup), warm_llm()):
+        task = asyncio.create_task(job)
+        _warmup_tasks.add(task)
+        task.add_done_callback(_warmup_tasks.discard)
+
+
+@app.on_event("shutdown")
+async def flush_job_logs() -> None:
+    execution_manager.shutdown()
+    stt_executor.shutdown()
+
+
+async def _stream_plan(
+    text: str, vehicle_id: Optional[str], prompt_profile: Optional[str] = None
+) -> Tuple[DroneModelResponse, Optional[str]]:
+    """Generate commands with streaming, starting the job on the first completed command."""
+    job: Dict[str, Any] = {}
+
+    def on_command(command: Command) -> None:
+        if "feed" not in job:
+            # 첫 명령으로 우선순위를 정한다. 비상/착륙이면 실행 중인 작업을 바로 선점한다.
+            job["id"], job["feed"] = execution_manager.start_streaming_job(vehicle_id=vehicle_id, first=command)
+            _emit_debug_event("job_stream_started", {"job_id": job["id"], "first_action": command.action})
+            return
+        job["feed"].push(command)
+
+    try:
+        plan = await stream_drone_command(text, on_command, prompt_profile)
+    except BaseException as exc:
+        if "feed" in job:
+            job["feed"].close(error=str(exc) or exc.__class__.__name__)
+        raise
+    if "feed" in job:
+        job["feed"].close()
+    return plan, job.get("id")
+
+
+async def _plan_command(text: str, vehicle_id: Optional[str], profile_name: str) -> Dict[str, Any]:
+    """Turn a transcript into drone commands and start the job (shared by /transcribe and /ws/speech)."""
+    command_text = ""
+    command_source = None
+    command_payload = None
+    job_id = None
+    command_file = None
+    if text:
+        try:
+            if LLM_STREAM_COMMANDS:
+                plan, job_id = await _stream_plan(text, vehicle_id, profile_name)
+            else:
+                plan = await generate_drone_command_async(text, profile_name)
+            command_text = plan.display_text
+            command_source = plan.source
+            command_payload = plan.payload
+            if plan.commands:
+                try:
+                    if job_id is None:
+                        job_id = execution_manager.start_job(plan.commands, vehicle_id=vehicle_id)
+                    command_file_path = save_command_payload(job_id, plan.payload)
+                    command_file = os.path.relpath(command_file_path, BASE_DIR)
+                    _emit_debug_event(
+                        "job_started",
+                        {
+                            "job_id": job_id,
+                            "commands": len(plan.commands),
+                            "command_file": command_file,
+                        },
+                    )
+                except JobQueueFull as queue_error:
+                    print("[JOB QUEUE FULL]", queue_error)
+                    command_text = f"{command_text}\n(실행 대기열이 가득 차 명령을 실행하지 못했습니다.)"
+                except ValueError as job_error:
+                    print("[JOB ERROR]", job_error)
+            else:
+                command_text = command_text or "(명령이 생성되지 않았습니다.)"
+        except RuntimeError as runtime_error:
+            print("[RUNTIME ERROR]", runtime_error)
+            command_text = f"(명령 생성 실패: {runtime_error})"
+        except Exception:
+            print("[명령 생성 중 오류]", traceback.format_exc())
+            command_text = "(명령 생성 중 알 수 없는 오류가 발생했습니다.)"
+
+    return {
+        "command": command_text,
+        "command_payload": command_payload,
+        "command_source": command_source,
+        "prompt_profile": profile_name,
+        "commands": command_payload.get("commands", []) if command_payload else [],
+        "job_id": job_id,
+        "command_file": command_file,
+    }
+
+
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request) -> HTMLResponse:
     """Serve the demo page."""
@@ -50,90 +180,134 @@ async def index(request: Request) -> HTMLResponse:
 
 
 @app.post("/transcribe", response_class=JSONResponse)
-async def transcribe_audio(file: UploadFile = File(...)) -> JSONResponse:
-    """Receive an audio file, run Whisper transcription, and return the text."""
+async def transcribe_audio(
+    file: UploadFile = File(...),
+    vehicle_id: str | None = Form(None),
+    prompt_profile: str | None = Form(None),
+    stt_engine: str | None = Form(None),
+    stt_budget_ms: float | None = Form(None),
+) -> JSONResponse:
+    """Receive an audio file, run speech recognition, and return the text.
+
+    ``prompt_profile`` picks the LLM prompt (``compact`` JSON-only by default,
+    ``cot`` to keep the reasoning for audits). ``stt_engine`` forces a
+    recognizer (``whisper:small``, ``vosk``, ...); otherwise ``stt_budget_ms``
+    picks the most accurate engine expected to finish within that time.
+    """
     if not file.filename:
         raise HTTPException(status_code=400, detail="파일 이름을 찾을 수 없습니다.")
+    try:
+        profile_name = get_profile(prompt_profile).name
+        if stt_engine:
+            get_engine(stt_engine)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
     _emit_debug_event(
         "transcribe_received",
         {"filename": file.filename, "content_type": file.content_type, "size": file.size},
     )
 
-    suffix = os.path.splitext(file.filename)[1].lower()
-    if suffix not in {".wav", ".mp3", ".m4a", ".webm", ".ogg", ".flac"}:
-        suffix = ".wav"  # Whisper can still read most containers via ffmpeg.
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp_path = tmp.name
-        file.file.seek(0)
-        shutil.copyfileobj(file.file, tmp)
-
-    text = ""
-    command_text = ""
-    command_payload = None
-    job_id = None
-    command_file = None
+    # 업로드를 메모리에서 바로 16 kHz 배열로 풀어 임시 파일 없이 STT 엔진에 넘긴다.
+    data = await file.read()
     try:
-        text = transcribe_audio_file(tmp_path)
-        if text:
-            try:
-                plan: DroneModelResponse = generate_drone_command(text)
-                command_text = plan.display_text
-                command_payload = plan.payload
-                if plan.commands:
-                    try:
-                        job_id = execution_manager.start_job(plan.commands)
-                        command_file_path = save_command_payload(job_id, plan.payload)
-                        command_file = os.path.relpath(command_file_path, BASE_DIR)
-                        _emit_debug_event(
-                            "job_started",
-                            {
-                                "job_id": job_id,
-                                "commands": len(plan.commands),
-                                "command_file": command_file,
-                            },
-                        )
-                    except ValueError as job_error:
-                        print("[JOB ERROR]", job_error)
-                else:
-                    command_text = command_text or "(명령이 생성되지 않았습니다.)"
-            except RuntimeError as runtime_error:
-                print("[RUNTIME ERROR]", runtime_error)
-                command_text = f"(명령 생성 실패: {runtime_error})"
-            except Exception:
-                print("[명령 생성 중 오류]", traceback.format_exc())
-                command_text = "(명령 생성 중 알 수 없는 오류가 발생했습니다.)"
+        audio = await asyncio.to_thread(decode_audio, data, file.filename, file.content_type)
+    except AudioDecodeError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
+    try:
+        transcript = await stt_executor.recognize(audio, stt_engine, stt_budget_ms)
+        text = transcript.text
+        result = await _plan_command(text, vehicle_id, profile_name)
     except Exception as exc:
         # 터미널에 전체 에러 스택 출력
         print("[TRANSCRIBE ERROR]", traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Transcription failed: {exc}") from exc
 
-    finally:
-        os.remove(tmp_path)
-
+    command_text = result["command"]
     _emit_debug_event(
         "transcribe_response",
         {
-            "job_id": job_id,
+            "job_id": result["job_id"],
             "text_len": len(text or ""),
+            "stt_engine": transcript.engine,
+            "stt_ms": transcript.latency_ms,
             "command_summary": (command_text[:120] + "...") if command_text and len(command_text) > 120 else command_text,
         },
     )
 
+    return JSONResponse({"text": text, "stt_engine": transcript.engine, "stt_ms": transcript.latency_ms, **result})
+
+
+@app.get("/ready", response_class=JSONResponse)
+async def get_readiness() -> JSONResponse:
+    """Readiness probe: 200 once STT and LLM are warm, 503 before (for the load balancer)."""
+    components = {"stt": stt_warmup.snapshot(), "llm": llm_warmup.snapshot()}
+    ready = all(component["ready"] for component in components.values())
+    return JSONResponse({"ready": ready, **components}, status_code=200 if ready else 503)
+
+
+@app.get("/stt/stats", response_class=JSONResponse)
+async def get_stt_stats() -> JSONResponse:
+    """STT replica pool: workers, pinned cores, queue depth and throughput counters."""
+    return JSONResponse(stt_executor.stats())
+
+
+@app.get("/stt/engines", response_class=JSONResponse)
+async def get_stt_engines() -> JSONResponse:
+    """Registered STT engines: default, budget order, availability and measured real-time factors."""
+    return JSONResponse(stt_executor.selector.stats())
+
+
+@app.get("/jobs/stats", response_class=JSONResponse)
+async def get_job_stats() -> JSONResponse:
+    """Scheduler queue depth/wait times and job retention counters."""
+    return JSONResponse(execution_manager.stats())
+
+
+@app.get("/llm/profile", response_class=JSONResponse)
+async def get_llm_profile() -> JSONResponse:
+    """Per-stage LLM call histograms (prompt build, queue wait, first token, parse...) per model and prompt profile."""
+    return JSONResponse(llm_profile_summary())
+
+
+@app.get("/llm/prompt/profiles", response_class=JSONResponse)
+async def get_prompt_profiles() -> JSONResponse:
+    """Available prompt profiles and the default one."""
     return JSONResponse(
         {
-            "text": text,
-            "command": command_text,
-            "command_payload": command_payload,
-            "commands": command_payload.get("commands", []) if command_payload else [],
-            "job_id": job_id,
-            "command_file": command_file,
+            "default": get_profile().name,
+            "profiles": [
+                {
+                    "name": profile.name,
+                    "description": profile.description,
+                    "version": profile.version(),
+                    "generation_options": profile.generation_options(),
+                }
+                for profile in PROFILES.values()
+            ],
         }
     )
 
 
+@app.get("/llm/cache/stats", response_class=JSONResponse)
+async def get_llm_cache_stats() -> JSONResponse:
+    """Hit/miss counters of the utterance → command cache."""
+    return JSONResponse(command_cache_stats())
+
+
+@app.get("/llm/stats", response_class=JSONResponse)
+async def get_llm_stats() -> JSONResponse:
+    """LLM client latency, in-flight calls, timeouts and hedging counters."""
+    return JSONResponse(llm_stats())
+
+
+@app.get("/debug/llm/routing", response_class=JSONResponse)
+async def get_llm_routing() -> JSONResponse:
+    """Per-model latency, error rate and circuit state used to route LLM calls."""
+    return JSONResponse(llm_routing_table())
+
+
 @app.get("/jobs/{job_id}/logs", response_class=JSONResponse)
 async def get_job_logs(job_id: str, start: int = Query(0, alias="from", ge=0)) -> JSONResponse:
     try:
@@ -161,38 +335,207 @@ async def get_job_logs(job_id: str, start: int = Query(0, alias="from", ge=0)) -
     )
 
 
+@app.get("/jobs/{job_id}/events", response_class=JSONResponse)
+async def get_job_events(
+    job_id: str,
+    start: int = Query(0, alias="from", ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+) -> JSONResponse:
+    """Typed job events (command_start/command_end/error/status ...) by event number."""
+    try:
+        events = execution_manager.fetch_events(job_id, start, limit)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="존재하지 않는 작업 ID 입니다.") from exc
+    return JSONResponse({"events": events, "next_index": start + len(events)})
+
+
+@app.post("/jobs/{job_id}/cancel", response_class=JSONResponse)
+async def cancel_job(job_id: str) -> JSONResponse:
+    """Cancel a queued job or interrupt a running one at its next wait."""
+    try:
+        status = execution_manager.cancel_job(job_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="존재하지 않는 작업 ID 입니다.") from exc
+    return JSONResponse(
+        {
+            "job_id": job_id,
+            "cancelled": status not in (JobStatus.COMPLETED, JobStatus.FAILED),
+            "status": status.value,
+        }
+    )
+
+
 @app.get("/jobs/{job_id}/stream")
 async def stream_job_logs(job_id: str) -> StreamingResponse:
     async def event_generator():
         next_index = 0
         _emit_debug_event("job_stream_begin", {"job_id": job_id})
-        while True:
-            try:
-                job_logs = execution_manager.fetch_logs(job_id, next_index)
-            except KeyError:
-                _emit_debug_event("job_stream_missing", {"job_id": job_id})
-                yield "event: error\ndata: not_found\n\n"
-                break
-
-            if job_logs.logs:
-                for line in job_logs.logs:
-                    yield f"data: {line}\n\n"
-                next_index = job_logs.next_index
-                _emit_debug_event(
-                    "job_stream_chunk",
-                    {"job_id": job_id, "lines": len(job_logs.logs), "next_index": next_index},
-                )
-
-            if job_logs.status in {JobStatus.COMPLETED, JobStatus.FAILED}:
-                yield f"event: status\ndata: {job_logs.status.value}\n\n"
-                _emit_debug_event("job_stream_end", {"job_id": job_id, "status": job_logs.status.value})
-                break
-
-            await asyncio.sleep(1)
+        # 구독을 먼저 등록해야 따라잡기(fetch_logs)와 push 사이에 빠지는 줄이 없다.
+        subscription = execution_manager.events.subscribe(job_id)
+        try:
+            resync = True
+            while True:
+                if resync:
+                    try:
+                        job_logs = execution_manager.fetch_logs(job_id, next_index)
+                    except KeyError:
+                        _emit_debug_event("job_stream_missing", {"job_id": job_id})
+                        yield "event: error\ndata: not_found\n\n"
+                        break
+                    subscription.drain()
+                    resync = False
+                    for line in job_logs.logs:
+                        yield f"data: {line}\n\n"
+                    next_index = job_logs.next_index
+                    if job_logs.logs:
+                        _emit_debug_event(
+                            "job_stream_chunk",
+                            {"job_id": job_id, "lines": len(job_logs.logs), "next_index": next_index},
+                        )
+                    if job_logs.status in TERMINAL_STATUSES:
+                        yield f"event: status\ndata: {job_logs.status.value}\n\n"
+                        _emit_debug_event("job_stream_end", {"job_id": job_id, "status": job_logs.status.value})
+                        break
+
+                try:
+                    _, (kind, index, data) = await subscription.get(JOB_STREAM_HEARTBEAT_SEC)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                if subscription.overflowed:
+                    resync = True
+                elif kind == "log":
+                    if index == next_index:
+                        yield f"data: {data}\n\n"
+                        next_index += 1
+                    elif index > next_index:
+                        resync = True
+                elif kind == "status" and data in TERMINAL_STATUSES:
+                    # 남은 줄과 최종 상태는 저장소 기준으로 한 번 더 읽어 보낸다.
+                    resync = True
+        finally:
+            execution_manager.events.unsubscribe(subscription)
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
+@app.websocket("/ws/jobs")
+async def watch_jobs(websocket: WebSocket) -> None:
+    """Multiplexed log/status feed for many jobs over one connection.
+
+    Client messages: ``{"op": "subscribe", "jobs": [{"job_id": ..., "from": N}]}``
+    and ``{"op": "unsubscribe", "jobs": [job_id, ...]}``. The server sends
+    batched ``{"type": "logs", "jobs": {job_id: {"from", "logs", "next_index",
+    "status", "done"?}}}`` frames; reconnecting clients resume by subscribing
+    with their last ``next_index`` as ``from``.
+    """
+    await websocket.accept()
+    session = JobWatchSession(execution_manager)
+    _emit_debug_event("job_ws_open", {})
+
+    async def receive_commands() -> None:
+        while True:
+            message = await websocket.receive_json()
+            for error in session.handle(message):
+                await websocket.send_json(error)
+            # 구독 직후의 따라잡기 로그는 배치 주기를 기다리지 않고 보낸다.
+            batch = session.take_batch()
+            if batch:
+                await websocket.send_json(batch)
+
+    async def send_batches() -> None:
+        while True:
+            await websocket.send_json(await session.next_batch(JOB_STREAM_HEARTBEAT_SEC))
+
+    tasks = [asyncio.create_task(receive_commands()), asyncio.create_task(send_batches())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exc = task.exception()
+            if exc is not None and not isinstance(exc, WebSocketDisconnect):
+                logger.warning("job websocket closed with error: %s", exc)
+    finally:
+        for task in tasks:
+            task.cancel()
+        session.close()
+        _emit_debug_event("job_ws_close", {"jobs": len(session.cursors)})
+
+
+@app.websocket("/ws/speech")
+async def stream_speech(
+    websocket: WebSocket,
+    vehicle_id: str | None = Query(None),
+    prompt_profile: str | None = Query(None),
+    sample_rate: int = Query(SAMPLE_RATE),
+    stt_engine: str | None = Query(None),
+    stt_budget_ms: float | None = Query(None),
+) -> None:
+    """Streaming recognition: binary frames of 16-bit mono PCM at ``sample_rate`` in, events out.
+
+    Voice activity detection splits the stream into utterances. While one is
+    spoken the server sends ``{"type": "partial", "utterance", "text"}``;
+    when it ends, ``{"type": "final", ...}`` and then ``{"type": "command",
+    ...}`` with the same fields as ``/transcribe``. The client sends
+    ``{"op": "end"}`` when it stops capturing to finalize the last utterance.
+    ``stt_engine`` and ``stt_budget_ms`` work as in ``/transcribe``.
+    """
+    await websocket.accept()
+    try:
+        profile_name = get_profile(prompt_profile).name
+        if not 8000 <= sample_rate <= 48000:
+            raise ValueError(f"지원하지 않는 샘플링 주파수입니다: {sample_rate}")
+        if stt_engine:
+            get_engine(stt_engine)
+    except ValueError as exc:
+        await websocket.send_json({"type": "error", "detail": str(exc)})
+        await websocket.close(code=1008)
+        return
+
+    session = SpeechStreamSession(
+        lambda audio: stt_executor.transcribe(audio, stt_engine, stt_budget_ms),
+        lambda text: _plan_command(text, vehicle_id, profile_name),
+        sample_rate=sample_rate,
+        can_partial=stt_executor.has_idle_replica,
+    )
+    _emit_debug_event("speech_ws_open", {"vehicle_id": vehicle_id, "sample_rate": sample_rate})
+    await websocket.send_json({"type": "ready", "sample_rate": sample_rate, "prompt_profile": profile_name})
+
+    async def receive_audio() -> None:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                session.feed(message["bytes"])
+            elif message.get("text"):
+                try:
+                    op = json.loads(message["text"]).get("op")
+                except (ValueError, AttributeError):
+                    op = None
+                if op == "end":
+                    session.flush()
+                else:
+                    session.outbox.put_nowait({"type": "error", "detail": f"unknown_op: {op}"})
+
+    async def send_events() -> None:
+        while True:
+            await websocket.send_json(await session.outbox.get())
+
+    tasks = [asyncio.create_task(receive_audio()), asyncio.create_task(send_events())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exc = task.exception()
+            if exc is not None and not isinstance(exc, WebSocketDisconnect):
+                logger.warning("speech websocket closed with error: %s", exc)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await session.close()
+        _emit_debug_event("speech_ws_close", {"utterances": session.utterance})
+
+
 from fastapi import Query
 
 @app.get("/command-logs/latest", response_class=JSONResponse)
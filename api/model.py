@@ -1,25 +1,34 @@
-import json
+import asyncio
 import os
-import re
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
-try:
-    import google.generativeai as genai
-except ImportError as exc:  # pragma: no cover - defensive guard
-    raise RuntimeError(
-        "google-generativeai 패키지가 설치되어 있어야 합니다. "
-        "pip install google-generativeai 명령으로 설치해 주세요."
-    ) from exc
+from command_cache import LLM_CACHE_ENABLED, CommandCache
+from command_ir import Command, CommandPlan, extract_json_payload
+from command_parser import COMMAND_FASTPATH_ENABLED, COMMAND_FASTPATH_MIN_CONFIDENCE, parse_command
+from command_stream import IncrementalCommandParser
+from llm_batcher import RequestCoalescer
+from llm_client import AsyncLLMClient, make_backend
+from llm_profiler import LLMCall, LLMProfiler
+from model_router import ModelRouter
+from prompt_profiles import PromptProfile, get_profile
+from readiness import WarmupState
 
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent
-PROMPT_PATH = BASE_DIR / "prompt" / "prompt.txt"
+
+# 서버 시작 때 기본 프롬프트로 한 번 호출해 모델 목록, 연결, 로컬 모델 적재를 미리 끝낸다.
+LLM_WARMUP_TEXT = os.getenv("LLM_WARMUP_TEXT", "앞으로 1미터 이동한 뒤 착륙해")
+# 예열 실패 시 다시 시도하는 간격(초)과 최대 시도 횟수.
+LLM_WARMUP_RETRY_SEC = float(os.getenv("LLM_WARMUP_RETRY_SEC", "10"))
+LLM_WARMUP_ATTEMPTS = int(os.getenv("LLM_WARMUP_ATTEMPTS", "6"))
 
 # 모델 후보 우선순위
 CANDIDATES = [
@@ -36,83 +45,224 @@ CANDIDATES = [
 class DroneModelResponse:
     display_text: str
     payload: Dict[str, Any]
-    commands: List[Dict[str, Any]]
+    # 스키마 검증을 마친 명령. payload["commands"] 는 이를 다시 직렬화한 것이다.
+    commands: List[Command]
+    # "llm", "cache" 또는 규칙 기반 해석기로 끝난 "fast_path"
+    source: str = "llm"
+
+
+command_cache = CommandCache() if LLM_CACHE_ENABLED else None
+llm_backend = make_backend(CANDIDATES)
+llm_router = ModelRouter(llm_backend)
+llm_client = AsyncLLMClient(llm_backend, router=llm_router)
+# 여러 운용자가 동시에 말하면 계획 요청을 모아 배치로 보낸다.
+llm_batcher = RequestCoalescer(llm_client)
+llm_profiler = LLMProfiler()
+llm_warmup = WarmupState("llm")
 
 
 def _pick_available_model() -> str:
-    """Gemini 모델 리스트에서 generateContent 가능한 첫 후보를 고릅니다."""
-    models = genai.list_models()
-    names = {m.name.split("/")[-1]: m for m in models}
-    available = {
-        n
-        for n, m in names.items()
-        if "generateContent" in getattr(m, "supported_generation_methods", [])
-    }
-    for cand in CANDIDATES:
-        if cand and cand in available:
-            return cand
-    if available:
-        return sorted(available)[0]
-    raise RuntimeError("사용 가능한 Gemini 모델을 찾지 못했습니다. 콘솔 설정을 확인하세요.")
+    """지금 가장 빠르고 정상인 모델을 고릅니다."""
+    return llm_router.route()[0]
+
+
+def load_prompt_template(profile: Optional[str] = None) -> str:
+    return get_profile(profile).template()
+
+
+@lru_cache(maxsize=None)
+def prompt_version(profile: Optional[str] = None) -> str:
+    """프롬프트나 생성 옵션이 바뀌면 캐시 키도 바뀌도록 프로필별 해시를 버전으로 쓴다."""
+    override = os.getenv("LLM_PROMPT_VERSION")
+    resolved = get_profile(profile)
+    return f"{override}:{resolved.name}" if override else resolved.version()
+
+
+def _validated(display_text: str, payload: Dict[str, Any], source: str = "llm") -> DroneModelResponse:
+    """Validate the command list once and keep only commands that match the schema."""
+    plan = CommandPlan.from_payload(payload)
+    for reason in plan.rejected:
+        print(f"[COMMAND WARNING] 명령을 건너뜁니다: {reason}")
+    payload = dict(payload, commands=plan.to_api())
+    return DroneModelResponse(display_text, payload, list(plan.commands), source=source)
 
 
-@lru_cache(maxsize=1)
-def _get_model() -> "genai.GenerativeModel":
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("환경변수 GOOGLE_API_KEY 가 필요합니다.")
-    genai.configure(api_key=api_key)
-    model_name = _pick_available_model()
-    return genai.GenerativeModel(model_name)
+def generate_drone_command(transcribed_text: str, profile: Optional[str] = None) -> DroneModelResponse:
+    """동기 코드용 래퍼. 이벤트 루프 안에서는 generate_drone_command_async 를 쓴다."""
+    return asyncio.run(generate_drone_command_async(transcribed_text, profile))
 
 
-@lru_cache(maxsize=1)
-def load_prompt_template() -> str:
-    if not PROMPT_PATH.exists():
-        raise FileNotFoundError(f"프롬프트 파일을 찾을 수 없습니다: {PROMPT_PATH}")
-    return PROMPT_PATH.read_text(encoding="utf-8").strip()
+async def _plan_without_llm(text: str, profile: PromptProfile) -> Tuple[Optional[DroneModelResponse], List[str]]:
+    """규칙 기반 해석기와 캐시로 끝나는 경우의 응답, 그리고 LLM 호출에 쓸 모델 목록(빠른 순)."""
+    if COMMAND_FASTPATH_ENABLED:
+        parsed = parse_command(text)
+        if parsed.confidence >= COMMAND_FASTPATH_MIN_CONFIDENCE:
+            return _validated(parsed.describe(), parsed.payload, source="fast_path"), []
 
+    llm_router.bind_loop()
+    models = await asyncio.to_thread(llm_router.route)
+    if command_cache is not None:
+        # 라우팅으로 모델이 바뀌어도 다른 모델이 만든 응답을 그대로 쓸 수 있게 모두 찾아본다(요청당 한 번으로 센다).
+        hit = command_cache.lookup(text, prompt_version(profile.name), models)
+        if hit is not None:
+            display_text, payload = hit
+            return _validated(display_text, payload, source="cache"), models
+    return None, models
 
-def _extract_json_payload(raw_text: str) -> Dict[str, Any]:
-    """모델 출력에서 JSON 오브젝트만 추출해 dict로 반환."""
-    text = raw_text.strip()
 
-    # 코드펜스 제거 ```json ... ```
-    if text.startswith("```"):
-        text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text, flags=re.S).strip()
+def _remember(text: str, profile: PromptProfile, model_name: str, raw: str, payload: Dict[str, Any]) -> None:
+    if command_cache is not None:
+        version = prompt_version(profile.name)
+        command_cache.put(CommandCache.make_key(text, version, model_name), text, version, model_name, raw, payload)
 
-    # 전체 파싱 시도
+
+def _llm_request(text: str, profile: PromptProfile) -> Dict[str, Any]:
+    """프로필 템플릿은 매번 똑같은 시스템 지시로 보내 공급자의 접두사 캐시를 타게 하고 발화만 바꾼다."""
+    return {
+        "prompt": profile.user_prompt(text),
+        "system": profile.template(),
+        "options": profile.generation_options(),
+    }
+
+
+@contextmanager
+def _profiled(profile: PromptProfile, model_name: str, streamed: bool = False) -> Iterator[LLMCall]:
+    """LLM 호출 한 번의 단계별 시간을 재고 끝나면 프로파일러에 넘긴다."""
+    call = llm_profiler.start(profile.name, streamed)
+    call.model = model_name
     try:
-        return json.loads(text)
-    except Exception:
-        pass
-
-    # 문자열 내부에서 가장 큰 {} 블록 추출
-    match = re.search(r"\{.*\}", text, flags=re.S)
-    if match:
-        candidate = match.group(0)
-        try:
-            return json.loads(candidate)
-        except Exception:
-            pass
+        yield call
+    except Exception as exc:
+        if call.parse_ok is not False:
+            call.error = str(exc) or exc.__class__.__name__
+        raise
+    finally:
+        llm_profiler.finish(call)
 
-    raise ValueError("LLM 응답에서 유효한 JSON을 찾지 못했습니다.")
 
+def _parse_reply(call: LLMCall, raw: str, parse_ms: float = 0.0) -> Dict[str, Any]:
+    try:
+        if not raw:
+            raise RuntimeError("LLM 응답이 비어 있습니다.")
+        payload = extract_json_payload(raw)
+    except (RuntimeError, ValueError):
+        call.parse_ok = False
+        raise
+    finally:
+        call.parse_ms = round(parse_ms + call.lap(), 3)
+    call.parse_ok = True
+    return payload
+
+
+async def generate_drone_command_async(transcribed_text: str, profile: Optional[str] = None) -> DroneModelResponse:
+    """Whisper 텍스트를 받아 드론 명령 JSON과 설명을 생성합니다.
 
-def generate_drone_command(transcribed_text: str) -> DroneModelResponse:
-    """Whisper 텍스트를 받아 드론 명령 JSON과 설명을 생성합니다."""
+    ``profile`` 은 prompt_profiles 의 이름이다. 기본은 LLM_PROMPT_PROFILE (compact).
+    """
     text = transcribed_text.strip()
     if not text:
         return DroneModelResponse(display_text="", payload={"commands": []}, commands=[])
 
-    model = _get_model()
-    base_prompt = load_prompt_template()
-    prompt = f"{base_prompt}\n\n[사용자 발화]\n{text}"
-    response = model.generate_content(prompt)
-    raw = (response.text or "").strip()
-    if not raw:
-        raise RuntimeError("LLM 응답이 비어 있습니다.")
-
-    payload = _extract_json_payload(raw)
-    commands = payload.get("commands", [])
-    return DroneModelResponse(display_text=raw, payload=payload, commands=commands)
+    resolved = get_profile(profile)
+    shortcut, models = await _plan_without_llm(text, resolved)
+    if shortcut is not None:
+        return shortcut
+
+    with _profiled(resolved, models[0]) as call:
+        request = _llm_request(text, resolved)
+        call.prompt_build_ms = call.lap()
+        result = await llm_batcher.generate(models=models, **request)
+        call.llm_done(result)
+        raw = result.text
+        response = _validated(raw, _parse_reply(call, raw))
+    _remember(text, resolved, result.model, raw, response.payload)
+    return response
+
+
+async def stream_drone_command(
+    transcribed_text: str,
+    on_command: Callable[[Command], None],
+    profile: Optional[str] = None,
+) -> DroneModelResponse:
+    """generate_drone_command_async 와 같지만 LLM 이 명령 하나를 완성할 때마다 ``on_command`` 를 부른다.
+
+    규칙 기반 해석기나 캐시로 끝나면 ``on_command`` 없이 전체 응답만 돌려준다.
+    """
+    text = transcribed_text.strip()
+    if not text:
+        return DroneModelResponse(display_text="", payload={"commands": []}, commands=[])
+
+    resolved = get_profile(profile)
+    shortcut, models = await _plan_without_llm(text, resolved)
+    if shortcut is not None:
+        return shortcut
+
+    parser = IncrementalCommandParser()
+    with _profiled(resolved, models[0], streamed=True) as call:
+        request = _llm_request(text, resolved)
+        call.prompt_build_ms = call.lap()
+        feed_sec = 0.0
+        async for chunk in llm_client.stream(models=models, on_result=call.llm_done, **request):
+            fed = time.perf_counter()
+            commands = parser.feed(chunk)
+            # 스트림 중 파싱 시간도 파싱 단계에 넣는다(LLM 시간과 겹친다).
+            feed_sec += time.perf_counter() - fed
+            for command in commands:
+                on_command(command)
+        raw = parser.text.strip()
+        streamed = parser.commands
+        try:
+            payload = _parse_reply(call, raw, feed_sec * 1000)
+            final = list(CommandPlan.from_payload(payload).commands)
+        except ValueError:
+            if not streamed:
+                raise
+            payload, final = {}, None
+    verified = final is not None and final[: len(streamed)] == streamed
+    if verified:
+        # 스트림 파서가 놓친 뒷부분(형식이 어긋난 JSON 등)은 전체 응답에서 마저 보낸다.
+        for command in final[len(streamed) :]:
+            streamed.append(command)
+            on_command(command)
+    elif final is None:
+        print("[STREAM WARNING] 최종 JSON 을 해석하지 못했습니다. 스트리밍으로 받은 명령까지만 기록합니다.")
+    else:
+        print("[STREAM WARNING] 스트리밍으로 실행한 명령과 최종 JSON 이 다릅니다. 실행한 명령을 기준으로 기록합니다.")
+    payload = dict(payload, commands=[command.to_api() for command in streamed])
+    # 잘렸거나 최종 JSON 과 맞춰 보지 못한 계획은 다음 발화에 다시 쓰지 않는다.
+    if verified:
+        _remember(text, resolved, call.model, raw, payload)
+    return DroneModelResponse(display_text=raw, payload=payload, commands=list(streamed))
+
+
+def command_cache_stats() -> Dict[str, Any]:
+    return command_cache.stats() if command_cache is not None else {"enabled": False}
+
+
+def llm_stats() -> Dict[str, Any]:
+    return {**llm_client.stats(), "batching": llm_batcher.stats()}
+
+
+def llm_profile_summary() -> Dict[str, Any]:
+    return llm_profiler.summary()
+
+
+def llm_routing_table() -> Dict[str, Any]:
+    return llm_router.table()
+
+
+async def warm_llm() -> None:
+    """Send one planning prompt straight to the LLM so the first real command is not the cold one."""
+    profile = get_profile(None)
+    request = _llm_request(LLM_WARMUP_TEXT, profile)
+    for attempt in range(max(1, LLM_WARMUP_ATTEMPTS)):
+        if attempt:
+            await asyncio.sleep(LLM_WARMUP_RETRY_SEC)
+        llm_warmup.begin()
+        try:
+            result = await llm_client.generate(**request)
+        except Exception as exc:
+            llm_warmup.fail(exc)
+            continue
+        llm_warmup.done(backend=llm_backend.name, model=result.model, profile=profile.name)
+        return
@@ -0,0 +1,304 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# 발견한 모델 목록을 저장해 두는 파일과 재사용 기간(초). 기간이 지나면 다시 조회한다.
+LLM_MODELS_CACHE_PATH = Path(os.getenv("LLM_MODELS_CACHE_PATH", str(BASE_DIR / "llm_cache" / "models.json")))
+LLM_MODELS_CACHE_TTL_SEC = float(os.getenv("LLM_MODELS_CACHE_TTL_SEC", str(24 * 3600)))
+# 연속 실패 횟수나 최근 오류율이 이 값을 넘으면 회로를 열고 LLM_ROUTER_OPEN_SEC 동안 보내지 않는다.
+LLM_ROUTER_FAILURE_THRESHOLD = int(os.getenv("LLM_ROUTER_FAILURE_THRESHOLD", "3"))
+LLM_ROUTER_ERROR_RATE = float(os.getenv("LLM_ROUTER_ERROR_RATE", "0.5"))
+LLM_ROUTER_OPEN_SEC = float(os.getenv("LLM_ROUTER_OPEN_SEC", "30"))
+# 이만큼 표본이 없던 모델은 짧은 요청으로 상태를 확인한다. 0 이면 확인하지 않는다.
+LLM_ROUTER_PROBE_SEC = float(os.getenv("LLM_ROUTER_PROBE_SEC", "120"))
+LLM_ROUTER_WINDOW = int(os.getenv("LLM_ROUTER_WINDOW", "50"))
+_MIN_RATE_SAMPLES = 10
+_EWMA_ALPHA = 0.2
+_PROBE_PROMPT = 'Reply with {"commands": []} only.'
+_PROBE_TIMEOUT_SEC = 10.0
+# 반열림 상태에서 시험 요청 하나에 주는 시간. 이 안에 결과가 없으면(다른 모델로 끝났으면) 다시 시험한다.
+_HALF_OPEN_TRIAL_SEC = float(os.getenv("LLM_TIMEOUT_SEC", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class _ModelHealth:
+    """Rolling latency/error window and circuit state of one model."""
+
+    def __init__(self, window: int) -> None:
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self.ewma: Optional[float] = None
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.last_sample_at = 0.0
+        self.last_error: Optional[str] = None
+        # 반열림 상태의 시험 요청을 내준 시각. 그동안 다른 요청은 이 모델로 보내지 않는다.
+        self.trial_at: Optional[float] = None
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def latencies(self) -> List[float]:
+        return sorted(latency for latency, ok in self.samples if ok)
+
+
+class ModelRouter:
+    """Orders candidate models by measured latency and keeps failing ones out.
+
+    The discovered model list is stored on disk so a restart does not wait
+    for ``list_models``. Each call result feeds a per-model window; a model
+    whose failures cross the threshold has its circuit opened and is skipped
+    until a half-open trial (or background probe) succeeds again; a
+    half-open model gets exactly one trial request at a time. Healthy
+    models are routed fastest first by EWMA latency, unmeasured ones in
+    candidate order after them. Probes run on the event loop the router
+    was last used from, even when ``route`` is called from a worker thread.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        cache_path: Path = LLM_MODELS_CACHE_PATH,
+        cache_ttl: float = LLM_MODELS_CACHE_TTL_SEC,
+        failure_threshold: int = LLM_ROUTER_FAILURE_THRESHOLD,
+        error_rate: float = LLM_ROUTER_ERROR_RATE,
+        open_sec: float = LLM_ROUTER_OPEN_SEC,
+        probe_sec: float = LLM_ROUTER_PROBE_SEC,
+        window: int = LLM_ROUTER_WINDOW,
+    ) -> None:
+        self.backend = backend
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.open_sec = open_sec
+        self.probe_sec = probe_sec
+        self.window = window
+        self._models: Optional[List[str]] = None
+        self._discovered_at = 0.0
+        self._health: Dict[str, _ModelHealth] = {}
+        self._probing: Set[str] = set()
+        self._probe_tasks: Set["asyncio.Task[None]"] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    # --- 모델 목록 -------------------------------------------------------
+
+    def models(self) -> List[str]:
+        """Available models in candidate order, from the disk cache when it is fresh."""
+        with self._lock:
+            if self._models is not None:
+                return list(self._models)
+        models, discovered_at = self._load_cached()
+        if models is None:
+            models = list(self.backend.available_models())
+            discovered_at = time.time()
+            self._save_cached(models, discovered_at)
+        with self._lock:
+            self._models, self._discovered_at = models, discovered_at
+            for name in models:
+                self._health.setdefault(name, _ModelHealth(self.window))
+            return list(models)
+
+    def refresh(self) -> List[str]:
+        """Forget the cached list and ask the backend again."""
+        with self._lock:
+            self._models = None
+        self.cache_path.unlink(missing_ok=True)
+        return self.models()
+
+    def _load_cached(self) -> Tuple[Optional[List[str]], float]:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None, 0.0
+        if (
+            data.get("backend") != self.backend.name
+            or data.get("candidates") != self._candidates()
+            or time.time() - data.get("discovered_at", 0) > self.cache_ttl
+            or not data.get("models")
+        ):
+            return None, 0.0
+        return list(data["models"]), float(data["discovered_at"])
+
+    def _save_cached(self, models: List[str], discovered_at: float) -> None:
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix(".tmp")
+            tmp_path.write_text(
+                json.dumps(
+                    {
+                        "backend": self.backend.name,
+                        "candidates": self._candidates(),
+                        "models": models,
+                        "discovered_at": discovered_at,
+                    },
+                    ensure_ascii=False,
+                ),
+                encoding="utf-8",
+            )
+            tmp_path.replace(self.cache_path)
+        except OSError as exc:
+            print(f"[ROUTER WARNING] 모델 목록을 저장하지 못했습니다: {exc}")
+
+    def _candidates(self) -> List[str]:
+        return list(getattr(self.backend, "candidates", []))
+
+    # --- 라우팅 -----------------------------------------------------------
+
+    def route(self) -> List[str]:
+        """Models to try, best first. Falls back to every model if all circuits are open."""
+        models = self.models()
+        ordered = self._order(models)
+        self._schedule_probes(models)
+        return ordered or models
+
+    def _order(self, models: List[str], claim: bool = True) -> List[str]:
+        """Routable models, best first. ``claim`` hands out the single half-open trial slot."""
+        now = time.monotonic()
+        with self._lock:
+            routable = []
+            for priority, name in enumerate(models):
+                health = self._health[name]
+                if health.state == OPEN and now - health.opened_at >= self.open_sec:
+                    # 한 번 시험해 보고 성공하면 닫는다.
+                    health.state = HALF_OPEN
+                    health.trial_at = None
+                if health.state == OPEN:
+                    continue
+                if health.state == HALF_OPEN:
+                    if health.trial_at is not None and now - health.trial_at < _HALF_OPEN_TRIAL_SEC:
+                        continue  # 시험 요청이 이미 나가 있다.
+                    if claim:
+                        health.trial_at = now
+                measured = health.ewma is not None and health.state == CLOSED
+                routable.append(((0 if measured else 1, health.ewma if measured else priority), name))
+            routable.sort()
+            return [name for _, name in routable]
+
+    def record(self, model: str, latency: float, ok: bool, error: Optional[str] = None) -> None:
+        with self._lock:
+            health = self._health.setdefault(model, _ModelHealth(self.window))
+            health.samples.append((latency, ok))
+            health.last_sample_at = time.monotonic()
+            health.trial_at = None
+            if ok:
+                health.ewma = latency if health.ewma is None else _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * health.ewma
+                health.consecutive_failures = 0
+                health.state = CLOSED
+                return
+            health.consecutive_failures += 1
+            health.last_error = error
+            failing = health.consecutive_failures >= self.failure_threshold or (
+                len(health.samples) >= _MIN_RATE_SAMPLES and health.error_rate() >= self.error_rate
+            )
+            if health.state == HALF_OPEN or failing:
+                if health.state != OPEN:
+                    print(f"[ROUTER] '{model}' 회로를 엽니다: {error}")
+                health.state = OPEN
+                health.opened_at = time.monotonic()
+
+    # --- 상태 확인 --------------------------------------------------------
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Remember the event loop probes run on; call from async code (the client does on every call)."""
+        self._loop = loop or asyncio.get_running_loop()
+
+    def _schedule_probes(self, models: List[str]) -> None:
+        if self.probe_sec <= 0:
+            return
+        try:
+            running: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None  # asyncio.to_thread 등 워커 스레드에서 부른 경우
+        if running is not None:
+            self._loop = running
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                name
+                for name in models
+                if name not in self._probing
+                and self._health[name].state != OPEN
+                and (
+                    self._health[name].state == HALF_OPEN
+                    or now - self._health[name].last_sample_at >= self.probe_sec
+                )
+            ]
+            self._probing.update(due)
+        if not due:
+            return
+        if loop is running:
+            self._start_probes(due)
+            return
+        try:
+            loop.call_soon_threadsafe(self._start_probes, due)
+        except RuntimeError:
+            # 루프가 그새 닫혔다. 다음 라우팅 때 다시 고른다.
+            with self._lock:
+                self._probing.difference_update(due)
+
+    def _start_probes(self, models: List[str]) -> None:
+        """Runs on the router's event loop."""
+        for name in models:
+            task = asyncio.get_running_loop().create_task(self._probe(name))
+            self._probe_tasks.add(task)
+            task.add_done_callback(self._probe_tasks.discard)
+
+    async def _probe(self, model: str) -> None:
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self.backend.generate(model, _PROBE_PROMPT, _PROBE_TIMEOUT_SEC), _PROBE_TIMEOUT_SEC)
+            self.record(model, time.monotonic() - started, True)
+        except Exception as exc:
+            self.record(model, time.monotonic() - started, False, str(exc) or exc.__class__.__name__)
+        finally:
+            with self._lock:
+                self._probing.discard(model)
+
+    def table(self) -> Dict[str, Any]:
+        """Routing table for the debug endpoint."""
+        order = self._order(self._models, claim=False) if self._models is not None else []
+        now = time.monotonic()
+        with self._lock:
+            rows = []
+            for name in self._models or []:
+                health = self._health[name]
+                latencies = health.latencies()
+                rows.append(
+                    {
+                        "model": name,
+                        "rank": order.index(name) if name in order else None,
+                        "state": health.state,
+                        "samples": len(health.samples),
+                        "ewma_ms": round(health.ewma * 1000, 1) if health.ewma is not None else None,
+                        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else None,
+                        "error_rate": round(health.error_rate(), 3),
+                        "consecutive_failures": health.consecutive_failures,
+                        "reopen_in_sec": (
+                            round(max(self.open_sec - (now - health.opened_at), 0.0), 1) if health.state == OPEN else None
+                        ),
+                        "last_error": health.last_error,
+                    }
+                )
+            return {
+                "backend": self.backend.name,
+                "discovered_at": self._discovered_at,
+                "models_cache": str(self.cache_path),
+                "route": order,
+                "models": rows,
+            }
@@ -0,0 +1,86 @@
+import hashlib
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent
+PROMPT_DIR = BASE_DIR / "prompt"
+
+# 기본 프롬프트 프로필. compact 는 JSON 만 받아 빠르고, cot 는 감사용으로 사고과정까지 남긴다.
+LLM_PROMPT_PROFILE = os.getenv("LLM_PROMPT_PROFILE", "compact")
+LLM_COMPACT_MAX_TOKENS = int(os.getenv("LLM_COMPACT_MAX_TOKENS", "384"))
+# 0 이면 cot 출력 길이를 제한하지 않는다.
+LLM_COT_MAX_TOKENS = int(os.getenv("LLM_COT_MAX_TOKENS", "0"))
+
+
+@dataclass(frozen=True)
+class PromptProfile:
+    """A prompt template plus the generation limits that go with it.
+
+    The template is sent as the system instruction, identical for every
+    call, so providers can reuse the cached prefix; only the utterance
+    changes between calls.
+    """
+
+    name: str
+    path: Path
+    max_output_tokens: Optional[int] = None
+    stop_sequences: Tuple[str, ...] = ()
+    temperature: Optional[float] = None
+    description: str = field(default="", compare=False)
+
+    def template(self) -> str:
+        return _read_template(self.path)
+
+    def user_prompt(self, text: str) -> str:
+        return f"[사용자 발화]\n{text}"
+
+    def generation_options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {}
+        if self.max_output_tokens:
+            options["max_output_tokens"] = self.max_output_tokens
+        if self.stop_sequences:
+            options["stop_sequences"] = list(self.stop_sequences)
+        if self.temperature is not None:
+            options["temperature"] = self.temperature
+        return options
+
+    def version(self) -> str:
+        """Changes whenever the template or the generation limits change (used in cache keys)."""
+        raw = f"{self.name}\0{self.template()}\0{sorted(self.generation_options().items())}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+@lru_cache(maxsize=None)
+def _read_template(path: Path) -> str:
+    if not path.exists():
+        raise FileNotFoundError(f"프롬프트 파일을 찾을 수 없습니다: {path}")
+    return path.read_text(encoding="utf-8").strip()
+
+
+PROFILES: Dict[str, PromptProfile] = {
+    "cot": PromptProfile(
+        "cot",
+        PROMPT_DIR / "prompt.txt",
+        max_output_tokens=LLM_COT_MAX_TOKENS or None,
+        description="요약 + 단계별 사고과정 + JSON (감사용)",
+    ),
+    "compact": PromptProfile(
+        "compact",
+        PROMPT_DIR / "prompt_compact.txt",
+        max_output_tokens=LLM_COMPACT_MAX_TOKENS,
+        stop_sequences=("<END>",),
+        temperature=0.0,
+        description="명령 JSON 한 줄만 (기본)",
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> PromptProfile:
+    name = name or LLM_PROMPT_PROFILE
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"알 수 없는 프롬프트 프로필: {name} (사용 가능: {', '.join(PROFILES)})") from None
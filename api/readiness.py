@@ -0,0 +1,62 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# 준비 상태: 아직 시작 전(cold), 예열 중(warming), 준비됨(ready), 실패(failed), 예열을 끈 경우(skipped)
+READY_STATES = {"ready", "skipped"}
+
+
+class WarmupState:
+    """Progress of one component's startup warmup, reported by ``GET /ready``."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.status = "cold"
+        self.attempts = 0
+        self.started_at: Optional[float] = None
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.detail: Dict[str, Any] = {}
+        self._started = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status in READY_STATES
+
+    def begin(self) -> None:
+        with self._lock:
+            self.status = "warming"
+            self.attempts += 1
+            self.started_at = time.time()
+            self._started = time.perf_counter()
+            self.error = None
+
+    def done(self, **detail: Any) -> None:
+        with self._lock:
+            self.status = "ready"
+            self.duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+            self.detail.update(detail)
+
+    def fail(self, exc: BaseException) -> None:
+        with self._lock:
+            self.status = "failed"
+            self.duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+            self.error = str(exc) or exc.__class__.__name__
+        print(f"[WARMUP WARNING] {self.name} 예열에 실패했습니다: {self.error}")
+
+    def skip(self) -> None:
+        with self._lock:
+            self.status = "skipped"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "status": self.status,
+                "ready": self.ready,
+                "attempts": self.attempts,
+                "started_at": self.started_at,
+                "duration_ms": self.duration_ms,
+                "error": self.error,
+                **self.detail,
+            }
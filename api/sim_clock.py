@@ -0,0 +1,33 @@
+"""Simulation clocks for the drone API.
+
+The implementation lives in DroneAPI/sim_clock.py so the api server and the
+DroneAPI mission executor run on the same clocks; this module re-exports it
+for the api modules.
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from DroneAPI.sim_clock import (  # noqa: E402
+    DRONE_CLOCK,
+    DRONE_CLOCK_EPOCH,
+    DRONE_CLOCK_SCALE,
+    RealClock,
+    ScaledClock,
+    VirtualClock,
+    make_clock,
+)
+
+__all__ = [
+    "DRONE_CLOCK",
+    "DRONE_CLOCK_EPOCH",
+    "DRONE_CLOCK_SCALE",
+    "RealClock",
+    "ScaledClock",
+    "VirtualClock",
+    "make_clock",
+]
@@ -0,0 +1,224 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+from audio_decode import SAMPLE_RATE, pcm16_to_float, to_mono_16k
+
+# VAD 프레임 길이(ms)와, 잡음 바닥보다 몇 dB 커야 말소리로 보는지.
+STT_VAD_FRAME_MS = int(os.getenv("STT_VAD_FRAME_MS", "30"))
+STT_VAD_MARGIN_DB = float(os.getenv("STT_VAD_MARGIN_DB", "12"))
+# 이보다 작은 소리(dBFS)는 잡음 바닥과 상관없이 무음으로 본다.
+STT_VAD_MIN_DBFS = float(os.getenv("STT_VAD_MIN_DBFS", "-50"))
+# 발화 시작으로 보는 연속 음성 길이, 끝으로 보는 무음 길이, 시작 앞에 붙이는 여유 구간(ms).
+STT_VAD_MIN_SPEECH_MS = int(os.getenv("STT_VAD_MIN_SPEECH_MS", "150"))
+STT_VAD_END_SILENCE_MS = int(os.getenv("STT_VAD_END_SILENCE_MS", "600"))
+STT_VAD_PREROLL_MS = int(os.getenv("STT_VAD_PREROLL_MS", "300"))
+# 이 길이(초)를 넘으면 말이 끝나지 않아도 발화를 끊어 처리한다.
+STT_MAX_UTTERANCE_SEC = float(os.getenv("STT_MAX_UTTERANCE_SEC", "15"))
+# 말하는 동안 중간 인식 결과를 보내는 간격(ms). 0 이면 보내지 않는다.
+STT_PARTIAL_INTERVAL_MS = float(os.getenv("STT_PARTIAL_INTERVAL_MS", "800"))
+
+
+class EnergyVAD:
+    """Frame energy against an adaptive noise floor; cheap enough to run on every frame."""
+
+    def __init__(self, margin_db: float = STT_VAD_MARGIN_DB, min_dbfs: float = STT_VAD_MIN_DBFS) -> None:
+        self.margin_db = margin_db
+        self.min_dbfs = min_dbfs
+        # 첫 프레임부터 말하고 있어도 잡히도록 바닥은 최저 기준에서 시작해 조용한 프레임으로 맞춰 간다.
+        self.noise_floor = min_dbfs
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        level = 10.0 * np.log10(float(np.mean(frame * frame)) + 1e-10)
+        speech = level > max(self.noise_floor + self.margin_db, self.min_dbfs)
+        if not speech:
+            # 조용한 프레임으로만 잡음 바닥을 따라간다. 내려갈 때는 빠르게, 올라갈 때는 천천히.
+            rate = 0.3 if level < self.noise_floor else 0.05
+            self.noise_floor += rate * (level - self.noise_floor)
+        return speech
+
+
+class UtteranceSegmenter:
+    """Cuts a 16 kHz sample stream into utterances with ``EnergyVAD``.
+
+    ``push`` returns ``("start", None)`` when speech begins (the pre-roll
+    frames are kept so the first syllable is not clipped) and
+    ``("end", samples)`` after ``end_silence_ms`` of silence or when the
+    utterance reaches ``max_utterance_sec``.
+    """
+
+    def __init__(
+        self,
+        frame_ms: int = STT_VAD_FRAME_MS,
+        min_speech_ms: int = STT_VAD_MIN_SPEECH_MS,
+        end_silence_ms: int = STT_VAD_END_SILENCE_MS,
+        preroll_ms: int = STT_VAD_PREROLL_MS,
+        max_utterance_sec: float = STT_MAX_UTTERANCE_SEC,
+        vad: Optional[EnergyVAD] = None,
+    ) -> None:
+        self.frame_size = SAMPLE_RATE * frame_ms // 1000
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.end_silence_frames = max(1, end_silence_ms // frame_ms)
+        self.max_frames = max(1, int(max_utterance_sec * 1000) // frame_ms)
+        self.vad = vad or EnergyVAD()
+        self.preroll_frames = max(1, preroll_ms // frame_ms)
+        self._preroll: Deque[np.ndarray] = deque(maxlen=self.preroll_frames + self.min_speech_frames)
+        self._leftover = np.zeros(0, dtype=np.float32)
+        self._frames: List[np.ndarray] = []
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    @property
+    def speaking(self) -> bool:
+        return bool(self._frames)
+
+    def audio(self) -> np.ndarray:
+        """Samples of the utterance in progress."""
+        return np.concatenate(self._frames) if self._frames else np.zeros(0, dtype=np.float32)
+
+    def push(self, samples: np.ndarray) -> List[tuple]:
+        events: List[tuple] = []
+        samples = np.concatenate([self._leftover, samples]) if self._leftover.size else samples
+        usable = samples.size - samples.size % self.frame_size
+        self._leftover = samples[usable:].copy()
+        for start in range(0, usable, self.frame_size):
+            frame = samples[start : start + self.frame_size]
+            speech = self.vad.is_speech(frame)
+            if not self._frames:
+                self._preroll.append(frame)
+                self._voiced_run = self._voiced_run + 1 if speech else 0
+                if self._voiced_run >= self.min_speech_frames:
+                    self._frames = list(self._preroll)
+                    self._preroll.clear()
+                    self._silent_run = 0
+                    events.append(("start", None))
+                continue
+            self._frames.append(frame)
+            self._silent_run = 0 if speech else self._silent_run + 1
+            if self._silent_run >= self.end_silence_frames or len(self._frames) >= self.max_frames:
+                # 끝의 무음은 시작 여유 구간만큼만 남겨 인식할 길이를 줄인다.
+                events.append(("end", self.finish(trim=self._silent_run - self.preroll_frames)))
+        return events
+
+    def finish(self, trim: int = 0) -> Optional[np.ndarray]:
+        """Close the utterance in progress (e.g. when the client stops) and return its samples."""
+        if not self._frames:
+            return None
+        if 0 < trim < len(self._frames):
+            del self._frames[-trim:]
+        audio = self.audio()
+        self._frames = []
+        self._voiced_run = 0
+        self._silent_run = 0
+        return audio
+
+
+class SpeechStreamSession:
+    """Per-connection state of the streaming recognizer behind ``/ws/speech``.
+
+    PCM chunks go through ``feed``; server messages for the client are put
+    on ``outbox``: ``speech_start``, ``partial`` transcripts of the utterance
+    so far (at most one in flight, only while STT has spare capacity),
+    ``final`` once the utterance ends and ``command`` with the planning
+    result. Utterances are finalized one at a time, in order.
+    """
+
+    def __init__(
+        self,
+        transcribe: Callable[[np.ndarray], Awaitable[str]],
+        plan: Callable[[str], Awaitable[Dict[str, Any]]],
+        sample_rate: int = SAMPLE_RATE,
+        partial_interval_ms: float = STT_PARTIAL_INTERVAL_MS,
+        can_partial: Callable[[], bool] = lambda: True,
+    ) -> None:
+        self.transcribe = transcribe
+        self.plan = plan
+        self.sample_rate = sample_rate
+        self.partial_interval = partial_interval_ms / 1000.0
+        self.can_partial = can_partial
+        self.segmenter = UtteranceSegmenter()
+        self.outbox: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self.utterance = 0
+        self._last_partial = 0.0
+        self._partial_task: Optional["asyncio.Task[None]"] = None
+        self._finals: "asyncio.Queue[tuple]" = asyncio.Queue()
+        self._finalizer = asyncio.create_task(self._run_finals())
+
+    def feed(self, pcm: bytes) -> None:
+        samples = pcm16_to_float(pcm)
+        if self.sample_rate != SAMPLE_RATE:
+            samples = to_mono_16k(samples, self.sample_rate)
+        for kind, audio in self.segmenter.push(samples):
+            if kind == "start":
+                self.utterance += 1
+                self._last_partial = time.monotonic()
+                self.outbox.put_nowait({"type": "speech_start", "utterance": self.utterance})
+            else:
+                self._end(audio)
+        self._maybe_partial()
+
+    def flush(self) -> None:
+        """The client stopped capturing: finalize whatever was being said."""
+        audio = self.segmenter.finish()
+        if audio is not None:
+            self._end(audio)
+
+    def _end(self, audio: np.ndarray) -> None:
+        if self._partial_task is not None:
+            self._partial_task.cancel()
+            self._partial_task = None
+        self._finals.put_nowait((self.utterance, audio))
+
+    def _maybe_partial(self) -> None:
+        if not self.partial_interval or not self.segmenter.speaking:
+            return
+        if self._partial_task is not None and not self._partial_task.done():
+            return
+        now = time.monotonic()
+        if now - self._last_partial < self.partial_interval or not self.can_partial():
+            return
+        self._last_partial = now
+        self._partial_task = asyncio.create_task(self._partial(self.utterance, self.segmenter.audio()))
+
+    async def _partial(self, utterance: int, audio: np.ndarray) -> None:
+        try:
+            text = await self.transcribe(audio)
+        except Exception as exc:
+            print(f"[STT WARNING] 중간 인식에 실패했습니다: {exc}")
+            return
+        if text and utterance == self.utterance and self.segmenter.speaking:
+            self.outbox.put_nowait({"type": "partial", "utterance": utterance, "text": text})
+
+    async def _run_finals(self) -> None:
+        while True:
+            utterance, audio = await self._finals.get()
+            ended = time.monotonic()
+            try:
+                text = await self.transcribe(audio)
+                self.outbox.put_nowait(
+                    {
+                        "type": "final",
+                        "utterance": utterance,
+                        "text": text,
+                        "audio_sec": round(audio.size / SAMPLE_RATE, 2),
+                        "stt_ms": round((time.monotonic() - ended) * 1000, 1),
+                    }
+                )
+                if text:
+                    result = await self.plan(text)
+                    # 말이 끝난 뒤 명령이 나오기까지 걸린 시간
+                    result["latency_ms"] = round((time.monotonic() - ended) * 1000, 1)
+                    self.outbox.put_nowait({"type": "command", "utterance": utterance, **result})
+            except Exception as exc:
+                print(f"[STT WARNING] 발화 {utterance} 처리에 실패했습니다: {exc}")
+                self.outbox.put_nowait({"type": "error", "utterance": utterance, "detail": str(exc)})
+
+    async def close(self) -> None:
+        for task in (self._partial_task, self._finalizer):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(task for task in (self._partial_task, self._finalizer) if task), return_exceptions=True)
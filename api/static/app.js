@@ -6,12 +6,21 @@ const resultEl = document.getElementById("resultText");
 const commandEl = document.getElementById("commandText");
 const logEl = document.getElementById("logText");
 const fileInput = document.getElementById("audioFile");
+const streamToggle = document.getElementById("streamToggle");
 
 // ===== state =====
 let mediaRecorder = null;
 let audioChunks = [];
 let stream = null;
 
+// 실시간 인식(WebSocket) 상태
+let speechSocket = null;
+let audioContext = null;
+let sourceNode = null;
+let captureNode = null;
+let pendingUtterances = new Set();
+let socketCloseTimer = null;
+
 let logPollTimer = null;
 let currentLogJobId = null;
 let nextLogIndex = 0;
@@ -161,6 +170,19 @@ const forceRefreshLogs = () => {
 };
 
 // ===== backend interaction =====
+const showCommandResult = (data) => {
+  if (commandEl) commandEl.textContent = data.command || "(생성된 명령문 없음)";
+
+  if (logEl) {
+    if (data.job_id) {
+      logEl.textContent = "명령 실행을 시작합니다...";
+      forceRefreshLogs();
+    } else {
+      logEl.textContent = "실행할 명령이 없습니다.";
+    }
+  }
+};
+
 const sendAudio = async (file) => {
   setStatus("서버로 전송 중...");
   resultEl.textContent = "인식 중...";
@@ -184,17 +206,7 @@ const sendAudio = async (file) => {
     const data = await response.json();
 
     resultEl.textContent = data.text || "(텍스트 없음)";
-    if (commandEl) commandEl.textContent = data.command || "(생성된 명령문 없음)";
-
-    if (logEl) {
-      if (data.job_id) {
-        logEl.textContent = "명령 실행을 시작합니다...";
-        forceRefreshLogs();
-      } else {
-        logEl.textContent = "실행할 명령이 없습니다.";
-      }
-    }
-
+    showCommandResult(data);
     setStatus("완료되었습니다!");
   } catch (error) {
     console.error(error);
@@ -205,10 +217,139 @@ const sendAudio = async (file) => {
   }
 };
 
+// ===== streaming recognition =====
+const closeSpeechSocket = () => {
+  if (socketCloseTimer) {
+    clearTimeout(socketCloseTimer);
+    socketCloseTimer = null;
+  }
+  if (speechSocket) {
+    speechSocket.close();
+    speechSocket = null;
+  }
+  pendingUtterances = new Set();
+};
+
+const finishUtterance = (utterance) => {
+  pendingUtterances.delete(utterance);
+  // 녹음을 멈춘 뒤 남은 발화가 모두 처리되면 연결을 닫는다.
+  if (!captureNode && !pendingUtterances.size) closeSpeechSocket();
+};
+
+const handleSpeechEvent = (data) => {
+  switch (data.type) {
+    case "ready":
+      setStatus("듣고 있습니다. 말씀하세요...");
+      break;
+    case "speech_start":
+      pendingUtterances.add(data.utterance);
+      resultEl.textContent = "듣는 중...";
+      break;
+    case "partial":
+      resultEl.textContent = `${data.text} …`;
+      break;
+    case "final":
+      resultEl.textContent = data.text || "(텍스트 없음)";
+      if (data.text) {
+        if (commandEl) commandEl.textContent = "명령 생성 중...";
+      } else {
+        finishUtterance(data.utterance);
+      }
+      break;
+    case "command":
+      showCommandResult(data);
+      if (captureNode) setStatus("듣고 있습니다. 말씀하세요...");
+      else setStatus("완료되었습니다!");
+      finishUtterance(data.utterance);
+      break;
+    case "error":
+      console.error("[speech]", data.detail);
+      setStatus(data.detail || "실시간 인식 중 오류가 발생했습니다.", true);
+      if (data.utterance) finishUtterance(data.utterance);
+      break;
+    default:
+      break;
+  }
+};
+
+const openSpeechSocket = (sampleRate) =>
+  new Promise((resolve, reject) => {
+    const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+    const socket = new WebSocket(
+      `${protocol}://${window.location.host}/ws/speech?sample_rate=${sampleRate}`
+    );
+    socket.binaryType = "arraybuffer";
+    socket.onopen = () => resolve(socket);
+    socket.onerror = () => reject(new Error("실시간 인식 서버에 연결하지 못했습니다."));
+    socket.onmessage = (event) => handleSpeechEvent(JSON.parse(event.data));
+    socket.onclose = () => {
+      if (speechSocket === socket) speechSocket = null;
+    };
+  });
+
+const createAudioSource = async () => {
+  // 16 kHz 로 바로 받으면 서버에서 다시 샘플링하지 않아도 된다. 지원하지 않으면 기본 주파수로 받는다.
+  try {
+    audioContext = new AudioContext({ sampleRate: 16000 });
+    sourceNode = audioContext.createMediaStreamSource(stream);
+  } catch (error) {
+    if (audioContext) audioContext.close();
+    audioContext = new AudioContext();
+    sourceNode = audioContext.createMediaStreamSource(stream);
+  }
+};
+
+const startStreaming = async () => {
+  if (!stream) {
+    stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+  }
+  closeSpeechSocket();
+  await createAudioSource();
+  await audioContext.audioWorklet.addModule("/static/pcm-worklet.js");
+  speechSocket = await openSpeechSocket(audioContext.sampleRate);
+
+  captureNode = new AudioWorkletNode(audioContext, "pcm-capture", { numberOfOutputs: 0 });
+  captureNode.port.onmessage = (event) => {
+    if (speechSocket && speechSocket.readyState === WebSocket.OPEN) {
+      speechSocket.send(event.data);
+    }
+  };
+  sourceNode.connect(captureNode);
+  resultEl.textContent = "듣는 중...";
+};
+
+const stopStreaming = () => {
+  if (sourceNode) sourceNode.disconnect();
+  if (captureNode) captureNode.port.onmessage = null;
+  if (audioContext) audioContext.close();
+  sourceNode = null;
+  captureNode = null;
+  audioContext = null;
+
+  if (!speechSocket) return;
+  if (speechSocket.readyState === WebSocket.OPEN) {
+    speechSocket.send(JSON.stringify({ op: "end" }));
+  }
+  if (!pendingUtterances.size) {
+    closeSpeechSocket();
+    setStatus("녹음을 종료했습니다.");
+    return;
+  }
+  setStatus("녹음 종료, 마지막 발화를 처리하는 중...");
+  socketCloseTimer = setTimeout(closeSpeechSocket, 30000);
+};
+
+const isStreaming = () => Boolean(captureNode);
+
 // ===== ui events =====
 startBtn.addEventListener("click", async () => {
   try {
     setStatus("녹음 준비 중...");
+    if (streamToggle && streamToggle.checked) {
+      await startStreaming();
+      setButtons(true);
+      return;
+    }
     if (!mediaRecorder || mediaRecorder.state === "inactive") {
       await ensureRecorder();
     }
@@ -219,11 +360,17 @@ startBtn.addEventListener("click", async () => {
     setStatus("녹음 중...");
   } catch (error) {
     console.error(error);
+    stopStreaming();
     setStatus(error.message || "마이크를 사용할 수 없습니다.", true);
   }
 });
 
 stopBtn.addEventListener("click", () => {
+  if (isStreaming()) {
+    stopStreaming();
+    setButtons(false);
+    return;
+  }
   if (mediaRecorder && mediaRecorder.state === "recording") {
     setStatus("녹음 종료, 인식 중...");
     mediaRecorder.stop();
@@ -245,6 +392,7 @@ window.addEventListener("beforeunload", () => {
       stream.getTracks().forEach((track) => track.stop());
     } catch {}
   }
+  stopStreaming();
   stopLogWatcher();
 });
 
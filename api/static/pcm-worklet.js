@@ -0,0 +1,28 @@
+// Captures microphone samples as 16-bit PCM and posts ~20 ms chunks to the page.
+class PcmCaptureProcessor extends AudioWorkletProcessor {
+  constructor() {
+    super();
+    this.chunkSize = Math.round(sampleRate / 50);
+    this.buffer = new Int16Array(this.chunkSize);
+    this.offset = 0;
+  }
+
+  process(inputs) {
+    const channel = inputs[0] && inputs[0][0];
+    if (!channel) return true;
+
+    for (let i = 0; i < channel.length; i += 1) {
+      const sample = Math.max(-1, Math.min(1, channel[i]));
+      this.buffer[this.offset] = sample < 0 ? sample * 0x8000 : sample * 0x7fff;
+      this.offset += 1;
+      if (this.offset === this.chunkSize) {
+        this.port.postMessage(this.buffer.buffer, [this.buffer.buffer]);
+        this.buffer = new Int16Array(this.chunkSize);
+        this.offset = 0;
+      }
+    }
+    return true;
+  }
+}
+
+registerProcessor("pcm-capture", PcmCaptureProcessor);
@@ -0,0 +1,262 @@
+import importlib.util
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Protocol
+
+import numpy as np
+
+from audio_decode import SAMPLE_RATE
+from readiness import WarmupState
+
+# 요청에서 엔진을 고르지 않았을 때 쓰는 엔진: whisper(WHISPER_MODEL 크기), whisper:<크기>, vosk, stub
+STT_ENGINE = os.getenv("STT_ENGINE", "whisper")
+# 지연 예산으로 고를 때의 후보. 정확한 것부터 적고, 예산 안에 들어오는 첫 엔진을 쓴다.
+STT_ENGINE_ORDER = [name.strip() for name in os.getenv("STT_ENGINE_ORDER", "whisper,vosk").split(",") if name.strip()]
+# 요청에 예산이 없을 때 쓰는 기본 지연 예산(ms). 0 이면 예산 없이 STT_ENGINE 을 쓴다.
+STT_LATENCY_BUDGET_MS = float(os.getenv("STT_LATENCY_BUDGET_MS", "0"))
+# 인식 언어. Whisper 는 비워 두면 언어를 스스로 판별한다(그만큼 느리다).
+STT_LANGUAGE = os.getenv("STT_LANGUAGE", "ko")
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "model-ko")
+# stub 엔진은 어떤 소리든 STT_STUB_TEXT 로 받아 적으므로(그대로 비행 명령이 된다) 켠 경우에만 등록한다.
+# STT_ENGINE=stub 이면 켠 것으로 본다.
+STT_STUB_ENABLED = os.getenv("STT_STUB_ENABLED", "1" if STT_ENGINE == "stub" else "0") == "1"
+STT_STUB_TEXT = os.getenv("STT_STUB_TEXT", "앞으로 1미터 이동해")
+STT_STUB_DELAY_MS = float(os.getenv("STT_STUB_DELAY_MS", "20"))
+# 1 이면 앞뒤 무음을 잘라 엔진에 넘긴다.
+STT_TRIM_SILENCE = os.getenv("STT_TRIM_SILENCE", "1") == "1"
+# 서버 시작 때 예열할 엔진(쉼표로 구분). 비워 두면 STT_ENGINE 만 예열한다.
+STT_WARMUP_ENGINES = [name.strip() for name in os.getenv("STT_WARMUP_ENGINES", "").split(",") if name.strip()]
+# 예열에 쓰는 무음 클립 길이(초). 첫 추론의 커널 컴파일/메모리 할당을 서버 시작 때 끝낸다.
+STT_WARMUP_SEC = float(os.getenv("STT_WARMUP_SEC", os.getenv("WHISPER_WARMUP_SEC", "1.0")))
+
+# 측정값이 없을 때 쓰는 실시간 배율(처리 시간 / 음성 길이)의 대략적인 CPU 기준값.
+_RTF_PRIORS = {
+    "whisper:tiny": 0.1,
+    "whisper:base": 0.2,
+    "whisper:small": 0.5,
+    "whisper:turbo": 0.8,
+    "whisper:medium": 1.2,
+    "whisper:large": 2.5,
+    "whisper:large-v2": 2.5,
+    "whisper:large-v3": 2.5,
+    "vosk": 0.1,
+    "stub": 0.01,
+}
+_FRAME = SAMPLE_RATE * 30 // 1000
+
+stt_warmup = WarmupState("stt")
+
+
+def preprocess(audio: np.ndarray) -> np.ndarray:
+    """Shared clean-up before any engine: DC offset, leading/trailing silence, quiet-mic gain."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.size == 0:
+        return audio
+    audio = audio - np.float32(audio.mean())
+    if STT_TRIM_SILENCE and audio.size >= 2 * _FRAME:
+        frames = audio[: audio.size - audio.size % _FRAME].reshape(-1, _FRAME)
+        levels = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+        voiced = np.flatnonzero(levels > max(float(levels.max()) - 35.0, -55.0))
+        if voiced.size:
+            # 말소리 앞 100ms, 뒤 200ms 는 남겨 첫/끝 음절이 잘리지 않게 한다.
+            start = max(0, (int(voiced[0]) - 3) * _FRAME)
+            end = min(audio.size, (int(voiced[-1]) + 8) * _FRAME)
+            audio = audio[start:end]
+    peak = float(np.abs(audio).max()) if audio.size else 0.0
+    if 1e-4 < peak < 0.5:
+        audio = audio * np.float32(0.9 / peak)
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+def to_pcm16(audio: np.ndarray) -> bytes:
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+class STTEngine(Protocol):
+    """What the registry needs from a recognizer; ``transcribe`` gets preprocessed 16 kHz float32."""
+
+    name: str
+
+    def available(self) -> bool: ...
+
+    def load(self) -> None: ...
+
+    def transcribe(self, audio: np.ndarray) -> str: ...
+
+
+class WhisperEngine:
+    """OpenAI Whisper of a given size; whisper/torch are imported only when the engine is used."""
+
+    def __init__(self, size: Optional[str] = None) -> None:
+        self.size = size or os.getenv("WHISPER_MODEL", "base")
+        self.name = f"whisper:{self.size}"
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("whisper") is not None
+
+    def load(self) -> None:
+        import whisper_service
+
+        whisper_service.load_model(self.size)
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        import whisper_service
+
+        return whisper_service.transcribe_audio(audio, self.size, STT_LANGUAGE)
+
+
+class VoskEngine:
+    """Kaldi-based offline recognizer; fast on CPU, weaker than Whisper on the stock Korean model."""
+
+    name = "vosk"
+
+    def __init__(self, model_path: str = VOSK_MODEL_PATH) -> None:
+        self.model_path = model_path
+        self.model: Any = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("vosk") is not None and os.path.isdir(self.model_path)
+
+    def load(self) -> None:
+        with self._lock:
+            if self.model is not None:
+                return
+            try:
+                import vosk
+            except ImportError as exc:
+                raise RuntimeError("vosk 엔진에는 vosk 패키지가 필요합니다. pip install vosk 명령으로 설치해 주세요.") from exc
+            if not os.path.isdir(self.model_path):
+                raise RuntimeError(f"Vosk 모델 폴더를 찾을 수 없습니다: {self.model_path} (VOSK_MODEL_PATH)")
+            vosk.SetLogLevel(-1)
+            self._vosk = vosk
+            self.model = vosk.Model(self.model_path)
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        self.load()
+        recognizer = self._vosk.KaldiRecognizer(self.model, SAMPLE_RATE)
+        recognizer.AcceptWaveform(to_pcm16(audio))
+        return json.loads(recognizer.FinalResult()).get("text", "").strip()
+
+
+class StubEngine:
+    """Offline stand-in that answers ``STT_STUB_TEXT`` for any non-empty audio (tests, demos without a model)."""
+
+    name = "stub"
+
+    def available(self) -> bool:
+        return True
+
+    def load(self) -> None:
+        pass
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        time.sleep(STT_STUB_DELAY_MS / 1000.0)
+        return STT_STUB_TEXT if audio.size else ""
+
+
+_engines: Dict[str, STTEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(name: Optional[str] = None) -> STTEngine:
+    """``whisper``, ``whisper:<size>``, ``vosk`` or (with STT_STUB_ENABLED) ``stub``; None means ``STT_ENGINE``."""
+    name = (name or STT_ENGINE).strip().lower()
+    kind, _, size = name.partition(":")
+    with _engines_lock:
+        if kind == "whisper":
+            engine: STTEngine = WhisperEngine(size or None)
+        elif kind == "vosk" and not size:
+            engine = VoskEngine()
+        elif kind == "stub" and not size and STT_STUB_ENABLED:
+            engine = StubEngine()
+        else:
+            known = "whisper, whisper:<크기>, vosk" + (", stub" if STT_STUB_ENABLED else "")
+            raise ValueError(f"알 수 없는 STT 엔진입니다: {name} (사용 가능: {known})")
+        # 같은 엔진은 한 번만 만들어 모델을 공유한다.
+        return _engines.setdefault(engine.name, engine)
+
+
+def transcribe(audio: np.ndarray, engine: Optional[str] = None) -> str:
+    return get_engine(engine).transcribe(preprocess(audio))
+
+
+def warmup(names: Optional[List[str]] = None) -> None:
+    """Load the default engine (or ``STT_WARMUP_ENGINES``) and run one short silent clip through each."""
+    stt_warmup.begin()
+    warmed = []
+    try:
+        for name in names or STT_WARMUP_ENGINES or [STT_ENGINE]:
+            engine = get_engine(name)
+            engine.load()
+            engine.transcribe(np.zeros(int(SAMPLE_RATE * STT_WARMUP_SEC), dtype=np.float32))
+            warmed.append(engine.name)
+    except Exception as exc:
+        stt_warmup.fail(exc)
+        return
+    stt_warmup.done(engines=warmed)
+
+
+class EngineSelector:
+    """Picks the engine for one utterance: explicit choice, else the best one that fits the latency budget.
+
+    Latency is predicted from the utterance length and each engine's measured
+    real-time factor (moving average of end-to-end time / audio seconds,
+    seeded with rough CPU figures), so the choice follows the actual load.
+    """
+
+    def __init__(
+        self,
+        default: str = STT_ENGINE,
+        order: Optional[List[str]] = None,
+        budget_ms: float = STT_LATENCY_BUDGET_MS,
+    ) -> None:
+        self.default = default
+        self.order = order if order is not None else STT_ENGINE_ORDER
+        self.budget_ms = budget_ms
+        self._rtf: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def predict_ms(self, name: str, audio_sec: float) -> float:
+        with self._lock:
+            rtf = self._rtf.get(name, _RTF_PRIORS.get(name, 1.0))
+        # 아주 짧은 발화도 모델 호출 고정 비용이 있어 0.5초보다 짧게 보지 않는다.
+        return rtf * max(audio_sec, 0.5) * 1000.0
+
+    def choose(self, audio_sec: float, engine: Optional[str] = None, budget_ms: Optional[float] = None) -> str:
+        if engine:
+            return get_engine(engine).name
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        if not budget_ms:
+            return get_engine(self.default).name
+        candidates = [get_engine(name) for name in self.order]
+        candidates = [candidate for candidate in candidates if candidate.available()] or [get_engine(self.default)]
+        for candidate in candidates:
+            if self.predict_ms(candidate.name, audio_sec) <= budget_ms:
+                return candidate.name
+        # 예산 안에 드는 엔진이 없으면 가장 빠를 것으로 보이는 엔진을 쓴다.
+        return min(candidates, key=lambda candidate: self.predict_ms(candidate.name, audio_sec)).name
+
+    def record(self, name: str, audio_sec: float, latency_ms: float) -> None:
+        rtf = latency_ms / 1000.0 / max(audio_sec, 0.5)
+        with self._lock:
+            previous = self._rtf.get(name)
+            self._rtf[name] = rtf if previous is None else 0.8 * previous + 0.2 * rtf
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            measured = {name: {"rtf": round(rtf, 3), "samples": self._counts[name]} for name, rtf in self._rtf.items()}
+        return {
+            "default": get_engine(self.default).name,
+            "order": [get_engine(name).name for name in self.order],
+            "budget_ms": self.budget_ms or None,
+            "available": {
+                get_engine(name).name: get_engine(name).available()
+                for name in [*self.order, *(["stub"] if STT_STUB_ENABLED else [])]
+            },
+            "measured": measured,
+        }
@@ -0,0 +1,390 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import Connection, wait
+from multiprocessing.shared_memory import SharedMemory
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+import stt_engines
+from audio_decode import SAMPLE_RATE
+from stt_engines import EngineSelector, stt_warmup
+from stt_worker import run_worker
+
+# STT 복제본(작업 프로세스) 수. 복제본마다 모델을 따로 올리므로 기본은 1 이다.
+# auto 면 코어 수를 STT_THREADS_PER_WORKER 로 나눈 값, 0 이면 서버 프로세스의 스레드에서 돌린다.
+STT_WORKERS = os.getenv("STT_WORKERS", "1")
+# 복제본 하나가 쓰는 코어(=torch 연산 스레드) 수
+STT_THREADS_PER_WORKER = int(os.getenv("STT_THREADS_PER_WORKER", "4"))
+# 1 이면 복제본마다 겹치지 않는 코어 묶음에 고정한다(리눅스만).
+STT_PIN_CORES = os.getenv("STT_PIN_CORES", "1") == "1"
+# 발화 하나를 받아 적는 최대 시간(초)
+STT_TIMEOUT_SEC = float(os.getenv("STT_TIMEOUT_SEC", "120"))
+
+
+def _available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _worker_count(setting: str, threads: int) -> int:
+    if setting.strip().lower() == "auto":
+        return max(1, len(_available_cores()) // max(1, threads))
+    return max(0, int(setting))
+
+
+@dataclass
+class Transcript:
+    text: str
+    engine: str
+    latency_ms: float
+
+
+class _Replica:
+    def __init__(self, index: int, cores: List[int], process: Any, conn: Connection) -> None:
+        self.index = index
+        self.cores = cores
+        self.process = process
+        self.conn = conn
+        self.job: Optional[int] = None
+        self.warmed = False
+
+
+class STTExecutor:
+    """Runs STT in N worker processes, each holding its own engine models on its own cores.
+
+    Utterances wait in one queue and are handed to whichever replica is idle;
+    the audio itself sits in a shared-memory block and only its name crosses
+    the pipe, so the worker reads the samples without a copy. A replica that
+    dies fails the utterance it held and is started again; one that cannot
+    load its models is dropped, and requests fail at once when none is left. With
+    ``workers == 0`` transcription runs in a thread of the server process.
+    The engine for each utterance comes from ``EngineSelector``.
+    """
+
+    def __init__(self, workers: Optional[int] = None, threads: int = STT_THREADS_PER_WORKER) -> None:
+        self.threads = max(1, threads)
+        self.workers = _worker_count(STT_WORKERS, self.threads) if workers is None else max(0, workers)
+        self.selector = EngineSelector()
+        self._ctx = multiprocessing.get_context("spawn")
+        self._replicas: Dict[int, _Replica] = {}
+        self._waiting: Deque[int] = deque()
+        self._idle: Set[int] = set()
+        self._pending: Dict[int, Tuple[Future, SharedMemory, int, str]] = {}
+        self._dispatched: Dict[int, float] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._all_ready = threading.Event()
+        self._started = False
+        self._closing = False
+        self._counters = {"completed": 0, "errors": 0, "restarts": 0}
+        # 모델을 올리지 못해 내보낸 복제본과 그 이유. 남은 복제본으로 계속 받으며 /stt/stats 에 보인다.
+        self._failed: Dict[int, str] = {}
+        self._engines: Any = None
+        self._busy_seconds = 0.0
+
+    def _core_sets(self) -> List[List[int]]:
+        if not STT_PIN_CORES or not hasattr(os, "sched_setaffinity"):
+            return [[] for _ in range(self.workers)]
+        cores = _available_cores()
+        if len(cores) >= self.workers * self.threads:
+            return [cores[index * self.threads : (index + 1) * self.threads] for index in range(self.workers)]
+        # 코어가 모자라면 고르게 나눠 주고, 복제본이 코어보다 많으면 겹쳐 쓴다.
+        return [[int(core) for core in part] or cores for part in np.array_split(cores, self.workers)]
+
+    def _spawn(self, index: int, cores: List[int]) -> None:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=run_worker,
+            args=(index, cores, len(cores) or self.threads, child_conn),
+            name=f"stt-{index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self._replicas[index] = _Replica(index, cores, process, parent_conn)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started or self.workers == 0:
+                return
+            self._started = True
+            for index, cores in enumerate(self._core_sets()):
+                self._spawn(index, cores)
+        threading.Thread(target=self._collect, name="stt-results", daemon=True).start()
+
+    def warmup(self) -> None:
+        """Start the replicas and block until each has loaded and warmed its model."""
+        if self.workers == 0:
+            stt_engines.warmup()
+            return
+        stt_warmup.begin()
+        self.start()
+        self._all_ready.wait()
+
+    def _dispatch(self) -> None:
+        """Hand waiting utterances to idle replicas. Called with the lock held."""
+        while self._waiting and self._idle:
+            job_id = self._waiting.popleft()
+            entry = self._pending.get(job_id)
+            if entry is None:
+                continue
+            replica = self._replicas[self._idle.pop()]
+            _, shm, samples, engine = entry
+            replica.job = job_id
+            self._dispatched[job_id] = time.monotonic()
+            replica.conn.send((job_id, shm.name, samples, engine))
+
+    def _collect(self) -> None:
+        while not self._closing:
+            with self._lock:
+                replicas = list(self._replicas.values())
+            if not replicas:
+                return
+            by_handle: Dict[Any, _Replica] = {}
+            for replica in replicas:
+                by_handle[replica.conn] = replica
+                by_handle[replica.process.sentinel] = replica
+            for handle in wait(list(by_handle), timeout=1.0):
+                replica = by_handle[handle]
+                if handle is not replica.conn:
+                    continue
+                try:
+                    message = replica.conn.recv()
+                except (EOFError, OSError):
+                    continue
+                self._on_message(replica, message)
+            self._check_workers()
+
+    def _on_message(self, replica: _Replica, message: Tuple[Any, ...]) -> None:
+        if message[0] == "ready":
+            self._on_ready(replica, message[1])
+            return
+        _, job_id, text, error = message
+        with self._lock:
+            replica.job = None
+            self._idle.add(replica.index)
+            self._dispatch()
+        self._finish(job_id, text, error)
+
+    def _on_ready(self, replica: _Replica, snapshot: Dict[str, Any]) -> None:
+        if snapshot.get("status") != "ready":
+            # 살아 있어도 모델이 없는 복제본은 요청을 받을 수 없으니 내보낸다.
+            self._retire(replica, f"stt-{replica.index}: {snapshot.get('error')}")
+            try:
+                replica.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            replica.process.join(timeout=5)
+            if replica.process.is_alive():
+                replica.process.terminate()
+            replica.conn.close()
+            return
+        with self._lock:
+            replica.warmed = True
+            self._engines = snapshot.get("engines")
+            self._idle.add(replica.index)
+            self._dispatch()
+        self._check_ready()
+
+    def _check_ready(self) -> None:
+        """Mark STT ready once every live replica is warm, even if some were retired."""
+        with self._lock:
+            live = len(self._replicas)
+            warmed = sum(item.warmed for item in self._replicas.values())
+            failed = len(self._failed)
+        if live == 0 or warmed < live or self._all_ready.is_set():
+            return
+        stt_warmup.done(
+            engines=self._engines,
+            workers=live,
+            failed_workers=failed,
+            threads_per_worker=self.threads,
+        )
+        self._all_ready.set()
+
+    def _finish(self, job_id: int, text: Optional[str], error: Optional[str]) -> None:
+        with self._lock:
+            entry = self._pending.pop(job_id, None)
+            started = self._dispatched.pop(job_id, None)
+            if started is not None:
+                self._busy_seconds += time.monotonic() - started
+            self._counters["completed" if error is None else "errors"] += 1
+        if entry is None:
+            return
+        future, shm, _, _ = entry
+        self._release(shm)
+        if future.done():
+            return
+        if error is None:
+            future.set_result(text or "")
+        else:
+            future.set_exception(RuntimeError(f"음성 인식 중 오류가 발생했습니다: {error}"))
+
+    @staticmethod
+    def _release(shm: SharedMemory) -> None:
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _check_workers(self) -> None:
+        for replica in list(self._replicas.values()):
+            if replica.process.is_alive() or self._closing:
+                continue
+            exitcode = replica.process.exitcode
+            replica.conn.close()
+            with self._lock:
+                self._idle.discard(replica.index)
+                job_id, replica.job = replica.job, None
+            if job_id is not None:
+                self._finish(job_id, None, f"stt-{replica.index} 프로세스가 종료되었습니다(exit {exitcode}).")
+            if not replica.warmed:
+                # 모델도 올리지 못하고 죽은 복제본은 다시 띄워도 같은 결과라 예열 실패로 남긴다.
+                self._retire(replica, f"stt-{replica.index} 프로세스가 시작 중 종료되었습니다(exit {exitcode}).")
+                continue
+            print(f"[STT WARNING] stt-{replica.index} 프로세스가 종료되어 다시 띄웁니다(exit {exitcode}).")
+            with self._lock:
+                self._counters["restarts"] += 1
+                self._spawn(replica.index, replica.cores)
+        if not self._replicas:
+            self._fail_pending("음성 인식 작업자가 모두 종료되었습니다.")
+
+    def _retire(self, replica: _Replica, reason: str) -> None:
+        """Drop a replica that could not load its models; respawning it would fail the same way.
+
+        The pool keeps serving with the remaining replicas (reported as
+        degraded in ``stats``); warmup only fails when none are left.
+        """
+        with self._lock:
+            self._replicas.pop(replica.index, None)
+            self._idle.discard(replica.index)
+            self._failed[replica.index] = reason
+            remaining = len(self._replicas)
+        if remaining:
+            print(f"[STT WARNING] {reason} (남은 복제본 {remaining}개로 계속합니다.)")
+            self._check_ready()
+            return
+        stt_warmup.fail(RuntimeError(reason))
+        self._all_ready.set()
+        # 받아 줄 복제본이 없으니 기다리는 요청을 STT_TIMEOUT_SEC 까지 붙잡지 않는다.
+        self._fail_pending(f"음성 인식 모델을 불러오지 못했습니다: {reason}")
+
+    def _submit(self, audio: np.ndarray, engine: str) -> Tuple[int, "Future[str]"]:
+        self.start()
+        if not self._replicas:
+            raise RuntimeError("음성 인식 작업자가 모두 종료되었습니다.")
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        shm = SharedMemory(create=True, size=max(audio.nbytes, 1))
+        np.ndarray(audio.shape, dtype=np.float32, buffer=shm.buf)[:] = audio
+        future: "Future[str]" = Future()
+        job_id = next(self._ids)
+        with self._lock:
+            self._pending[job_id] = (future, shm, audio.size, engine)
+            self._waiting.append(job_id)
+            self._dispatch()
+        return job_id, future
+
+    def submit(self, audio: np.ndarray, engine: Optional[str] = None) -> "Future[str]":
+        """Queue one utterance (16 kHz mono float32) for the next idle replica."""
+        return self._submit(audio, stt_engines.get_engine(engine).name)[1]
+
+    def has_idle_replica(self) -> bool:
+        """True when an utterance submitted now would start right away (used to skip partial results)."""
+        if self.workers == 0:
+            return True
+        with self._lock:
+            return bool(self._idle) and not any(job_id in self._pending for job_id in self._waiting)
+
+    def _abandon(self, job_id: int) -> None:
+        with self._lock:
+            entry = self._pending.pop(job_id, None)
+        if entry is not None:
+            self._release(entry[1])
+
+    async def recognize(
+        self,
+        audio: np.ndarray,
+        engine: Optional[str] = None,
+        budget_ms: Optional[float] = None,
+        timeout: float = STT_TIMEOUT_SEC,
+    ) -> Transcript:
+        """Transcribe without blocking the event loop, with ``engine`` or the best one within ``budget_ms``."""
+        audio_sec = audio.size / SAMPLE_RATE
+        name = self.selector.choose(audio_sec, engine, budget_ms)
+        started = time.monotonic()
+        if self.workers == 0:
+            text = await asyncio.to_thread(stt_engines.transcribe, audio, name)
+        else:
+            job_id, future = self._submit(audio, name)
+            try:
+                text = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except asyncio.TimeoutError as exc:
+                self._abandon(job_id)
+                raise RuntimeError(f"음성 인식이 {timeout:.1f}초 안에 끝나지 않았습니다.") from exc
+            except asyncio.CancelledError:
+                self._abandon(job_id)
+                raise
+        latency_ms = (time.monotonic() - started) * 1000.0
+        self.selector.record(name, audio_sec, latency_ms)
+        return Transcript(text, name, round(latency_ms, 1))
+
+    async def transcribe(self, audio: np.ndarray, engine: Optional[str] = None, budget_ms: Optional[float] = None) -> str:
+        return (await self.recognize(audio, engine, budget_ms)).text
+
+    def shutdown(self) -> None:
+        if not self._started:
+            return
+        self._closing = True
+        with self._lock:
+            replicas = list(self._replicas.values())
+        for replica in replicas:
+            try:
+                replica.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for replica in replicas:
+            replica.process.join(timeout=5)
+            if replica.process.is_alive():
+                replica.process.terminate()
+        self._fail_pending("음성 인식 작업자가 종료되었습니다.")
+
+    def _fail_pending(self, reason: str) -> None:
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+            self._waiting.clear()
+        for future, shm, _, _ in pending:
+            self._release(shm)
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = sum(replica.job is not None for replica in self._replicas.values())
+            return {
+                "workers": self.workers,
+                "threads_per_worker": self.threads,
+                "cores": {f"stt-{index}": replica.cores for index, replica in self._replicas.items()},
+                "alive": sum(replica.process.is_alive() for replica in self._replicas.values()),
+                "ready": sum(replica.warmed for replica in self._replicas.values()),
+                "degraded": bool(self._failed),
+                "failed": {f"stt-{index}": reason for index, reason in self._failed.items()},
+                "idle": len(self._idle),
+                "queued": sum(job_id in self._pending for job_id in self._waiting),
+                "running": running,
+                "busy_seconds": round(self._busy_seconds, 3),
+                **self._counters,
+                "engines": self.selector.stats(),
+            }
+
+
+stt_executor = STTExecutor()
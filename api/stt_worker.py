@@ -0,0 +1,60 @@
+import os
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import List
+
+import numpy as np
+
+# torch 와 STT 엔진은 스레드 수를 정한 뒤 run_worker 안에서 불러온다. 이 모듈은 가볍게 둔다.
+_THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def run_worker(index: int, cores: List[int], threads: int, conn: Connection) -> None:
+    """One STT replica: pinned to ``cores``, answers (job id, shm name, samples, engine) jobs on ``conn``."""
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    # torch 를 불러오기 전에 정해야 OpenMP/MKL 스레드 풀이 이 크기로 만들어진다.
+    for name in _THREAD_ENV:
+        os.environ[name] = str(threads)
+    try:
+        import torch
+    except ImportError:
+        torch = None
+    if torch is not None:
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+    import stt_engines
+
+    stt_engines.warmup()
+    conn.send(("ready", stt_engines.stt_warmup.snapshot()))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        job_id, shm_name, samples, engine = job
+        try:
+            shm = SharedMemory(name=shm_name)
+        except FileNotFoundError:
+            # 서버가 이미 포기하고 정리한 요청
+            conn.send(("done", job_id, None, "abandoned"))
+            continue
+        try:
+            # 복사 없이 공유 메모리를 그대로 배열로 본다.
+            audio = np.ndarray((samples,), dtype=np.float32, buffer=shm.buf)
+            text, error = stt_engines.transcribe(audio, engine), None
+        except Exception as exc:
+            text, error = None, str(exc) or exc.__class__.__name__
+        finally:
+            audio = None
+            try:
+                shm.close()
+            except BufferError:
+                pass
+        conn.send(("done", job_id, text, error))
@@ -1,6 +1,8 @@
 import os
-from functools import lru_cache
-from typing import Optional
+import threading
+from typing import Dict, Optional
+
+import numpy as np
 
 try:
     import torch
@@ -9,19 +11,29 @@ except ImportError:  # torch is optional; whisper can still run on CPU without i
 
 import whisper
 
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+
+_models: Dict[str, whisper.Whisper] = {}
+_load_lock = threading.Lock()
+
 
-@lru_cache(maxsize=1)
-def load_model() -> whisper.Whisper:
-    """Load and cache a Whisper model instance."""
-    model_name = os.getenv("WHISPER_MODEL", "base")
-    device: Optional[str] = None
-    if torch is not None and torch.cuda.is_available():
-        device = "cuda:1"
-    return whisper.load_model(model_name, device=device or "cpu")
+def load_model(name: Optional[str] = None) -> whisper.Whisper:
+    """Load and cache a Whisper model instance (one per model size)."""
+    name = name or WHISPER_MODEL
+    # 예열 스레드와 첫 요청이 동시에 불러도 모델은 한 번만 올린다.
+    with _load_lock:
+        model = _models.get(name)
+        if model is None:
+            device: Optional[str] = None
+            if torch is not None and torch.cuda.is_available():
+                device = "cuda:1"
+            model = _models[name] = whisper.load_model(name, device=device or "cpu")
+        return model
 
 
-def transcribe_audio_file(path: str) -> str:
-    """Run Whisper transcription on a local audio file path."""
-    model = load_model()
-    result = model.transcribe(path)
+def transcribe_audio(audio: np.ndarray, name: Optional[str] = None, language: Optional[str] = None) -> str:
+    """Run Whisper on 16 kHz mono float32 samples (see ``audio_decode.decode_audio``)."""
+    model = load_model(name)
+    # CPU 에서는 fp16 을 못 써 매번 경고가 나므로 GPU 일 때만 켠다.
+    result = model.transcribe(audio, language=language or None, fp16=model.device.type == "cuda")
     return result.get("text", "").strip()